@@ -49,6 +49,6 @@ def inject_mocks(testbot, config, resources = default_dummy_resources(), resourc
 
 def create_sdm_service_mock(resources, resources_by_role):
     service_mock = MagicMock()
-    service_mock.get_all_resources = MagicMock(return_value = resources)
+    service_mock.iter_all_resources = MagicMock(side_effect = lambda filter = '': iter(resources))
     service_mock.get_all_resources_by_role = MagicMock(return_value = resources_by_role)
     return service_mock
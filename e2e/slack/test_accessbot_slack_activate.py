@@ -110,4 +110,59 @@ def get_dummy_members():
 def create_room_mock(channel_name):
     mock = MagicMock()
     mock.name = channel_name
-    return mock
\ No newline at end of file
+    return mock
+
+
+class Test_warm_up(ErrBotExtraTestSettings):
+    @pytest.fixture
+    def mocked_testbot(self, testbot):
+        config = create_config()
+        config['WARM_UP'] = True
+        config['RESOURCE_CATALOG_TTL'] = 60
+        config['ROLE_CATALOG_TTL'] = 60
+        config['CONTROL_RESOURCES_ROLE_NAME'] = 'control-role'
+        accessbot = testbot.bot.plugin_manager.plugins['AccessBot']
+        accessbot.config = config
+        accessbot.get_admins = MagicMock(return_value = ['@bot_admin'])
+        accessbot.build_identifier = MagicMock(side_effect = mocked_build_identifier)
+        accessbot.get_sdm_service = MagicMock(return_value = MagicMock())
+        return testbot
+
+    def test_preloads_sdm_data_after_activation(self, mocked_testbot):
+        accessbot = mocked_testbot.bot.plugin_manager.plugins['AccessBot']
+        accessbot.deactivate()
+        accessbot.activate()
+        wait_until_ready(accessbot)
+        sdm_service = accessbot.get_sdm_service.return_value
+        sdm_service.get_all_resources.assert_called_once()
+        sdm_service.get_all_roles.assert_called_once()
+        sdm_service.get_all_resources_by_role.assert_called_once_with('control-role')
+        accessbot.build_identifier.assert_called_once_with('@bot_admin')
+
+    def test_is_ready_when_a_step_fails(self, mocked_testbot):
+        accessbot = mocked_testbot.bot.plugin_manager.plugins['AccessBot']
+        accessbot.get_sdm_service.return_value.get_all_resources.side_effect = Exception("SDM Client failed")
+        accessbot.deactivate()
+        accessbot.activate()
+        wait_until_ready(accessbot)
+        accessbot.get_sdm_service.return_value.get_all_roles.assert_called_once()
+
+    def test_skips_the_disabled_catalogs(self, mocked_testbot):
+        accessbot = mocked_testbot.bot.plugin_manager.plugins['AccessBot']
+        accessbot.config['RESOURCE_CATALOG_TTL'] = 0
+        accessbot.config['ROLE_CATALOG_TTL'] = 0
+        accessbot.deactivate()
+        accessbot.activate()
+        wait_until_ready(accessbot)
+        sdm_service = accessbot.get_sdm_service.return_value
+        sdm_service.get_all_resources.assert_not_called()
+        sdm_service.get_all_roles.assert_not_called()
+        sdm_service.get_all_resources_by_role.assert_not_called()
+        accessbot.build_identifier.assert_called_once_with('@bot_admin')
+
+def wait_until_ready(accessbot):
+    for _ in range(50):
+        if accessbot.is_ready():
+            return
+        sleep(0.1)
+    raise AssertionError("AccessBot is not ready")
@@ -194,6 +194,36 @@ class Test_role_grant_exists(ErrBotExtraTestSettings):
         assert "assign request" in mocked_testbot.pop_message()
         assert "Granting" in mocked_testbot.pop_message()
 
+class Test_grant_failures(ErrBotExtraTestSettings):
+    @pytest.fixture
+    def mocked_testbot(self, testbot):
+        config = create_config()
+        return inject_mocks(testbot, config)
+
+    def test_when_some_grants_fail(self, mocked_testbot):
+        accessbot = mocked_testbot.bot.plugin_manager.plugins['AccessBot']
+        service = accessbot.get_sdm_service()
+        service.get_all_resources_by_role.return_value = create_mock_resources() + [create_mock_resource(2, "failing-resource")]
+        service.grant_temporary_access.side_effect = lambda resource_id, *args: raise_grant_failed() if resource_id == 2 else None
+        mocked_testbot.push_message("access to role Allowed Role")
+        mocked_testbot.push_message(f"yes {access_request_id}")
+        assert "valid request" in mocked_testbot.pop_message()
+        assert "assign request" in mocked_testbot.pop_message()
+        assert "Could not grant access to failing-resource" in mocked_testbot.pop_message()
+        assert "Could not grant access to failing-resource" in mocked_testbot.pop_message()
+        assert "Granting" in mocked_testbot.pop_message()
+        assert service.grant_temporary_access.call_count == 2
+
+    def test_when_all_grants_fail(self, mocked_testbot):
+        accessbot = mocked_testbot.bot.plugin_manager.plugins['AccessBot']
+        service = accessbot.get_sdm_service()
+        service.grant_temporary_access.side_effect = lambda *args: raise_grant_failed()
+        mocked_testbot.push_message("access to role Allowed Role")
+        mocked_testbot.push_message(f"yes {access_request_id}")
+        assert "valid request" in mocked_testbot.pop_message()
+        assert "assign request" in mocked_testbot.pop_message()
+        assert "couldn't grant access to any resource" in mocked_testbot.pop_message()
+
 class Test_allow_role_tag(ErrBotExtraTestSettings):
     @pytest.fixture
     def mocked_testbot_allow_true(self, testbot):
@@ -283,10 +313,16 @@ def create_mock_role(tags):
     return mock_role
 
 def create_mock_resources():
+    return [create_mock_resource(resource_id, resource_name)]
+
+def create_mock_resource(id, name):
     mock_resource = MagicMock()
-    mock_resource.id = resource_id
-    mock_resource.name = resource_name
-    return [mock_resource]
+    mock_resource.id = id
+    mock_resource.name = name
+    return mock_resource
 
 def raise_no_role_found(message = '', match = ''):
     raise NotFoundException('Sorry, cannot find that role!')
+
+def raise_grant_failed():
+    raise Exception('Grant failed: resource unavailable')
@@ -99,6 +99,7 @@ def create_sdm_service_mock():
     mock.get_account_by_email = MagicMock(return_value = create_account_mock(account_tags={}))
     mock.account_grant_exists = MagicMock(return_value = False)
     mock.get_all_resources = MagicMock(return_value = [DummyResource("Aaa", {}), DummyResource("Bbb", {})])
+    mock.iter_all_resources = MagicMock(side_effect = lambda filter = '': iter([DummyResource("Aaa", {}), DummyResource("Bbb", {})]))
     mock.get_all_roles = MagicMock(return_value = [DummyRole(role_name, {})])
     return mock
 
@@ -63,6 +63,18 @@ class Test_stale_grant_requests_cleaner(ErrBotExtraTestSettings):
         assert self.raw_messages[0].to.person == self.sdm_admin
         assert self.raw_messages[1].to.person == f"#{self.channel_name}"
 
+    def test_when_a_notification_fails_cleans_the_other_requests(self, mocked_testbot):
+        accessbot = mocked_testbot.bot.plugin_manager.plugins['AccessBot']
+        sender_id = accessbot.build_identifier(accessbot.config['SENDER_EMAIL_OVERRIDE'])
+        accessbot.enter_grant_request(access_request_id, Message(frm = sender_id), MagicMock(), MagicMock(), MagicMock())
+        accessbot.enter_grant_request("34CD", Message(frm = sender_id), MagicMock(), MagicMock(), MagicMock())
+        accessbot.send = MagicMock(side_effect = Exception("Send failed"))
+
+        PollerHelper(accessbot).stale_grant_requests_cleaner()
+
+        assert accessbot.get_grant_request_ids() == []
+        assert accessbot.send.call_count == 2
+
 class Test_stale_max_auto_approve_cleaner(ErrBotExtraTestSettings):
     @pytest.fixture
     def mocked_testbot(self, testbot):
@@ -31,18 +31,20 @@ class Test_show_resources(ErrBotExtraTestSettings):
         assert "Bbb (type: DummyResource)" in message
 
     def test_show_resources_command_with_filters(self, mocked_testbot, mocked_sdm_service):
-        mocked_sdm_service.get_all_resources.return_value = [DummyResource("Aaa", {})]
+        mocked_sdm_service.iter_all_resources.side_effect = None
+        mocked_sdm_service.iter_all_resources.return_value = iter([DummyResource("Aaa", {})])
         mocked_testbot.push_message("show available resources --filter name:Aaa")
         message = mocked_testbot.pop_message()
-        mocked_sdm_service.get_all_resources.assert_called_with(filter = 'name:Aaa')
+        mocked_sdm_service.iter_all_resources.assert_called_with(filter = 'name:Aaa')
         assert "Aaa (type: DummyResource)" in message
         assert "Bbb (type: DummyResource)" not in message
 
     def test_show_resources_command_with_filters_and_no_resources(self, mocked_testbot, mocked_sdm_service):
-        mocked_sdm_service.get_all_resources.return_value = []
+        mocked_sdm_service.iter_all_resources.side_effect = None
+        mocked_sdm_service.iter_all_resources.return_value = iter([])
         mocked_testbot.push_message("show available resources --filter name:Ccc")
         message = mocked_testbot.pop_message()
-        mocked_sdm_service.get_all_resources.assert_called_with(filter = 'name:Ccc')
+        mocked_sdm_service.iter_all_resources.assert_called_with(filter = 'name:Ccc')
         assert "no available resources" in message
         assert "Aaa (type: DummyResource)" not in message
         assert "Bbb (type: DummyResource)" not in message
@@ -205,7 +207,7 @@ def inject_mocks(testbot, config, resources = default_dummy_resources(), resourc
 
 def create_sdm_service_mock(resources, resources_by_role):
     service_mock = MagicMock()
-    service_mock.get_all_resources = MagicMock(return_value = resources)
+    service_mock.iter_all_resources = MagicMock(side_effect = lambda filter = '': iter(resources))
     service_mock.get_all_resources_by_role = MagicMock(return_value = resources_by_role)
     return service_mock
 
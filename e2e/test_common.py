@@ -83,7 +83,31 @@ def create_config():
         'APPROVERS_CHANNEL_TAG': None,
         'ALLOW_RESOURCE_ACCESS_REQUEST_RENEWAL': False,
         'ENABLE_BOT_STATE_HANDLING': False,
+        'GRANT_REQUESTS_STORE': 'json',
+        'GRANT_REQUESTS_SAVE_DELAY': 0,
+        'GRANT_REQUESTS_JOURNAL_FSYNC': 'never',
+        'GRANT_REQUESTS_JOURNAL_COMPACTION_THRESHOLD': 1000,
         'GRANT_TIMEOUT_LIMIT': None,
+        'GRANT_MAX_IN_FLIGHT': 5,
+        'CLIENT_POOL_SIZE': 1,
+        'CLIENT_KEEPALIVE_INTERVAL': 0,
+        'RESOURCE_CATALOG_TTL': 0,
+        'ROLE_CATALOG_TTL': 0,
+        'CATALOG_STALE_WHILE_REVALIDATE': False,
+        'ACCOUNT_DIRECTORY_TTL': 0,
+        'ACCOUNT_DIRECTORY_NEGATIVE_TTL': 0,
+        'GRANT_LEDGER_TTL': 0,
+        'BACKEND': 'strongdm',
+        'FAKE_BACKEND_DATA_FILE': None,
+        'FAKE_BACKEND_LATENCY': 0,
+        'FAKE_BACKEND_ERROR_RATE': 0,
+        'API_RATE_LIMIT': 0,
+        'API_RATE_LIMIT_BURST': 0,
+        'API_MAX_RETRIES': 0,
+        'API_CIRCUIT_BREAKER_THRESHOLD': 0,
+        'API_CIRCUIT_BREAKER_RESET_TIMEOUT': 30,
+        'WARM_UP': False,
+        'CATALOG_SNAPSHOT': False,
     }
 
 
@@ -25,7 +25,8 @@ class HealthCheckHelper:
         health_data = {
             'uptime': self.get_uptime(),
             'plugins_status': self.get_plugins_status(),
-            'strongdm_status': self.get_sdm_status()
+            'strongdm_status': self.get_sdm_status(),
+            'accessbot_ready': self.get_accessbot_ready(),
         }
         if 'slack' in self.__bot.bot_config.BOT_PLATFORM:
             health_data['slack_status'] = self.get_slack_status()
@@ -34,6 +35,10 @@ class HealthCheckHelper:
     def get_uptime(self):
         return (datetime.now() - self.health_plugin._bot.startup_time).seconds
 
+    def get_accessbot_ready(self):
+        accessbot = self.__bot.get_plugin('AccessBot')
+        return accessbot is not None and accessbot.is_ready()
+
     def get_plugins_status(self):
         plugins_status = {}
         for status_code, plugin_name in self.health_plugin.status_plugins(None, None)['plugins_statuses']:
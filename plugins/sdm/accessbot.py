@@ -1,5 +1,8 @@
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import chain
 from errbot import BotPlugin, re_botcmd, Message
 from errbot.core import ErrBot
@@ -7,11 +10,11 @@ from slack_sdk.errors import SlackApiError
 
 import config_template
 from enabled_commands_util import get_commands_aliases
-from lib import ApproveHelper, create_sdm_service, MSTeamsPlatform, PollerHelper, \
+from lib import ApproveHelper, create_sdm_service, CatalogSnapshot, MSTeamsPlatform, PollerHelper, \
     ShowResourcesHelper, ShowRolesHelper, SlackBoltPlatform, SlackRTMPlatform, \
     ResourceGrantHelper, RoleGrantHelper, DenyHelper, CommandAliasHelper, ArgumentsHelper, \
     GrantRequestHelper, WhoamiHelper, MetricsHelper
-from lib.util import normalize_utf8
+from lib.util import get_first_found, normalize_utf8
 from grant_request_type import GrantRequestType
 
 ACCESS_REGEX = r"access to (.+)"
@@ -22,6 +25,12 @@ SHOW_RESOURCES_REGEX = r"show available resources ?(.+)?"
 SHOW_ROLES_REGEX = r"show available roles"
 FIVE_SECONDS = 5
 ONE_MINUTE = 60
+ACCOUNT_LOOKUP_MAX_WORKERS = 4
+SDM_SERVICE_CONFIG_KEYS = ['CLIENT_POOL_SIZE', 'RESOURCE_CATALOG_TTL', 'ROLE_CATALOG_TTL', 'CATALOG_STALE_WHILE_REVALIDATE',
+                           'ACCOUNT_DIRECTORY_TTL', 'ACCOUNT_DIRECTORY_NEGATIVE_TTL', 'API_RATE_LIMIT', 'API_RATE_LIMIT_BURST',
+                           'API_MAX_RETRIES', 'API_CIRCUIT_BREAKER_THRESHOLD', 'API_CIRCUIT_BREAKER_RESET_TIMEOUT',
+                           'GRANT_LEDGER_TTL', 'BACKEND', 'FAKE_BACKEND_DATA_FILE', 'FAKE_BACKEND_LATENCY', 'FAKE_BACKEND_ERROR_RATE']
+SDM_CATALOGS_SNAPSHOT_FILE_NAME = 'sdm_catalogs_snapshot.json'
 MSG_ERROR_OCCURRED = "An error occurred, please contact your SDM admin"
 
 def get_callback_message_fn(bot):
@@ -65,6 +74,11 @@ class AccessBot(BotPlugin):
     __grant_requests_helper = None
     __metrics_helper = None
     __platform = None
+    __sdm_service = None
+    __sdm_service_lock = threading.Lock()
+    __account_lookup_executor = ThreadPoolExecutor(max_workers=ACCOUNT_LOOKUP_MAX_WORKERS, thread_name_prefix='account-lookup')
+    __admin_ids = None
+    __ready = None
 
     def activate(self):
         super().activate()
@@ -79,6 +93,11 @@ class AccessBot(BotPlugin):
         poller_helper = self.get_poller_helper()
         self.start_poller(FIVE_SECONDS, poller_helper.stale_grant_requests_cleaner)
         self.start_poller(ONE_MINUTE, poller_helper.stale_max_auto_approve_cleaner)
+        self.__start_sdm_client_keepalive()
+        self.__start_sdm_catalogs_refresh()
+        self.__restore_sdm_catalogs_snapshot()
+        self.__start_sdm_api_state_report()
+        self.__start_warm_up()
         self.__activate_webserver()
 
     def __init_state(self):
@@ -95,6 +114,115 @@ class AccessBot(BotPlugin):
         if admins_channel is not None:
             self.config['ADMINS_CHANNEL'] = self.format_channel_name(admins_channel.strip())
 
+    def __start_sdm_client_keepalive(self):
+        keepalive_interval = self.config.get('CLIENT_KEEPALIVE_INTERVAL')
+        if keepalive_interval:
+            self.start_poller(keepalive_interval, self.__keep_sdm_clients_alive, args=(keepalive_interval,))
+
+    def __keep_sdm_clients_alive(self, max_idle_time):
+        self.get_sdm_service().keepalive(max_idle_time)
+
+    def __start_sdm_catalogs_refresh(self):
+        if self.config.get('RESOURCE_CATALOG_TTL'):
+            self.start_poller(self.config['RESOURCE_CATALOG_TTL'], self.__refresh_sdm_resource_catalog)
+        if self.config.get('ROLE_CATALOG_TTL'):
+            self.start_poller(self.config['ROLE_CATALOG_TTL'], self.__refresh_sdm_role_catalog)
+        if self.config.get('ACCOUNT_DIRECTORY_TTL'):
+            self.start_poller(self.config['ACCOUNT_DIRECTORY_TTL'], self.__refresh_sdm_account_directory)
+        if self.config.get('GRANT_LEDGER_TTL'):
+            self.start_poller(self.config['GRANT_LEDGER_TTL'], self.__refresh_sdm_grant_ledger)
+
+    def __refresh_sdm_resource_catalog(self):
+        try:
+            self.get_sdm_service().refresh_resource_catalog()
+        except Exception as e:
+            self.log.error("##SDM## AccessBot.__refresh_sdm_resource_catalog failed: %s", str(e))
+
+    def __refresh_sdm_role_catalog(self):
+        try:
+            self.get_sdm_service().refresh_role_catalog()
+        except Exception as e:
+            self.log.error("##SDM## AccessBot.__refresh_sdm_role_catalog failed: %s", str(e))
+
+    def __refresh_sdm_account_directory(self):
+        try:
+            self.get_sdm_service().refresh_account_directory()
+        except Exception as e:
+            self.log.error("##SDM## AccessBot.__refresh_sdm_account_directory failed: %s", str(e))
+
+    def __refresh_sdm_grant_ledger(self):
+        try:
+            self.get_sdm_service().refresh_grant_ledger()
+        except Exception as e:
+            self.log.error("##SDM## AccessBot.__refresh_sdm_grant_ledger failed: %s", str(e))
+
+    def __get_sdm_catalogs_snapshot(self):
+        return CatalogSnapshot(os.path.join(self._bot.bot_config.BOT_DATA_DIR, SDM_CATALOGS_SNAPSHOT_FILE_NAME), self.log)
+
+    def __restore_sdm_catalogs_snapshot(self):
+        if not self.config.get('CATALOG_SNAPSHOT'):
+            return
+        self.get_sdm_service().import_catalogs(self.__get_sdm_catalogs_snapshot().load())
+        # The snapshot is served until the catalogs are reconciled with the API
+        threading.Thread(target=self.__reconcile_sdm_catalogs, name="accessbot-catalogs-reconcile", daemon=True).start()
+        self.start_poller(ONE_MINUTE, self.__save_sdm_catalogs_snapshot)
+
+    def __reconcile_sdm_catalogs(self):
+        self.__refresh_sdm_resource_catalog()
+        self.__refresh_sdm_role_catalog()
+        self.__refresh_sdm_account_directory()
+        self.__save_sdm_catalogs_snapshot()
+
+    def __save_sdm_catalogs_snapshot(self):
+        try:
+            self.__get_sdm_catalogs_snapshot().save(self.get_sdm_service().export_catalogs())
+        except Exception as e:
+            self.log.error("##SDM## AccessBot.__save_sdm_catalogs_snapshot failed: %s", str(e))
+
+    def __start_sdm_api_state_report(self):
+        if self.config.get('API_RATE_LIMIT') or self.config.get('API_MAX_RETRIES') or self.config.get('API_CIRCUIT_BREAKER_THRESHOLD'):
+            self.start_poller(FIVE_SECONDS, self.__report_sdm_api_state)
+
+    def __report_sdm_api_state(self):
+        self.__metrics_helper.update_sdm_api_state(self.get_sdm_service().get_api_state())
+
+    def __start_warm_up(self):
+        self.__ready = threading.Event()
+        if not self.config.get('WARM_UP'):
+            self.__ready.set()
+            return
+        # Activation is not blocked, the bot reports it's ready once the warm-up finishes
+        threading.Thread(target=self.__warm_up, name="accessbot-warm-up", daemon=True).start()
+
+    def __warm_up(self):
+        started_at = time.time()
+        for step_name, step in self.__get_warm_up_steps():
+            try:
+                step()
+            except Exception as e:
+                self.log.warning("##SDM## AccessBot.__warm_up %s failed: %s", step_name, str(e))
+        self.__ready.set()
+        self.log.info("##SDM## AccessBot.__warm_up finished in %.2f seconds", time.time() - started_at)
+
+    def __get_warm_up_steps(self):
+        # Only the data that is kept in memory is preloaded, otherwise the lookups would be discarded
+        sdm_service = self.get_sdm_service()
+        steps = []
+        if self.config.get('RESOURCE_CATALOG_TTL'):
+            steps.append(('resources', sdm_service.get_all_resources))
+        if self.config.get('ROLE_CATALOG_TTL'):
+            steps.append(('roles', sdm_service.get_all_roles))
+        control_resources_role_name = self.config.get('CONTROL_RESOURCES_ROLE_NAME')
+        if control_resources_role_name and self.config.get('ROLE_CATALOG_TTL'):
+            steps.append(('control resources role', lambda: sdm_service.get_all_resources_by_role(control_resources_role_name)))
+        if self.config.get('ACCOUNT_DIRECTORY_TTL'):
+            steps.append(('accounts', sdm_service.refresh_account_directory))
+        steps.append(('admin identifiers', self.get_admin_ids))
+        return steps
+
+    def is_ready(self):
+        return self.__ready is not None and self.__ready.is_set()
+
     def __activate_webserver(self):
         webserver = self.get_plugin('Webserver')
         webserver.configure(webserver.get_configuration_template())
@@ -110,6 +238,10 @@ class AccessBot(BotPlugin):
         utils.activate()
 
     def deactivate(self):
+        if self.config and self.config.get('CATALOG_SNAPSHOT'):
+            self.__save_sdm_catalogs_snapshot()
+        if self.__grant_requests_helper is not None:
+            self.__grant_requests_helper.flush_state()
         self.get_plugin('Webserver').deactivate()
         super().deactivate()
 
@@ -132,6 +264,7 @@ class AccessBot(BotPlugin):
             config = {}
         super(AccessBot, self).configure(config)
         self.__check_new_bot_state_handling_config(previous_config)
+        self.__check_new_sdm_service_config(previous_config)
 
     def __check_new_bot_state_handling_config(self, previous_config):
         if self.__grant_requests_helper is None:
@@ -141,6 +274,16 @@ class AccessBot(BotPlugin):
             self.__grant_requests_helper.clear_cached_state()
         elif enable_bot_state_handling and not previous_config.get('ENABLE_BOT_STATE_HANDLING'):
             self.__grant_requests_helper.save_state()
+        elif enable_bot_state_handling and self.config.get('GRANT_REQUESTS_STORE') != previous_config.get('GRANT_REQUESTS_STORE'):
+            self.__grant_requests_helper.switch_store()
+
+    def __check_new_sdm_service_config(self, previous_config):
+        if any(self.config.get(key) != previous_config.get(key) for key in SDM_SERVICE_CONFIG_KEYS):
+            # The service will be created again with the new configuration on next use
+            with self.__sdm_service_lock:
+                previous_sdm_service, self.__sdm_service = self.__sdm_service, None
+            if previous_sdm_service is not None:
+                previous_sdm_service.close()
 
     def update_access_control_admins(self):
         self._bot.bot_config.BOT_ADMINS.clear()
@@ -294,7 +437,12 @@ class AccessBot(BotPlugin):
         return os.getenv("SDM_API_SECRET_KEY")
 
     def get_sdm_service(self):
-        return create_sdm_service(self.get_api_access_key(), self.get_api_secret_key(), self.log)
+        # The service (and its client channels) is shared by all helpers and handler threads
+        if self.__sdm_service is None:
+            with self.__sdm_service_lock:
+                if self.__sdm_service is None:
+                    self.__sdm_service = create_sdm_service(self.get_api_access_key(), self.get_api_secret_key(), self.log, config=self.config)
+        return self.__sdm_service
 
     def get_resource_grant_helper(self):
         return ResourceGrantHelper(self)
@@ -330,7 +478,13 @@ class AccessBot(BotPlugin):
         return self.__metrics_helper
 
     def get_admin_ids(self):
-        return self.__platform.get_admin_ids()
+        # Building the identifiers might call the platform API, so they are kept until the admins change
+        admins = tuple(self.get_admins())
+        admin_ids = self.__admin_ids
+        if admin_ids is None or admin_ids[0] != admins:
+            admin_ids = (admins, self.__platform.get_admin_ids())
+            self.__admin_ids = admin_ids
+        return list(admin_ids[1])
 
     def enter_grant_request(self, request_id: str, message, sdm_object, sdm_account, grant_request_type: GrantRequestType, flags: dict = None):
         self.__grant_requests_helper.add(request_id, message, sdm_object, sdm_account, grant_request_type, flags)
@@ -349,6 +503,9 @@ class AccessBot(BotPlugin):
     def get_grant_request_ids(self):
         return self.__grant_requests_helper.get_request_ids()
 
+    def get_stale_grant_request_ids(self, timeout):
+        return self.__grant_requests_helper.get_stale_request_ids(timeout)
+
     def add_thumbsup_reaction(self, message):
         if self._bot.mode != 'test':
             self._bot.add_reaction(message, "thumbsup")
@@ -453,14 +610,8 @@ class AccessBot(BotPlugin):
             self.get_sender_email(message.frm),
             *self.__get_account_alternative_emails(message.frm)
         ]
-        for index in range(len(emails)):
-            try:
-                email = emails[index]
-                return self.get_sdm_service().get_account_by_email(email)
-            except Exception as e:
-                if index == len(emails) - 1:
-                    raise e
-        return None
+        # The alternative emails are only looked up, concurrently, when the primary one has no account
+        return get_first_found(emails, self.get_sdm_service().get_account_by_email, self.__account_lookup_executor)
 
     def get_ms_teams_channel_by_id(self, team_id, channel_id):
         return self._bot.get_channel_by_id(team_id, channel_id)
@@ -34,7 +34,31 @@ _INSTANCE = {
     'APPROVERS_CHANNEL_TAG': os.getenv("SDM_APPROVERS_CHANNEL_TAG"),
     'ALLOW_RESOURCE_ACCESS_REQUEST_RENEWAL':  str(os.getenv("SDM_ALLOW_RESOURCE_ACCESS_REQUEST_RENEWAL", "")).lower() == 'true',
     'ENABLE_BOT_STATE_HANDLING': str(os.getenv("SDM_ENABLE_BOT_STATE_HANDLING", "")).lower() == 'true',
+    'GRANT_REQUESTS_STORE': os.getenv("SDM_GRANT_REQUESTS_STORE", "json").lower(),
+    'GRANT_REQUESTS_SAVE_DELAY': float(os.getenv("SDM_GRANT_REQUESTS_SAVE_DELAY", "0")),
+    'GRANT_REQUESTS_JOURNAL_FSYNC': os.getenv("SDM_GRANT_REQUESTS_JOURNAL_FSYNC", "never").lower(),
+    'GRANT_REQUESTS_JOURNAL_COMPACTION_THRESHOLD': int(os.getenv("SDM_GRANT_REQUESTS_JOURNAL_COMPACTION_THRESHOLD", "1000")),
     'GRANT_TIMEOUT_LIMIT': os.getenv('SDM_GRANT_TIMEOUT_LIMIT'),
+    'GRANT_MAX_IN_FLIGHT': int(os.getenv("SDM_GRANT_MAX_IN_FLIGHT", "5")),
+    'CLIENT_POOL_SIZE': int(os.getenv("SDM_CLIENT_POOL_SIZE", "1")),
+    'CLIENT_KEEPALIVE_INTERVAL': int(os.getenv("SDM_CLIENT_KEEPALIVE_INTERVAL", "0")),
+    'RESOURCE_CATALOG_TTL': int(os.getenv("SDM_RESOURCE_CATALOG_TTL", "0")),
+    'ROLE_CATALOG_TTL': int(os.getenv("SDM_ROLE_CATALOG_TTL", "0")),
+    'CATALOG_STALE_WHILE_REVALIDATE': str(os.getenv("SDM_CATALOG_STALE_WHILE_REVALIDATE", "")).lower() == 'true',
+    'ACCOUNT_DIRECTORY_TTL': int(os.getenv("SDM_ACCOUNT_DIRECTORY_TTL", "0")),
+    'ACCOUNT_DIRECTORY_NEGATIVE_TTL': int(os.getenv("SDM_ACCOUNT_DIRECTORY_NEGATIVE_TTL", "0")),
+    'GRANT_LEDGER_TTL': int(os.getenv("SDM_GRANT_LEDGER_TTL", "0")),
+    'BACKEND': os.getenv("SDM_BACKEND", "strongdm").lower(),
+    'FAKE_BACKEND_DATA_FILE': os.getenv("SDM_FAKE_BACKEND_DATA_FILE"),
+    'FAKE_BACKEND_LATENCY': int(os.getenv("SDM_FAKE_BACKEND_LATENCY", "0")),
+    'FAKE_BACKEND_ERROR_RATE': float(os.getenv("SDM_FAKE_BACKEND_ERROR_RATE", "0")),
+    'API_RATE_LIMIT': float(os.getenv("SDM_API_RATE_LIMIT", "0")),
+    'API_RATE_LIMIT_BURST': int(os.getenv("SDM_API_RATE_LIMIT_BURST", "0")),
+    'API_MAX_RETRIES': int(os.getenv("SDM_API_MAX_RETRIES", "0")),
+    'API_CIRCUIT_BREAKER_THRESHOLD': int(os.getenv("SDM_API_CIRCUIT_BREAKER_THRESHOLD", "0")),
+    'API_CIRCUIT_BREAKER_RESET_TIMEOUT': int(os.getenv("SDM_API_CIRCUIT_BREAKER_RESET_TIMEOUT", "30")),
+    'WARM_UP': str(os.getenv("SDM_WARM_UP", "")).lower() == 'true',
+    'CATALOG_SNAPSHOT': str(os.getenv("SDM_CATALOG_SNAPSHOT", "")).lower() == 'true',
 }
 
 def get():
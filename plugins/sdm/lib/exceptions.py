@@ -6,3 +6,6 @@ class RoleNotAllowedException(Exception):
 
 class PermissionDeniedException(Exception):
     pass
+
+class SdmApiUnavailableException(Exception):
+    pass
@@ -9,6 +9,7 @@ from .show_resources_helper import *
 from .show_roles_helper import *
 from .command_alias_helper import *
 from .arguments_helper import *
+from .grant_request_store import *
 from .grant_request_helper import *
 from .whoami_helper import *
 from .metrics_helper import *
@@ -2,6 +2,7 @@ import datetime
 
 from grant_request_type import GrantRequestType
 from .base_evaluate_request_helper import BaseEvaluateRequestHelper
+from ..service import AsyncSdmService, run_sync
 from ..util import convert_duration_flag_to_timedelta, get_formatted_duration_string
 
 
@@ -9,42 +10,45 @@ class ApproveHelper(BaseEvaluateRequestHelper):
     def __init__(self, bot):
         super().__init__(bot)
         self.__sdm_service = bot.get_sdm_service()
+        self.__async_sdm_service = AsyncSdmService(self.__sdm_service, max_concurrency=bot.config['GRANT_MAX_IN_FLIGHT'])
 
     def evaluate(self, request_id, **kwargs):
         grant_request = self._bot.get_grant_request(request_id)
-        if grant_request['type'] == GrantRequestType.ASSIGN_ROLE.value:
+        if grant_request.type == GrantRequestType.ASSIGN_ROLE.value:
             yield from self.__approve_assign_role(grant_request)
         else:
             yield from self.__approve_access_resource(grant_request)
-        message = grant_request['message']
+        message = grant_request.message
         if kwargs.get('is_auto_approve') != None and kwargs['is_auto_approve'] == True:
             yield from self.__register_auto_approve_use(grant_request)
             self._notify_requester(message.frm, message, f'**@{message.frm.nick}**: Request auto-approved.')
         else:
-            self._notify_requester(message.frm, message, f'**@{message.frm.nick}**: Request "{grant_request["id"]}" approved.')
+            self._notify_requester(message.frm, message, f'**@{message.frm.nick}**: Request "{grant_request.id}" approved.')
 
     def __approve_assign_role(self, grant_request):
-        self._bot.remove_grant_request(grant_request['id'])
+        self._bot.remove_grant_request(grant_request.id)
         try:
-            yield from self.__grant_temporal_access_by_role(grant_request['sdm_object'].name, grant_request['sdm_account'].id)
+            failed_grants = yield from self.__grant_temporal_access_by_role(grant_request.sdm_object.name, grant_request.sdm_account.id)
         except Exception as e:
             yield str(e)
             return
-        self._bot.add_thumbsup_reaction(grant_request['message'])
+        if len(failed_grants) > 0:
+            yield from self.__notify_failed_grants(grant_request, failed_grants)
+        self._bot.add_thumbsup_reaction(grant_request.message)
         yield from self.__notify_assign_role_request_granted(grant_request)
         self._bot.get_metrics_helper().increment_manual_approvals()
 
     def __approve_access_resource(self, grant_request):
-        duration = grant_request['flags'].get('duration')
-        resource = grant_request['sdm_object']
-        sdm_account = grant_request['sdm_account']
+        duration = grant_request.flags.get('duration')
+        resource = grant_request.sdm_object
+        sdm_account = grant_request.sdm_account
         account_grant_exists = self.__sdm_service.account_grant_exists(resource, sdm_account.id)
         needs_renewal = self._bot.config['ALLOW_RESOURCE_ACCESS_REQUEST_RENEWAL'] and account_grant_exists
         if needs_renewal:
             self.__sdm_service.delete_account_grant(resource.id, sdm_account.id)
-        self.__grant_temporal_access(grant_request['sdm_object'], grant_request['sdm_account'].id, duration)
-        self._bot.add_thumbsup_reaction(grant_request['message'])
-        self._bot.remove_grant_request(grant_request['id'])
+        self.__grant_temporal_access(grant_request.sdm_object, grant_request.sdm_account.id, duration)
+        self._bot.add_thumbsup_reaction(grant_request.message)
+        self._bot.remove_grant_request(grant_request.id)
         yield from self.__notify_access_request_granted(grant_request, resource, duration, needs_renewal)
         self._bot.get_metrics_helper().increment_manual_approvals()
 
@@ -52,9 +56,7 @@ class ApproveHelper(BaseEvaluateRequestHelper):
         grant_start_from = datetime.datetime.now(datetime.timezone.utc)
         grant_valid_until = grant_start_from + datetime.timedelta(minutes=self._bot.config['GRANT_TIMEOUT'])
         resources = self.__sdm_service.get_all_resources_by_role(role_name)
-        granted_resources_via_account = self.__sdm_service.get_granted_resources_via_account(resources, account_id)
-        granted_resources_via_role = self.__sdm_service.get_granted_resources_via_role(resources, account_id)
-        granted_resources = self.__remove_duplicated_resources(granted_resources_via_account + granted_resources_via_role)
+        granted_resources = run_sync(self.__async_sdm_service.get_granted_resources(resources, account_id))
         if len(granted_resources) == len(resources):
             raise Exception(f"The user already have access to all resources assigned to the role {role_name}")
         if len(granted_resources) > 0:
@@ -66,8 +68,31 @@ class ApproveHelper(BaseEvaluateRequestHelper):
             yield granted_resources_text
         # TODO Yield with a specific error when there are no resources to grant
         not_granted_resources = self.__get_not_granted_resources(resources, granted_resources)
-        for resource in not_granted_resources:
-            self.__sdm_service.grant_temporary_access(resource.id, account_id, grant_start_from, grant_valid_until)
+        failed_grants = self.__grant_temporary_access_to_resources(not_granted_resources, account_id, grant_start_from, grant_valid_until)
+        if len(failed_grants) == len(not_granted_resources):
+            raise Exception(f"Sorry, I couldn't grant access to any resource in the role {role_name}: {failed_grants[0][1]}")
+        return failed_grants
+
+    def __grant_temporary_access_to_resources(self, resources, account_id, grant_start_from, grant_valid_until):
+        """
+        Creates the account grants concurrently, returning a list of (resource, error) for the ones that failed
+        """
+        failed_grants = run_sync(self.__async_sdm_service.grant_temporary_access_to_resources(
+            resources, account_id, grant_start_from, grant_valid_until
+        ))
+        for resource, error in failed_grants:
+            self._bot.log.error("##SDM## ApproveHelper grant failed for resource_id: %s account_id: %s %s", resource.id, account_id, str(error))
+        return [(resource, str(error)) for resource, error in failed_grants]
+
+    def __notify_failed_grants(self, grant_request, failed_grants):
+        message = grant_request.message
+        failed_grants_text = ''
+        for resource, error in failed_grants:
+            if failed_grants_text:
+                failed_grants_text = self._bot.format_breakline(failed_grants_text)
+            failed_grants_text += f"Could not grant access to {resource.name}: {error}"
+        self._notify_requester(message.frm, message, failed_grants_text)
+        yield failed_grants_text
 
     def __grant_temporal_access(self, resource, account_id: str, duration: str):
         grant_start_from = datetime.datetime.now(datetime.timezone.utc)
@@ -75,8 +100,8 @@ class ApproveHelper(BaseEvaluateRequestHelper):
         self.__sdm_service.grant_temporary_access(resource.id, account_id, grant_start_from, grant_valid_until)
 
     def __notify_access_request_granted(self, grant_request, resource, duration: str, is_renewal: bool):
-        message = grant_request['message']
-        sender_email = grant_request['sdm_account'].email
+        message = grant_request.message
+        sender_email = grant_request.sdm_account.email
         sender_nick = self._bot.get_sender_nick(message.frm)
         if duration:
             duration_flag_timedelta = convert_duration_flag_to_timedelta(duration)
@@ -90,9 +115,9 @@ class ApproveHelper(BaseEvaluateRequestHelper):
         yield f"{sender_nick}: Granting {sender_email} access to '{resource.name}' for {grant_timeout} minutes"
 
     def __notify_assign_role_request_granted(self, grant_request):
-        message = grant_request['message']
-        role_name = grant_request['sdm_object'].name
-        sender_email = grant_request['sdm_account'].email
+        message = grant_request.message
+        role_name = grant_request.sdm_object.name
+        sender_email = grant_request.sdm_account.email
         sender_nick = self._bot.get_sender_nick(message.frm)
         yield f"{sender_nick}: Granting {sender_email} access to resources in role '{role_name}' for {self._bot.config['GRANT_TIMEOUT']} minutes"
 
@@ -100,7 +125,7 @@ class ApproveHelper(BaseEvaluateRequestHelper):
         max_auto_approve_uses = self._bot.config['MAX_AUTO_APPROVE_USES']
         if not max_auto_approve_uses:
             return
-        requester_id = grant_request['message'].frm.person
+        requester_id = grant_request.message.frm.person
         auto_approve_uses = self._bot.increment_auto_approve_use(requester_id)
         yield f"You have {max_auto_approve_uses - auto_approve_uses} remaining auto-approve uses"
 
@@ -120,11 +145,3 @@ class ApproveHelper(BaseEvaluateRequestHelper):
         """
         granted_resource_ids = [granted_resource.id for granted_resource in granted_resources]
         return [resource for resource in sdm_resources if resource.id not in granted_resource_ids]
-
-    def __remove_duplicated_resources(self, resources):
-        mapped_resources_by_id = {}
-        for resource in resources:
-            if not mapped_resources_by_id.get(resource.id):
-                mapped_resources_by_id[resource.id] = resource
-        distinct_resources = mapped_resources_by_id.values()
-        return distinct_resources
@@ -29,17 +29,18 @@ class BaseEvaluateRequestHelper(ABC):
             return
 
         self._bot.log.info("##SDM## %s EvaluateRequestHelper.execute concluding evaluation for access request id: %s", execution_id, request_id)
-        yield from self.evaluate(request_id, admin=user, reason=reason)
+        with self._bot.get_sdm_service().request_scope(execution_id):
+            yield from self.evaluate(request_id, admin=user, reason=reason)
 
     def __is_allowed_to_self_evaluate(self, request_id, evaluator):
         grant_request = self._bot.get_grant_request(request_id)
-        is_self_approve = grant_request['sdm_account'].email == evaluator.email
+        is_self_approve = grant_request.sdm_account.email == evaluator.email
         return not is_self_approve or self._bot.get_user_nick(evaluator) in self._bot.get_admins()
 
     def __is_allowed_to_evaluate(self, request_id, evaluator):
         grant_request = self._bot.get_grant_request(request_id)
-        sdm_account = grant_request['sdm_account']
-        sdm_object = grant_request['sdm_object']
+        sdm_account = grant_request.sdm_account
+        sdm_object = grant_request.sdm_object
         approvers_channel = get_approvers_channel(self._bot.config, sdm_object) or get_approvers_channel(self._bot.config, sdm_account)
         if approvers_channel is not None:
             return self.__is_valid_approver_channel(evaluator, self._bot.format_channel_name(approvers_channel))
@@ -27,12 +27,13 @@ class BaseGrantHelper(ABC):
         operation_desc = self.get_operation_desc()
         self.__bot.log.info("##SDM## %s GrantHelper.access_%s new %s request for entity_name: %s", execution_id, self.__grant_type, operation_desc, searched_name)
         try:
-            sdm_resource = self.get_item_by_name(searched_name, execution_id)
-            sdm_account = self.__get_account(message)
-            self.__check_access_availability(sdm_resource, sdm_account, execution_id)
-            self.check_permission(sdm_resource, sdm_account, searched_name)
-            request_id = self.generate_grant_request_id()
-            yield from self.__grant_access(message, sdm_resource, sdm_account, execution_id, request_id, flags)
+            with self.__sdm_service.request_scope(execution_id):
+                sdm_resource = self.get_item_by_name(searched_name, execution_id)
+                sdm_account = self.__get_account(message)
+                self.__check_access_availability(sdm_resource, sdm_account, execution_id)
+                self.check_permission(sdm_resource, sdm_account, searched_name)
+                request_id = self.generate_grant_request_id()
+                yield from self.__grant_access(message, sdm_resource, sdm_account, execution_id, request_id, flags)
         except NotFoundException as ex:
             self.__bot.log.error("##SDM## %s GrantHelper.access_%s %s request failed %s", execution_id, self.__grant_type, operation_desc, str(ex))
             yield str(ex)
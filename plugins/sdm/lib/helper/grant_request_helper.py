@@ -1,131 +1,231 @@
-import json
 import time
-import os
-from dataclasses import make_dataclass
+from types import SimpleNamespace
 
+from errbot.backends.base import RoomDoesNotExistError, UserDoesNotExistError
 from strongdm.models import User
 
 from grant_request_type import GrantRequestType
 from lib.models.base_resource import BaseResource
+from lib.models.grant_request import GrantRequest, GrantRequestMessage
+from .grant_request_index import GrantRequestIndex
+from .grant_request_store import JournalGrantRequestStore, JsonGrantRequestStore, SqliteGrantRequestStore, \
+    JOURNAL_FSYNC_ALWAYS, STORE_JOURNAL, STORE_SQLITE
+
+def is_permanent_hydration_error(ex):
+    """
+    Can the restored request never be built, i.e. its user or channel doesn't exist anymore or its data is invalid.
+    Other errors (e.g. rate limits or network errors from the chat platform) may go away when retrying
+    """
+    return isinstance(ex, (UserDoesNotExistError, RoomDoesNotExistError, KeyError, TypeError, ValueError))
 
 class GrantRequestHelper:
     __grant_requests = {}
     # INFO: we might want to make it configurable
     folder_path = "./data/grant_requests"
     file_path = f"{folder_path}/state.json"
+    db_file_path = f"{folder_path}/state.db"
+    journal_file_path = f"{folder_path}/state.journal"
 
     def __init__(self, bot):
         self._bot = bot
+        self.__index = GrantRequestIndex()
+        self.__store = self.__create_store()
         self.__restore_state()
 
+    def __create_store(self):
+        store_type = self._bot.config.get('GRANT_REQUESTS_STORE')
+        if store_type == STORE_SQLITE:
+            return SqliteGrantRequestStore(self.folder_path, self.db_file_path, self.__create_journal_store(), self._bot.log)
+        if store_type == STORE_JOURNAL:
+            return self.__create_journal_store()
+        return JsonGrantRequestStore(self.folder_path, self.file_path, self._bot.log, save_delay=self._bot.config.get('GRANT_REQUESTS_SAVE_DELAY') or 0)
+
+    def __create_journal_store(self):
+        return JournalGrantRequestStore(
+            self.folder_path,
+            self.file_path,
+            self.journal_file_path,
+            self._bot.log,
+            fsync=self._bot.config.get('GRANT_REQUESTS_JOURNAL_FSYNC') == JOURNAL_FSYNC_ALWAYS,
+            compaction_threshold=self._bot.config.get('GRANT_REQUESTS_JOURNAL_COMPACTION_THRESHOLD') or 1000
+        )
+
+    def switch_store(self):
+        """
+        Start using the store in the current config, moving the pending requests there
+        """
+        if not self.__can_perform_state_handling():
+            self.__store = self.__create_store()
+            return
+        try:
+            store = self.__create_store()
+            store.save_all([
+                self.__serialize_grant_request(grant_request)
+                for grant_request in self.__grant_requests.values()
+            ])
+            store.flush()
+        except Exception as e:
+            self._bot.log.error("An error occurred while moving the grant requests to the new store, keeping the previous one: %s", str(e))
+            return
+        previous_store, self.__store = self.__store, store
+        try:
+            # The JSON and journal stores share the state file, which is now owned by the new store
+            previous_store.clear(keep_file_paths=store.get_file_paths())
+        except Exception as e:
+            self._bot.log.error("An error occurred while clearing the previous grant requests store: %s", str(e))
+
     def save_state(self):
         if not self.__can_perform_state_handling():
             return
         try:
-            if not os.path.exists(self.folder_path):
-                os.mkdir(self.folder_path)
-            with open(self.file_path, "w") as state:
-                current_grant_requests = self.__grant_requests.values()
-                grant_requests_list = [
-                    self.__serialize_grant_request(grant_request)
-                    for grant_request in current_grant_requests
-                ]
-                state.write(json.dumps(grant_requests_list))
+            self.__store.save_all([
+                self.__serialize_grant_request(grant_request)
+                for grant_request in self.__grant_requests.values()
+            ])
         except Exception as e:
-            self._bot.log.error("An error occurred while saving the grant requests state: ", str(e))
+            self._bot.log.error("An error occurred while saving the grant requests state: %s", str(e))
+
+    def flush_state(self):
+        """
+        Write the changes still pending in the store, meant to be called before shutting down
+        """
+        if not self.__can_perform_state_handling():
+            return
+        try:
+            self.__store.flush()
+        except Exception as e:
+            self._bot.log.error("An error occurred while flushing the grant requests state: %s", str(e))
+
+    def __save_grant_request(self, request_id):
+        if not self.__can_perform_state_handling():
+            return
+        try:
+            self.__store.put(self.__serialize_grant_request(self.__grant_requests[request_id]))
+        except Exception as e:
+            self._bot.log.error("An error occurred while saving the grant request %s: %s", request_id, str(e))
+
+    def __delete_grant_request(self, request_id):
+        if not self.__can_perform_state_handling():
+            return
+        try:
+            self.__store.delete(request_id)
+        except Exception as e:
+            self._bot.log.error("An error occurred while deleting the grant request %s: %s", request_id, str(e))
 
     def __serialize_grant_request(self, grant_request):
-        msg_to = grant_request['message'].to
+        if not grant_request.is_hydrated():
+            return grant_request.source
+        message = grant_request.message
+        msg_to = message.to
         serialized_extras = {}
-        if grant_request['message'].extras.get('conversation'):
-            serialized_extras['conversation'] = self.__conversation_to_dict(grant_request['message'].extras['conversation'])
+        if message.extras.get('conversation'):
+            serialized_extras['conversation'] = self.__conversation_to_dict(message.extras['conversation'])
         else:
-            serialized_extras = grant_request['message'].extras
+            serialized_extras = message.extras
         return {
-            'id': grant_request['id'],
-            'timestamp': grant_request['timestamp'],
+            'id': grant_request.id,
+            'timestamp': grant_request.timestamp,
             'message': {
-                'frm': grant_request['message'].frm.__str__(),
+                'frm': message.frm.__str__(),
                 'to': {
                     'identifier': msg_to.__str__(),
                     'channelid': msg_to.channelid if hasattr(msg_to, 'channelid') else None
                 },
-                'body': grant_request['message'].body,
+                'body': message.body,
                 'extras': serialized_extras,
-                'is_group': grant_request['message'].is_group,
+                'is_group': message.is_group,
             },
-            'sdm_object': self.__sdm_model_to_dict(grant_request['sdm_object']),
-            'sdm_account': self.__sdm_model_to_dict(grant_request['sdm_account']),
-            'type': grant_request['type'],
-            'flags': grant_request['flags'],
+            'sdm_object': self.__sdm_model_to_dict(grant_request.sdm_object),
+            'sdm_account': self.__sdm_model_to_dict(grant_request.sdm_account),
+            'type': grant_request.type,
+            'flags': grant_request.flags,
         }
 
     def __restore_state(self):
         self.__grant_requests = {}
         if not self.__can_perform_state_handling():
             return
-        if not os.path.isfile(self.file_path):
-            return
         try:
-            state_text = open(self.file_path, "r").read()
-            if state_text == "":
-                return
-            grant_requests_list = json.loads(state_text)
-            for grant_request in grant_requests_list:
-                self.__grant_requests[grant_request['id']] = self.__deserialize_grant_request(grant_request)
+            for grant_request in self.__store.load():
+                # Only the lightweight fields are restored, the message and SDM objects are built on first use
+                self.__grant_requests[grant_request['id']] = GrantRequest.lazy(grant_request, self.__hydrate_grant_request)
+                self.__index.add(grant_request['id'], grant_request['timestamp'])
         except Exception as e:
-            self._bot.log.error("An error occurred while restoring the grant requests state: ", str(e))
-
-    def __deserialize_grant_request(self, source_grant_request):
-        grant_request = dict(source_grant_request)
-        grant_request['message'] = self.__build_grant_request_message(grant_request)
-        grant_request['sdm_account'] = User.from_dict(grant_request['sdm_account'])
-        grant_request['sdm_object'] = BaseResource(grant_request['sdm_object'])
-        return grant_request
-
-    def __build_grant_request_message(self, grant_request):
-        message_dict = {
-            'frm': self._bot.build_identifier(grant_request['message']['frm']),
-            'to': self._bot.build_identifier(grant_request['message']['to']['identifier']),
-            'body': grant_request['message'].get('body'),
-            'extras': grant_request['message'].get('extras'),
-            'is_group': grant_request['message'].get('is_group'),
-        }
-        if message_dict['extras'].get('conversation'):
-            conversation_dict = message_dict['extras'].get('conversation')
-            Conversation = make_dataclass('conversation', conversation_dict.keys())
-            message_dict['extras']['conversation'] = Conversation(**conversation_dict)
-        message_dict['to']._channelid = grant_request['message']['to'].get('channelid')
-        Message = make_dataclass('Message', message_dict.keys())
-        return Message(**message_dict)
+            self._bot.log.error("An error occurred while restoring the grant requests state: %s", str(e))
+
+    def __hydrate_grant_request(self, grant_request):
+        return (
+            self.__build_grant_request_message(grant_request['message']),
+            BaseResource(grant_request['sdm_object']),
+            User.from_dict(grant_request['sdm_account']),
+        )
+
+    def __build_grant_request_message(self, message):
+        extras = dict(message.get('extras') or {})
+        if extras.get('conversation'):
+            extras['conversation'] = SimpleNamespace(**extras['conversation'])
+        msg_to = self._bot.build_identifier(message['to']['identifier'])
+        msg_to._channelid = message['to'].get('channelid')
+        return GrantRequestMessage(
+            self._bot.build_identifier(message['frm']),
+            msg_to,
+            body=message.get('body'),
+            extras=extras,
+            is_group=message.get('is_group'),
+        )
 
     def __can_perform_state_handling(self):
         return self._bot.mode != 'test' and self._bot.config["ENABLE_BOT_STATE_HANDLING"]
 
     def add(self, request_id: str, message, sdm_object, sdm_account, grant_request_type: GrantRequestType, flags: dict = None):
-        self.__grant_requests[request_id] = {
-            'id': request_id,
-            'timestamp': time.time(),
-            'message': message,
-            'sdm_object': sdm_object,
-            'sdm_account': sdm_account,
-            'type': grant_request_type.value,
-            'flags': flags,
-        }
-        self.save_state()
+        self.__grant_requests[request_id] = GrantRequest(
+            request_id,
+            time.time(),
+            GrantRequestMessage.from_message(message),
+            sdm_object,
+            sdm_account,
+            grant_request_type.value,
+            flags,
+        )
+        self.__index.add(request_id, self.__grant_requests[request_id].timestamp)
+        self.__save_grant_request(request_id)
 
     def get(self, request_id: str):
-        return self.__grant_requests.get(request_id)
+        """
+        Return the grant request, or None when it doesn't exist or it's a restored request that can't be hydrated yet.
+        Restored requests that will never be hydrated are discarded, the others are hydrated again on their next use
+        """
+        grant_request = self.__grant_requests.get(request_id)
+        if grant_request is None or grant_request.is_hydrated():
+            return grant_request
+        try:
+            grant_request.hydrate()
+            return grant_request
+        except Exception as e:
+            if not is_permanent_hydration_error(e):
+                self._bot.log.warning("An error occurred while restoring the grant request %s, it will be retried: %s", request_id, str(e))
+                return None
+            # The request can't be used anymore, it's dropped through the bot so the pending requests metric is updated
+            self._bot.log.error("An error occurred while restoring the grant request %s, discarding it: %s", request_id, str(e))
+            self._bot.remove_grant_request(request_id)
+            return None
 
     def get_request_ids(self):
         return list(self.__grant_requests.keys())
 
     def exists(self, request_id: str) -> bool:
-        return self.__grant_requests.get(request_id) is not None
+        return self.get(request_id) is not None
 
     def remove(self, request_id: str):
-        self.__grant_requests.pop(request_id, None)
-        self.save_state()
+        if self.__grant_requests.pop(request_id, None) is not None:
+            self.__index.remove(request_id)
+            self.__delete_grant_request(request_id)
+
+    def get_stale_request_ids(self, timeout):
+        """
+        Return the ids of the pending requests created at least timeout seconds ago, oldest first
+        """
+        return self.__index.get_created_before(time.time() - timeout)
 
     def __sdm_model_to_dict(self, object):
         return object if type(object) is dict else object.to_dict()
@@ -133,6 +233,8 @@ class GrantRequestHelper:
     def __conversation_to_dict(self, conversation):
         if isinstance(conversation, dict):
             return dict(conversation)
+        if isinstance(conversation, SimpleNamespace):
+            return dict(vars(conversation))
         if hasattr(conversation, '_asdict'):
             return conversation._asdict()
         serialized_conversation = dict(conversation.__dict__)
@@ -148,7 +250,6 @@ class GrantRequestHelper:
 
     def clear_cached_state(self):
         try:
-            if os.path.exists(self.file_path):
-                os.remove(self.file_path)
+            self.__store.clear()
         except Exception as e:
-            self._bot.log.error("An error occurred while clearing the cached state: ", str(e))
+            self._bot.log.error("An error occurred while clearing the cached state: %s", str(e))
@@ -0,0 +1,39 @@
+import bisect
+import threading
+
+
+class GrantRequestIndex:
+    """
+    Index of the pending grant requests by creation time, so the stale ones are found without scanning them all
+    """
+    def __init__(self):
+        self.__by_timestamp = []
+        self.__timestamps = {}
+        self.__lock = threading.Lock()
+
+    def add(self, request_id, timestamp):
+        with self.__lock:
+            self.__remove(request_id)
+            self.__timestamps[request_id] = timestamp
+            bisect.insort(self.__by_timestamp, (timestamp, request_id))
+
+    def remove(self, request_id):
+        with self.__lock:
+            self.__remove(request_id)
+
+    def get_created_before(self, timestamp):
+        """
+        Return the ids of the requests created at or before the timestamp, oldest first
+        """
+        with self.__lock:
+            index = bisect.bisect_right(self.__by_timestamp, (timestamp, chr(0x10FFFF)))
+            return [request_id for _, request_id in self.__by_timestamp[:index]]
+
+    def __remove(self, request_id):
+        timestamp = self.__timestamps.pop(request_id, None)
+        if timestamp is None:
+            return
+        timestamp_key = (timestamp, request_id)
+        position = bisect.bisect_left(self.__by_timestamp, timestamp_key)
+        if position < len(self.__by_timestamp) and self.__by_timestamp[position] == timestamp_key:
+            del self.__by_timestamp[position]
@@ -0,0 +1,384 @@
+import json
+import os
+import sqlite3
+import threading
+
+STORE_JSON = 'json'
+STORE_SQLITE = 'sqlite'
+STORE_JOURNAL = 'journal'
+JOURNAL_FSYNC_ALWAYS = 'always'
+
+
+class JsonGrantRequestStore:
+    """
+    Keeps the serialized grant requests in a single JSON file, replaced atomically (temp file and rename) on every change.
+
+    With a save_delay the changes made within that many seconds are coalesced and written by a background thread,
+    so the handlers don't wait on disk I/O. Call flush to write the pending changes right away, e.g. on shutdown.
+    """
+    def __init__(self, folder_path, file_path, log, save_delay=0):
+        self.folder_path = folder_path
+        self.file_path = file_path
+        self.__log = log
+        self.__save_delay = save_delay
+        self.__grant_requests = {}
+        self.__dirty = False
+        self.__save_timer = None
+        self.__lock = threading.Lock()
+        self.__write_lock = threading.Lock()
+
+    def load(self):
+        self.__grant_requests = {}
+        if not os.path.isfile(self.file_path):
+            return []
+        state_text = open(self.file_path, "r").read()
+        if state_text == "":
+            return []
+        for grant_request in json.loads(state_text):
+            self.__grant_requests[grant_request['id']] = grant_request
+        return list(self.__grant_requests.values())
+
+    def get_file_paths(self):
+        return [self.file_path]
+
+    def put(self, grant_request):
+        with self.__lock:
+            self.__grant_requests[grant_request['id']] = grant_request
+            self.__dirty = True
+        self.__save()
+
+    def delete(self, request_id):
+        with self.__lock:
+            self.__grant_requests.pop(request_id, None)
+            self.__dirty = True
+        self.__save()
+
+    def save_all(self, grant_requests):
+        with self.__lock:
+            self.__grant_requests = {grant_request['id']: grant_request for grant_request in grant_requests}
+            self.__dirty = True
+        self.__save()
+
+    def flush(self):
+        """
+        Write the pending changes, if any
+        """
+        with self.__lock:
+            if self.__save_timer is not None:
+                self.__save_timer.cancel()
+                self.__save_timer = None
+        self.__write()
+
+    def clear(self, keep_file_paths=()):
+        """
+        Drop the stored requests, leaving the files in keep_file_paths (e.g. used by the next store) untouched
+        """
+        with self.__lock:
+            if self.__save_timer is not None:
+                self.__save_timer.cancel()
+                self.__save_timer = None
+            self.__dirty = False
+        if self.file_path not in keep_file_paths and os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def __save(self):
+        if self.__save_delay <= 0:
+            self.__write()
+            return
+        with self.__lock:
+            if self.__save_timer is not None:
+                return
+            self.__save_timer = threading.Timer(self.__save_delay, self.__flush_in_background)
+            self.__save_timer.daemon = True
+            self.__save_timer.start()
+
+    def __flush_in_background(self):
+        try:
+            self.flush()
+        except Exception as e:
+            self.__log.error("##SDM## JsonGrantRequestStore failed to save the grant requests: %s", str(e))
+
+    def __write(self):
+        with self.__write_lock:
+            with self.__lock:
+                if not self.__dirty:
+                    return
+                grant_requests = list(self.__grant_requests.values())
+                self.__dirty = False
+            try:
+                write_file_atomically(self.folder_path, self.file_path, json.dumps(grant_requests))
+            except Exception:
+                with self.__lock:
+                    self.__dirty = True
+                raise
+
+
+class JournalGrantRequestStore:
+    """
+    Keeps the grant requests in the JSON state file plus an append-only journal of put/delete records, so adding or
+    removing a request only appends a line. Loading replays the journal over the state file.
+
+    Once the journal reaches compaction_threshold records it's compacted in the background: the journal is rotated and
+    the state file is rewritten atomically with the current requests. With fsync enabled every record is flushed to disk.
+    """
+    def __init__(self, folder_path, file_path, journal_file_path, log, fsync=False, compaction_threshold=1000):
+        self.folder_path = folder_path
+        self.file_path = file_path
+        self.journal_file_path = journal_file_path
+        self.compacting_file_path = f"{journal_file_path}.compacting"
+        self.__log = log
+        self.__fsync = fsync
+        self.__compaction_threshold = max(1, compaction_threshold)
+        self.__grant_requests = {}
+        self.__journal = None
+        self.__journal_records = 0
+        self.__compacting = False
+        self.__lock = threading.Lock()
+        self.__compaction_lock = threading.Lock()
+
+    def has_state(self):
+        return any(os.path.isfile(path) for path in [self.file_path, self.compacting_file_path, self.journal_file_path])
+
+    def load(self):
+        with self.__lock:
+            grant_requests = {}
+            if os.path.isfile(self.file_path):
+                state_text = open(self.file_path, "r").read()
+                if state_text != "":
+                    grant_requests = {grant_request['id']: grant_request for grant_request in json.loads(state_text)}
+            # A journal left by an interrupted compaction holds records older than the current journal
+            journal_records = 0
+            for path in [self.compacting_file_path, self.journal_file_path]:
+                journal_records += self.__replay(path, grant_requests)
+            self.__grant_requests = grant_requests
+        if journal_records > 0:
+            self.compact()
+        return list(grant_requests.values())
+
+    def get_file_paths(self):
+        return [self.file_path, self.compacting_file_path, self.journal_file_path]
+
+    def put(self, grant_request):
+        self.__append({'op': 'put', 'grant_request': grant_request})
+
+    def delete(self, request_id):
+        self.__append({'op': 'delete', 'id': request_id})
+
+    def save_all(self, grant_requests):
+        with self.__lock:
+            self.__grant_requests = {grant_request['id']: grant_request for grant_request in grant_requests}
+        self.compact()
+
+    def flush(self):
+        with self.__lock:
+            if self.__journal is not None:
+                self.__journal.flush()
+                os.fsync(self.__journal.fileno())
+
+    def clear(self, keep_file_paths=()):
+        with self.__compaction_lock, self.__lock:
+            self.__close_journal()
+            for path in self.get_file_paths():
+                if path not in keep_file_paths and os.path.exists(path):
+                    os.remove(path)
+            self.__grant_requests = {}
+
+    def archive(self):
+        """
+        Keep the state file as a .migrated copy and drop the journal, once the requests are moved to another store
+        """
+        with self.__compaction_lock, self.__lock:
+            self.__close_journal()
+            if os.path.isfile(self.file_path):
+                os.replace(self.file_path, f"{self.file_path}.migrated")
+            for path in [self.compacting_file_path, self.journal_file_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def compact(self):
+        """
+        Rewrite the state file with the current requests and drop the journal records it includes
+        """
+        try:
+            with self.__compaction_lock:
+                with self.__lock:
+                    grant_requests = list(self.__grant_requests.values())
+                    self.__close_journal()
+                    self.__rotate_journal()
+                    self.__journal_records = 0
+                write_file_atomically(self.folder_path, self.file_path, json.dumps(grant_requests))
+                if os.path.exists(self.compacting_file_path):
+                    os.remove(self.compacting_file_path)
+            self.__log.debug("##SDM## JournalGrantRequestStore.compact grant requests: %d", len(grant_requests))
+        finally:
+            self.__compacting = False
+
+    def __append(self, record):
+        line = json.dumps(record) + "\n"
+        with self.__lock:
+            if record['op'] == 'put':
+                self.__grant_requests[record['grant_request']['id']] = record['grant_request']
+            else:
+                self.__grant_requests.pop(record['id'], None)
+            journal = self.__get_journal()
+            journal.write(line)
+            journal.flush()
+            if self.__fsync:
+                os.fsync(journal.fileno())
+            self.__journal_records += 1
+            start_compaction = self.__journal_records >= self.__compaction_threshold and not self.__compacting
+            if start_compaction:
+                self.__compacting = True
+        if start_compaction:
+            threading.Thread(target=self.__compact_in_background, name="grant-requests-compaction", daemon=True).start()
+
+    def __rotate_journal(self):
+        if not os.path.exists(self.journal_file_path):
+            return
+        if not os.path.exists(self.compacting_file_path):
+            os.replace(self.journal_file_path, self.compacting_file_path)
+            return
+        # A previous compaction failed, its records are kept until a compaction succeeds
+        with open(self.journal_file_path, "r") as journal, open(self.compacting_file_path, "a") as compacting_journal:
+            compacting_journal.write(journal.read())
+        os.remove(self.journal_file_path)
+
+    def __compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            self.__log.error("##SDM## JournalGrantRequestStore compaction failed: %s", str(e))
+
+    def __replay(self, path, grant_requests):
+        if not os.path.isfile(path):
+            return 0
+        records = 0
+        with open(path, "r") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # The last record may be cut short if the bot stopped while writing it
+                    self.__log.warning("##SDM## JournalGrantRequestStore ignoring a malformed record in %s", path)
+                    continue
+                if record.get('op') == 'put':
+                    grant_requests[record['grant_request']['id']] = record['grant_request']
+                elif record.get('op') == 'delete':
+                    grant_requests.pop(record['id'], None)
+                records += 1
+        return records
+
+    def __get_journal(self):
+        if self.__journal is None:
+            if not os.path.exists(self.folder_path):
+                os.makedirs(self.folder_path, exist_ok=True)
+            self.__journal = open(self.journal_file_path, "a")
+        return self.__journal
+
+    def __close_journal(self):
+        if self.__journal is not None:
+            self.__journal.close()
+            self.__journal = None
+
+
+class SqliteGrantRequestStore:
+    """
+    Keeps the serialized grant requests in a SQLite database (WAL mode), one row per request, so adding or removing
+    a request only writes that row. The requests of an existing JSON state file (and its journal) are migrated on first use.
+    """
+    def __init__(self, folder_path, db_file_path, legacy_store, log):
+        self.folder_path = folder_path
+        self.db_file_path = db_file_path
+        self.__legacy_store = legacy_store
+        self.__log = log
+        self.__connection = None
+        self.__lock = threading.Lock()
+
+    def load(self):
+        self.__migrate_legacy_state()
+        with self.__lock:
+            rows = self.__get_connection().execute("SELECT data FROM grant_requests ORDER BY timestamp").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def get_file_paths(self):
+        return [self.db_file_path]
+
+    def put(self, grant_request):
+        with self.__lock:
+            connection = self.__get_connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO grant_requests (id, timestamp, data) VALUES (?, ?, ?)",
+                    self.__to_row(grant_request)
+                )
+
+    def delete(self, request_id):
+        with self.__lock:
+            connection = self.__get_connection()
+            with connection:
+                connection.execute("DELETE FROM grant_requests WHERE id = ?", (request_id,))
+
+    def save_all(self, grant_requests):
+        with self.__lock:
+            connection = self.__get_connection()
+            with connection:
+                connection.execute("DELETE FROM grant_requests")
+                connection.executemany(
+                    "INSERT OR REPLACE INTO grant_requests (id, timestamp, data) VALUES (?, ?, ?)",
+                    [self.__to_row(grant_request) for grant_request in grant_requests]
+                )
+
+    def flush(self):
+        # Every change is committed right away
+        pass
+
+    def clear(self, keep_file_paths=()):
+        with self.__lock:
+            if self.db_file_path in keep_file_paths or not os.path.exists(self.db_file_path):
+                return
+            connection = self.__get_connection()
+            with connection:
+                connection.execute("DELETE FROM grant_requests")
+
+    def __migrate_legacy_state(self):
+        if not self.__legacy_store.has_state():
+            return
+        grant_requests = self.__legacy_store.load()
+        with self.__lock:
+            connection = self.__get_connection()
+            with connection:
+                # Requests already in the database are newer than the ones in the JSON file
+                connection.executemany(
+                    "INSERT OR IGNORE INTO grant_requests (id, timestamp, data) VALUES (?, ?, ?)",
+                    [self.__to_row(grant_request) for grant_request in grant_requests]
+                )
+        self.__legacy_store.archive()
+        self.__log.info("##SDM## SqliteGrantRequestStore migrated %d grant requests from %s", len(grant_requests), self.__legacy_store.file_path)
+
+    def __get_connection(self):
+        if self.__connection is None:
+            if not os.path.exists(self.folder_path):
+                os.makedirs(self.folder_path, exist_ok=True)
+            # The connection is shared by the handler threads, the lock serializes its use
+            connection = sqlite3.connect(self.db_file_path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS grant_requests (id TEXT PRIMARY KEY, timestamp REAL, data TEXT NOT NULL)")
+            connection.commit()
+            self.__connection = connection
+        return self.__connection
+
+    @staticmethod
+    def __to_row(grant_request):
+        return grant_request['id'], grant_request.get('timestamp'), json.dumps(grant_request)
+
+
+def write_file_atomically(folder_path, file_path, text):
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path, exist_ok=True)
+    tmp_file_path = f"{file_path}.tmp"
+    with open(tmp_file_path, "w") as tmp_file:
+        tmp_file.write(text)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_file_path, file_path)
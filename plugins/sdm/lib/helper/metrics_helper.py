@@ -25,6 +25,10 @@ class MetricsHelper:
             MetricGaugeType.TOTAL_TIMED_OUT_REQUESTS: Gauge("accessbot_total_timed_out_access_requests", "total count of timed out access requests"),
             MetricGaugeType.TOTAL_PENDING_REQUESTS: Gauge("accessbot_total_pending_access_requests", "total count of pending access requests"),
             MetricGaugeType.TOTAL_CONSECUTIVE_ERRORS: Gauge("accessbot_total_consecutive_errors", "total count of consecutive errors"),
+            MetricGaugeType.SDM_API_CIRCUIT_OPEN: Gauge("accessbot_sdm_api_circuit_open", "1 when calls to the strongDM API are being rejected, 0.5 when a trial call is allowed, 0 otherwise"),
+            MetricGaugeType.SDM_API_THROTTLED_CALLS: Gauge("accessbot_sdm_api_throttled_calls", "total count of strongDM API calls delayed by the rate limiter"),
+            MetricGaugeType.SDM_API_RETRIED_CALLS: Gauge("accessbot_sdm_api_retried_calls", "total count of retried strongDM API calls"),
+            MetricGaugeType.SDM_API_REJECTED_CALLS: Gauge("accessbot_sdm_api_rejected_calls", "total count of strongDM API calls rejected by the circuit breaker"),
         }
 
     def __update_metric(self, gauge_type: MetricGaugeType, value: int):
@@ -72,3 +76,10 @@ class MetricsHelper:
 
     def increment_auto_approvals(self):
         self.__increment_metrics([MetricGaugeType.TOTAL_AUTO_APPROVALS])
+
+    def update_sdm_api_state(self, state):
+        circuit_open_values = {'closed': 0, 'half_open': 0.5, 'open': 1}
+        self.__update_metric(MetricGaugeType.SDM_API_CIRCUIT_OPEN, circuit_open_values.get(state['circuit_state'], 0))
+        self.__update_metric(MetricGaugeType.SDM_API_THROTTLED_CALLS, state['throttled_calls'])
+        self.__update_metric(MetricGaugeType.SDM_API_RETRIED_CALLS, state['retried_calls'])
+        self.__update_metric(MetricGaugeType.SDM_API_REJECTED_CALLS, state['rejected_calls'])
@@ -1,5 +1,3 @@
-import time
-
 from ..util import get_approvers_channel
 from metric_type import MetricGaugeType
 
@@ -10,14 +8,17 @@ class PollerHelper:
         self.__admin_ids = bot.get_admin_ids()
 
     def stale_grant_requests_cleaner(self):
-        for request_id in self.__bot.get_grant_request_ids():
+        for request_id in self.__bot.get_stale_grant_request_ids(self.__bot.config['ADMIN_TIMEOUT']):
             grant_request = self.__bot.get_grant_request(request_id)
-            elapsed_time = time.time() - grant_request['timestamp']
-            if elapsed_time >= self.__bot.config['ADMIN_TIMEOUT']:
+            if grant_request is not None:
                 self.__bot.log.info("##SDM## Cleaning grant requests, stale request_id = %s", request_id)
                 self.__bot.remove_grant_request(request_id)
-                self.__notify_grant_request_denied(grant_request)
                 self.__bot.get_metrics_helper().increment_timed_out_requests()
+                try:
+                    self.__notify_grant_request_denied(grant_request)
+                except Exception as e:
+                    # The other stale requests are still cleaned
+                    self.__bot.log.error("##SDM## Cleaning grant requests, failed to notify request_id = %s: %s", request_id, str(e))
 
     def stale_max_auto_approve_cleaner(self):
         max_auto_approve_interval = self.__bot.config['MAX_AUTO_APPROVE_INTERVAL']
@@ -28,9 +29,9 @@ class PollerHelper:
             self.__bot.clean_auto_approve_uses()
 
     def __notify_grant_request_denied(self, grant_request):
-        requester_id = grant_request['message'].frm
-        self.__notify_evaluators(grant_request, f"Request {grant_request['id']} timed out, user grant will be denied!")
-        self.__notify_requester(requester_id, grant_request['message'], f"Sorry, request {grant_request['id']} not approved! Please contact any of the team admins directly.")
+        requester_id = grant_request.message.frm
+        self.__notify_evaluators(grant_request, f"Request {grant_request.id} timed out, user grant will be denied!")
+        self.__notify_requester(requester_id, grant_request.message, f"Sorry, request {grant_request.id} not approved! Please contact any of the team admins directly.")
 
     def __get_channel_id(self, requester_id):
         if type(requester_id) == str:
@@ -40,13 +41,13 @@ class PollerHelper:
         return self.__bot.build_identifier(requester_id.room.__str__())
 
     def __notify_evaluators(self, grant_request, text):
-        sdm_object = grant_request['sdm_object']
-        sdm_account = grant_request['sdm_account']
+        sdm_object = grant_request.sdm_object
+        sdm_account = grant_request.sdm_account
         approvers_channel_name = get_approvers_channel(self.__bot.config, sdm_object) or get_approvers_channel(self.__bot.config, sdm_account)
         if approvers_channel_name is not None:
             channel_id = self.__get_channel_id(self.__bot.format_channel_name(approvers_channel_name))
             return self.__bot.send(channel_id, text)
-        return self.__notify_admins(text, grant_request['message'])
+        return self.__notify_admins(text, grant_request.message)
 
     def __notify_admins(self, text, message):
         if self.__bot.config['ADMINS_CHANNEL']:
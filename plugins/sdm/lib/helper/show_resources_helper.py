@@ -12,7 +12,7 @@ class ShowResourcesHelper(BaseShowHelper):
         if role_name is not None:
             resources = self._sdm_service.get_all_resources_by_role(role_name, filter = filter)
         else:
-            resources = self._sdm_service.get_all_resources(filter = filter)
+            resources = self._sdm_service.iter_all_resources(filter = filter)
         return self.__filter_resources(resources, sdm_account)
 
     def get_line(self, item, _):
@@ -1,5 +1,7 @@
+import json
 import pytest
 from errbot import Message
+from errbot.backends.base import UserDoesNotExistError
 import sys
 from unittest.mock import MagicMock, patch, mock_open
 
@@ -8,6 +10,8 @@ sys.path.append('plugins/sdm/')
 
 from test_common import DummyResource, DummyAccount, DummyPerson
 from .grant_request_helper import GrantRequestHelper
+from .grant_request_store import SqliteGrantRequestStore
+from lib.models.grant_request import GrantRequest, GrantRequestMessage
 from grant_request_type import GrantRequestType
 
 request_id = "12AB"
@@ -20,13 +24,15 @@ class Test_state_handling:
     def test_save_state_when_has_pending_requests(self):
         bot = get_mocked_bot()
         helper = GrantRequestHelper(bot)
-        with patch("builtins.open", mock_open()) as handle:
+        with patch("builtins.open", mock_open()) as handle, patch("os.fsync"), patch("os.replace") as mock_replace:
             helper.add(request_id, get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
             assert helper.get(request_id) is not None
             assert helper.exists(request_id)
             assert len(helper.get_request_ids()) == 1
             file = handle()
             file.write.assert_called_once()
+            mock_replace.assert_called_once_with(f"{GrantRequestHelper.file_path}.tmp", GrantRequestHelper.file_path)
+            bot.log.error.assert_not_called()
             helper.remove(request_id)
             assert helper.get(request_id) is None
             assert not helper.exists(request_id)
@@ -60,6 +66,72 @@ class Test_state_handling:
                 assert helper.get(request_id) is None
                 assert not helper.exists(request_id)
 
+    def test_restore_state_builds_grant_requests(self):
+        with patch("os.path.isfile") as mock_isfile:
+            mock_isfile.side_effect = [True]
+            bot = get_mocked_bot()
+            with patch("builtins.open", mock_open(read_data=mocked_file_data)):
+                helper = GrantRequestHelper(bot)
+        grant_request = helper.get(request_id)
+        assert isinstance(grant_request, GrantRequest)
+        assert isinstance(grant_request.message, GrantRequestMessage)
+        assert grant_request.sdm_object.name == resource_name
+        assert not hasattr(grant_request, '__dict__')
+
+    def test_restore_state_hydrates_grant_requests_on_first_use(self):
+        with patch("os.path.isfile") as mock_isfile:
+            mock_isfile.side_effect = [True]
+            bot = get_mocked_bot()
+            with patch("builtins.open", mock_open(read_data=mocked_file_data)):
+                helper = GrantRequestHelper(bot)
+        assert helper.get_stale_request_ids(0) == [request_id]
+        bot.build_identifier.assert_not_called()
+        grant_request = helper.get(request_id)
+        assert grant_request.is_hydrated()
+        assert grant_request.message.frm is not None
+        bot.build_identifier.assert_called()
+
+    def test_restore_state_discards_grant_requests_that_cant_be_hydrated(self):
+        with patch("os.path.isfile") as mock_isfile:
+            mock_isfile.side_effect = [True]
+            bot = get_mocked_bot()
+            bot.build_identifier.side_effect = UserDoesNotExistError("User not found")
+            with patch("builtins.open", mock_open(read_data=mocked_file_data)):
+                helper = GrantRequestHelper(bot)
+            bot.remove_grant_request.side_effect = helper.remove
+        with patch("builtins.open", mock_open()), patch("os.fsync"), patch("os.replace"):
+            assert helper.get(request_id) is None
+            assert not helper.exists(request_id)
+        bot.remove_grant_request.assert_called_once_with(request_id)
+        assert helper.get_request_ids() == []
+        assert helper.get_stale_request_ids(0) == []
+        bot.log.error.assert_called_once()
+
+    def test_restore_state_keeps_grant_requests_that_fail_to_hydrate_temporarily(self):
+        with patch("os.path.isfile") as mock_isfile:
+            mock_isfile.side_effect = [True]
+            bot = get_mocked_bot()
+            bot.build_identifier.side_effect = [Exception("ratelimited"), MagicMock(), MagicMock()]
+            with patch("builtins.open", mock_open(read_data=mocked_file_data)):
+                helper = GrantRequestHelper(bot)
+        assert helper.get(request_id) is None
+        bot.remove_grant_request.assert_not_called()
+        bot.log.warning.assert_called_once()
+        assert helper.get_request_ids() == [request_id]
+        assert helper.get(request_id).is_hydrated()
+
+    def test_save_state_keeps_the_source_of_not_hydrated_grant_requests(self):
+        with patch("os.path.isfile") as mock_isfile:
+            mock_isfile.side_effect = [True]
+            bot = get_mocked_bot()
+            with patch("builtins.open", mock_open(read_data=mocked_file_data)):
+                helper = GrantRequestHelper(bot)
+        with patch("builtins.open", mock_open()) as handle, patch("os.fsync"), patch("os.replace"):
+            helper.add("34CD", get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
+            written_data = "".join(call.args[0] for call in handle().write.call_args_list)
+        assert json.loads(mocked_file_data)[0] in json.loads(written_data)
+        bot.build_identifier.assert_not_called()
+
     def test_dont_restore_state_when_has_stored_requests_and_is_disabled(self):
         with patch("os.path.isfile") as mock_isfile:
             mock_isfile.side_effect = [True]
@@ -89,11 +161,80 @@ class Test_state_handling:
             mock_remove.assert_called_once()
             assert len(helper.get_request_ids()) == 1
 
+    def test_restore_state_from_sqlite_store(self, tmp_path):
+        bot = get_mocked_bot(grant_requests_store="sqlite")
+        bot.build_identifier.side_effect = DummyPerson
+        with patch.object(GrantRequestHelper, "folder_path", str(tmp_path)), \
+                patch.object(GrantRequestHelper, "db_file_path", str(tmp_path / "state.db")), \
+                patch.object(GrantRequestHelper, "file_path", str(tmp_path / "state.json")):
+            helper = GrantRequestHelper(bot)
+            helper.add(request_id, get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
+            helper.add("34CD", get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
+            helper.remove("34CD")
+            restored_helper = GrantRequestHelper(bot)
+            assert restored_helper.get_request_ids() == [request_id]
+            assert restored_helper.get(request_id).sdm_object.name == resource_name
+
+
+class Test_switch_store:
+    @pytest.fixture
+    def state_paths(self, tmp_path):
+        with patch.object(GrantRequestHelper, "folder_path", str(tmp_path)), \
+                patch.object(GrantRequestHelper, "db_file_path", str(tmp_path / "state.db")), \
+                patch.object(GrantRequestHelper, "file_path", str(tmp_path / "state.json")), \
+                patch.object(GrantRequestHelper, "journal_file_path", str(tmp_path / "state.journal")):
+            yield tmp_path
+
+    def test_keeps_the_state_file_shared_with_the_new_store(self, state_paths):
+        bot = get_mocked_bot()
+        bot.build_identifier.side_effect = DummyPerson
+        helper = GrantRequestHelper(bot)
+        helper.add(request_id, get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
+        bot.config["GRANT_REQUESTS_STORE"] = "journal"
+        helper.switch_store()
+        assert (state_paths / "state.json").is_file()
+        assert GrantRequestHelper(bot).get_request_ids() == [request_id]
+
+    def test_moves_the_requests_to_the_new_store(self, state_paths):
+        bot = get_mocked_bot()
+        bot.build_identifier.side_effect = DummyPerson
+        helper = GrantRequestHelper(bot)
+        helper.add(request_id, get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
+        bot.config["GRANT_REQUESTS_STORE"] = "sqlite"
+        helper.switch_store()
+        assert not (state_paths / "state.json").exists()
+        assert GrantRequestHelper(bot).get_request_ids() == [request_id]
+
+    def test_keeps_the_previous_store_when_the_new_one_fails(self, state_paths):
+        bot = get_mocked_bot()
+        bot.build_identifier.side_effect = DummyPerson
+        helper = GrantRequestHelper(bot)
+        helper.add(request_id, get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
+        bot.config["GRANT_REQUESTS_STORE"] = "sqlite"
+        with patch.object(SqliteGrantRequestStore, "save_all", side_effect=Exception("unable to open database file")):
+            helper.switch_store()
+        bot.log.error.assert_called_once()
+        assert (state_paths / "state.json").is_file()
+        helper.remove(request_id)
+        bot.config["GRANT_REQUESTS_STORE"] = None
+        assert GrantRequestHelper(bot).get_request_ids() == []
+
+
+class Test_stale_requests:
+    def test_returns_the_stale_requests_oldest_first(self):
+        helper = GrantRequestHelper(get_mocked_bot(False))
+        helper.add(request_id, get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ACCESS_RESOURCE)
+        helper.add("34CD", get_mocked_message(), get_mock_sdm_object(), get_mock_sdm_account(), GrantRequestType.ASSIGN_ROLE)
+        assert helper.get_stale_request_ids(0) == [request_id, "34CD"]
+        assert helper.get_stale_request_ids(60) == []
+        helper.remove(request_id)
+        assert helper.get_stale_request_ids(0) == ["34CD"]
+
 
-def get_mocked_bot(enable_handle_state=True):
+def get_mocked_bot(enable_handle_state=True, grant_requests_store=None):
     mock = MagicMock()
     mock.mode = ""
-    mock.config = {"ENABLE_BOT_STATE_HANDLING": enable_handle_state}
+    mock.config = {"ENABLE_BOT_STATE_HANDLING": enable_handle_state, "GRANT_REQUESTS_STORE": grant_requests_store, "APPROVERS_CHANNEL_TAG": None}
     return mock
 
 def get_mocked_message():
@@ -0,0 +1,27 @@
+from .grant_request_index import GrantRequestIndex
+
+
+class Test_queries:
+    def test_finds_requests_by_creation_time(self):
+        index = GrantRequestIndex()
+        index.add("34CD", 20)
+        index.add("12AB", 10)
+        index.add("56EF", 30)
+        assert index.get_created_before(20) == ["12AB", "34CD"]
+        assert index.get_created_before(5) == []
+
+    def test_replaces_a_request_added_again(self):
+        index = GrantRequestIndex()
+        index.add("12AB", 10)
+        index.add("12AB", 30)
+        assert index.get_created_before(20) == []
+        assert index.get_created_before(30) == ["12AB"]
+
+class Test_remove:
+    def test_removes_the_request(self):
+        index = GrantRequestIndex()
+        index.add("12AB", 10)
+        index.add("34CD", 10)
+        index.remove("12AB")
+        index.remove("unknown")
+        assert index.get_created_before(10) == ["34CD"]
@@ -0,0 +1,121 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+from .grant_request_store import JournalGrantRequestStore, JsonGrantRequestStore, SqliteGrantRequestStore
+
+
+def get_grant_request(request_id, timestamp=1653069610.21):
+    return {'id': request_id, 'timestamp': timestamp, 'message': {'frm': 'gbin@localhost'}, 'type': 0, 'flags': None}
+
+def create_journal_store(tmp_path, compaction_threshold=1000):
+    return JournalGrantRequestStore(
+        str(tmp_path), str(tmp_path / "state.json"), str(tmp_path / "state.journal"), MagicMock(), compaction_threshold=compaction_threshold
+    )
+
+def create_sqlite_store(tmp_path):
+    return SqliteGrantRequestStore(str(tmp_path), str(tmp_path / "state.db"), create_journal_store(tmp_path), MagicMock())
+
+class Test_json_store:
+    def test_keeps_the_requests_in_the_file(self, tmp_path):
+        store = JsonGrantRequestStore(str(tmp_path), str(tmp_path / "state.json"), MagicMock())
+        store.put(get_grant_request("12AB"))
+        store.put(get_grant_request("34CD"))
+        store.delete("12AB")
+        assert JsonGrantRequestStore(str(tmp_path), str(tmp_path / "state.json"), MagicMock()).load() == [get_grant_request("34CD")]
+
+class Test_sqlite_store:
+    def test_keeps_one_row_per_request(self, tmp_path):
+        store = create_sqlite_store(tmp_path)
+        store.put(get_grant_request("34CD", timestamp=2))
+        store.put(get_grant_request("12AB", timestamp=1))
+        store.put(get_grant_request("56EF", timestamp=3))
+        store.delete("56EF")
+        assert create_sqlite_store(tmp_path).load() == [get_grant_request("12AB", timestamp=1), get_grant_request("34CD", timestamp=2)]
+
+    def test_uses_wal_mode(self, tmp_path):
+        create_sqlite_store(tmp_path).put(get_grant_request("12AB"))
+        assert os.path.isfile(tmp_path / "state.db-wal")
+
+    def test_save_all_replaces_the_requests(self, tmp_path):
+        store = create_sqlite_store(tmp_path)
+        store.put(get_grant_request("12AB"))
+        store.save_all([get_grant_request("34CD")])
+        assert store.load() == [get_grant_request("34CD")]
+        store.clear()
+        assert store.load() == []
+
+    def test_migrates_the_json_state(self, tmp_path):
+        (tmp_path / "state.json").write_text(json.dumps([get_grant_request("12AB")]))
+        store = create_sqlite_store(tmp_path)
+        assert store.load() == [get_grant_request("12AB")]
+        assert not os.path.exists(tmp_path / "state.json")
+        assert os.path.isfile(tmp_path / "state.json.migrated")
+        assert create_sqlite_store(tmp_path).load() == [get_grant_request("12AB")]
+
+class Test_journal_store:
+    def test_replays_the_journal_over_the_state_file(self, tmp_path):
+        (tmp_path / "state.json").write_text(json.dumps([get_grant_request("12AB")]))
+        store = create_journal_store(tmp_path)
+        store.put(get_grant_request("34CD"))
+        store.delete("12AB")
+        assert len((tmp_path / "state.journal").read_text().splitlines()) == 2
+        assert json.loads((tmp_path / "state.json").read_text()) == [get_grant_request("12AB")]
+        assert create_journal_store(tmp_path).load() == [get_grant_request("34CD")]
+
+    def test_compacts_on_load(self, tmp_path):
+        store = create_journal_store(tmp_path)
+        store.put(get_grant_request("12AB"))
+        create_journal_store(tmp_path).load()
+        assert json.loads((tmp_path / "state.json").read_text()) == [get_grant_request("12AB")]
+        assert not os.path.exists(tmp_path / "state.journal")
+
+    def test_ignores_a_truncated_record(self, tmp_path):
+        store = create_journal_store(tmp_path)
+        store.put(get_grant_request("12AB"))
+        with open(tmp_path / "state.journal", "a") as journal:
+            journal.write('{"op": "put", "grant_req')
+        assert create_journal_store(tmp_path).load() == [get_grant_request("12AB")]
+
+    def test_replays_an_interrupted_compaction(self, tmp_path):
+        store = create_journal_store(tmp_path)
+        store.put(get_grant_request("12AB"))
+        os.replace(tmp_path / "state.journal", tmp_path / "state.journal.compacting")
+        store = create_journal_store(tmp_path)
+        store.put(get_grant_request("34CD"))
+        assert create_journal_store(tmp_path).load() == [get_grant_request("12AB"), get_grant_request("34CD")]
+
+    def test_compacts_in_the_background_past_the_threshold(self, tmp_path):
+        store = create_journal_store(tmp_path, compaction_threshold=2)
+        with patch("threading.Thread") as thread:
+            store.put(get_grant_request("12AB"))
+            thread.assert_not_called()
+            store.put(get_grant_request("34CD"))
+        thread.return_value.start.assert_called_once()
+        thread.call_args.kwargs['target']()
+        assert json.loads((tmp_path / "state.json").read_text()) == [get_grant_request("12AB"), get_grant_request("34CD")]
+        assert not os.path.exists(tmp_path / "state.journal")
+
+    def test_migrates_to_sqlite(self, tmp_path):
+        create_journal_store(tmp_path).put(get_grant_request("12AB"))
+        assert create_sqlite_store(tmp_path).load() == [get_grant_request("12AB")]
+        assert not create_journal_store(tmp_path).has_state()
+
+class Test_json_store_save_delay:
+    def test_coalesces_the_changes(self, tmp_path):
+        store = JsonGrantRequestStore(str(tmp_path), str(tmp_path / "state.json"), MagicMock(), save_delay=60)
+        with patch("threading.Timer") as timer:
+            store.put(get_grant_request("12AB"))
+            store.put(get_grant_request("34CD"))
+            store.delete("12AB")
+        timer.assert_called_once()
+        assert not os.path.exists(tmp_path / "state.json")
+        timer.call_args.args[1]()
+        assert json.loads((tmp_path / "state.json").read_text()) == [get_grant_request("34CD")]
+
+    def test_flush_writes_the_pending_changes(self, tmp_path):
+        store = JsonGrantRequestStore(str(tmp_path), str(tmp_path / "state.json"), MagicMock(), save_delay=60)
+        store.put(get_grant_request("12AB"))
+        store.flush()
+        assert json.loads((tmp_path / "state.json").read_text()) == [get_grant_request("12AB")]
+        assert not os.path.exists(tmp_path / "state.json.tmp")
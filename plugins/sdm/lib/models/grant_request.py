@@ -0,0 +1,88 @@
+import threading
+
+
+class GrantRequestMessage:
+    """
+    The parts of the request message needed to reply to it, react to it or notify the admins from it
+    """
+    __slots__ = ('frm', 'to', 'body', 'extras', 'is_group')
+
+    def __init__(self, frm, to, body=None, extras=None, is_group=False):
+        self.frm = frm
+        self.to = to
+        self.body = body
+        self.extras = extras if extras is not None else {}
+        self.is_group = is_group
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(message.frm, message.to, message.body, message.extras, message.is_group)
+
+    @property
+    def is_direct(self):
+        return not self.is_group
+
+
+class GrantRequest:
+    """
+    A pending access request, identified by id and waiting for an admin to approve or deny it.
+
+    Restored requests are created with lazy, so their message and SDM objects are only built (which may call the chat
+    platform API) the first time one of them is used, or when hydrate is called.
+    """
+    __slots__ = ('id', 'timestamp', 'type', 'flags', '_message', '_sdm_object', '_sdm_account', '_hydrate',
+                 '_hydration_lock', 'source')
+
+    def __init__(self, id, timestamp, message, sdm_object, sdm_account, type, flags=None):
+        self.id = id
+        self.timestamp = timestamp
+        self.type = type
+        self.flags = flags
+        self._message = message
+        self._sdm_object = sdm_object
+        self._sdm_account = sdm_account
+        self._hydrate = None
+        self._hydration_lock = None
+        self.source = None
+
+    @classmethod
+    def lazy(cls, source, hydrate):
+        """
+        Build a request from its serialized source, hydrate returns its (message, sdm_object, sdm_account)
+        """
+        grant_request = cls(source['id'], source['timestamp'], None, None, None, source['type'], source.get('flags'))
+        grant_request._hydrate = hydrate
+        grant_request._hydration_lock = threading.Lock()
+        grant_request.source = source
+        return grant_request
+
+    def is_hydrated(self):
+        return self._hydrate is None
+
+    @property
+    def message(self):
+        self.hydrate()
+        return self._message
+
+    @property
+    def sdm_object(self):
+        self.hydrate()
+        return self._sdm_object
+
+    @property
+    def sdm_account(self):
+        self.hydrate()
+        return self._sdm_account
+
+    def hydrate(self):
+        """
+        Build the message and SDM objects of a restored request, raising the error of the hydrate function if it fails
+        """
+        if self._hydrate is None:
+            return
+        # Each request has its own lock, so a slow lookup doesn't hold the first use of the other requests
+        with self._hydration_lock:
+            if self._hydrate is not None:
+                self._message, self._sdm_object, self._sdm_account = self._hydrate(self.source)
+                self._hydrate = None
+                self.source = None
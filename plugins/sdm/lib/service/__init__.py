@@ -1 +1,13 @@
 from .sdm_service import *
+from .sdm_client_pool import *
+from .sdm_catalog import *
+from .role_resources_index import *
+from .request_scope import *
+from .account_directory import *
+from .single_flight import *
+from .api_guard import *
+from .async_sdm_service import *
+from .access_rules_evaluator import *
+from .catalog_snapshot import *
+from .grant_ledger import *
+from .fake_sdm_client import *
@@ -0,0 +1,116 @@
+ACCESS_RULE_KEYS = {'ids', 'type', 'tags'}
+
+# SDK class -> type used by the access rules and the API filters (e.g. the SDK class SQLServer is the type mssql).
+# The names don't follow a pattern, so only the types listed here are matched in memory.
+RESOURCE_TYPES_BY_CLASS_NAME = {
+    'AKS': 'aks',
+    'AKSBasicAuth': 'akshttpbasic',
+    'AMQP': 'amazonmq-amqp',
+    'Athena': 'athena',
+    'AzureCertificate': 'azurecert',
+    'BigQuery': 'bigquery',
+    'Cassandra': 'cassandra',
+    'Citus': 'citus',
+    'Clustrix': 'clustrix',
+    'Cockroach': 'cockroach',
+    'Databricks': 'databricks',
+    'Druid': 'druid',
+    'DynamoDB': 'dynamo',
+    'Elastic': 'elastic',
+    'ElasticacheRedis': 'ecredis',
+    'GoogleSpanner': 'gspanner',
+    'Greenplum': 'greenplum',
+    'HTTPBasicAuth': 'httpBasic',
+    'Kubernetes': 'kubernetes',
+    'KubernetesBasicAuth': 'kuberneteshttpbasic',
+    'Maria': 'maria',
+    'Memcached': 'memcached',
+    'Memsql': 'memsql',
+    'MongoLegacyHost': 'mongo',
+    'Mysql': 'mysql',
+    'Neptune': 'neptune',
+    'Oracle': 'oracle',
+    'Postgres': 'postgres',
+    'Presto': 'presto',
+    'RDP': 'rdp',
+    'Redis': 'redis',
+    'Redshift': 'redshift',
+    'SQLServer': 'mssql',
+    'SSH': 'ssh',
+    'Snowflake': 'snowflake',
+    'Sybase': 'sybase',
+    'Teradata': 'teradata',
+    'Trino': 'trino',
+    'Vertica': 'vertica',
+}
+KNOWN_RESOURCE_TYPES = {resource_type.lower() for resource_type in RESOURCE_TYPES_BY_CLASS_NAME.values()}
+
+def normalize_resource_type(resource_type):
+    # The API doesn't care about the case of the type, e.g. httpBasic and httpbasic are the same
+    return resource_type.lower()
+
+def get_resource_type(resource):
+    """
+    Returns the normalized type of the resource, or None when its SDK class isn't mapped
+    """
+    resource_type = RESOURCE_TYPES_BY_CLASS_NAME.get(type(resource).__name__)
+    return normalize_resource_type(resource_type) if resource_type else None
+
+
+class AccessRulesEvaluator:
+    """
+    Matches the access rules of a role against resources in memory, instead of listing them with the API.
+
+    Static rules (ids) are resolved by id, dynamic rules match when the resource has the rule type and all its tags.
+    Rules with any other shape, or with a type missing in RESOURCE_TYPES_BY_CLASS_NAME, are not supported, in that case is_supported returns False and the API should be used.
+    """
+    def __init__(self, access_rules, use_ids=True):
+        self.__static_ids = []
+        self.__dynamic_rules = []
+        self.__supported = True
+        for access_rule in access_rules:
+            self.__add_rule(access_rule, use_ids)
+
+    def is_supported(self):
+        return self.__supported
+
+    def get_static_ids(self):
+        return list(self.__static_ids)
+
+    def has_dynamic_rules(self):
+        return len(self.__dynamic_rules) > 0
+
+    def matches(self, resource):
+        return any(self.__matches_rule(resource, resource_type, tags) for resource_type, tags in self.__dynamic_rules)
+
+    def __add_rule(self, access_rule, use_ids):
+        if not isinstance(access_rule, dict) or not set(access_rule.keys()) <= ACCESS_RULE_KEYS:
+            self.__supported = False
+            return
+        ids = access_rule.get('ids')
+        resource_type = access_rule.get('type')
+        tags = access_rule.get('tags')
+        if ids and (resource_type or tags):
+            self.__supported = False
+            return
+        if ids:
+            # With role grants the static rules are already listed as grants
+            if use_ids:
+                self.__static_ids.extend(ids)
+            return
+        if (resource_type is not None and not isinstance(resource_type, str)) or (tags is not None and not isinstance(tags, dict)):
+            self.__supported = False
+            return
+        if resource_type and normalize_resource_type(resource_type) not in KNOWN_RESOURCE_TYPES:
+            # The resources of an unknown type can't be told apart in memory
+            self.__supported = False
+            return
+        if resource_type or tags:
+            self.__dynamic_rules.append((normalize_resource_type(resource_type) if resource_type else None, tags or {}))
+
+    @staticmethod
+    def __matches_rule(resource, resource_type, tags):
+        if resource_type is not None and get_resource_type(resource) != resource_type:
+            return False
+        resource_tags = getattr(resource, 'tags', None) or {}
+        return all(key in resource_tags and resource_tags[key] == value for key, value in tags.items())
@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+class AccountDirectory:
+    """
+    In-memory email -> SDM account cache.
+
+    Accounts are looked up one by one on a miss and kept for ttl seconds. Unknown emails are remembered as well,
+    for negative_ttl seconds, so repeated commands from users without an account don't reach the API.
+    Calling refresh with the full list of accounts replaces all entries, picking up suspensions and tag changes.
+    """
+    def __init__(self, loader, log, ttl=0, negative_ttl=0):
+        self.__loader = loader
+        self.__log = log
+        self.__ttl = ttl
+        self.__negative_ttl = negative_ttl
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def is_enabled(self):
+        return self.__ttl > 0
+
+    def get(self, email):
+        """
+        Return the account with the email, or None when there's no such account
+        """
+        key = email.lower()
+        entry = self.__entries.get(key)
+        if entry is not None and time.time() < entry['expires_at']:
+            return entry['account']
+        self.__log.debug("##SDM## AccountDirectory.get loading email: %s", email)
+        account = self.__loader(email)
+        self.__set(key, account)
+        return account
+
+    def invalidate(self, email=None):
+        with self.__lock:
+            if email is None:
+                self.__entries = {}
+            else:
+                self.__entries.pop(email.lower(), None)
+
+    def get_accounts(self):
+        """
+        Return the cached accounts that haven't expired, leaving out the unknown emails
+        """
+        now = time.time()
+        return [entry['account'] for entry in list(self.__entries.values()) if entry['account'] is not None and now < entry['expires_at']]
+
+    def refresh(self, accounts):
+        now = time.time()
+        entries = {}
+        for account in accounts:
+            email = getattr(account, 'email', None)
+            if account is not None and email:
+                entries[email.lower()] = {'account': account, 'expires_at': now + self.__ttl}
+        with self.__lock:
+            # Negative entries are kept until they expire, unless the account shows up in the list
+            for key, entry in self.__entries.items():
+                if entry['account'] is None and key not in entries and now < entry['expires_at']:
+                    entries[key] = entry
+            self.__entries = entries
+
+    def __set(self, key, account):
+        ttl = self.__ttl if account is not None else self.__negative_ttl
+        if ttl <= 0:
+            return
+        with self.__lock:
+            self.__entries[key] = {'account': account, 'expires_at': time.time() + ttl}
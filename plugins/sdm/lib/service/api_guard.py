@@ -0,0 +1,172 @@
+import random
+import threading
+import time
+
+import strongdm
+
+from ..exceptions import SdmApiUnavailableException
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+UNIMPLEMENTED_GRPC_CODE = 12
+UNAVAILABLE_GRPC_CODE = 14
+
+def is_unhealthy_api_error(ex):
+    """
+    Throttling, timeouts and transient server errors mean the API is struggling, any other error is a regular answer
+    """
+    if isinstance(ex, (strongdm.errors.RateLimitError, strongdm.errors.TimeoutError, strongdm.errors.InternalError)):
+        return True
+    return isinstance(ex, strongdm.errors.RPCError) and ex.code == UNAVAILABLE_GRPC_CODE
+
+def is_unsupported_api_error(ex):
+    """
+    The SDK doesn't have the service or the API rejects the call as invalid or unimplemented, so retrying it won't help
+    """
+    if isinstance(ex, (AttributeError, strongdm.errors.BadRequestError)):
+        return True
+    return isinstance(ex, strongdm.errors.RPCError) and ex.code == UNIMPLEMENTED_GRPC_CODE
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: allows rate calls per second on average, with bursts of up to burst calls
+    """
+    def __init__(self, rate, burst=None):
+        self.__rate = rate
+        self.__capacity = max(1, burst or rate)
+        self.__tokens = self.__capacity
+        self.__updated_at = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, waiting for it when the bucket is empty. Return the time waited in seconds
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated_at) * self.__rate)
+            self.__updated_at = now
+            self.__tokens -= 1
+            # A negative balance is the debt this caller has to wait for, so waiting callers are served in order
+            wait_time = -self.__tokens / self.__rate if self.__tokens < 0 else 0
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+
+class CircuitBreaker:
+    """
+    Opens after threshold consecutive failures, rejecting calls until reset_timeout seconds have passed.
+    Then a single trial call is let through: the circuit is closed again when it succeeds and re-opened when it fails.
+    """
+    def __init__(self, threshold, reset_timeout):
+        self.__threshold = threshold
+        self.__reset_timeout = reset_timeout
+        self.__state = CIRCUIT_CLOSED
+        self.__failures = 0
+        self.__opened_at = 0
+        self.__lock = threading.Lock()
+
+    def get_state(self):
+        return self.__state
+
+    def allow(self):
+        with self.__lock:
+            if self.__state == CIRCUIT_CLOSED:
+                return True
+            if self.__state == CIRCUIT_OPEN and time.monotonic() - self.__opened_at >= self.__reset_timeout:
+                self.__state = CIRCUIT_HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self.__lock:
+            self.__failures = 0
+            self.__state = CIRCUIT_CLOSED
+
+    def record_failure(self):
+        with self.__lock:
+            self.__failures += 1
+            if self.__state == CIRCUIT_HALF_OPEN or self.__failures >= self.__threshold:
+                self.__state = CIRCUIT_OPEN
+                self.__opened_at = time.monotonic()
+
+
+class ApiGuard:
+    """
+    Protects the strongDM API calls with a rate limiter, retries with jittered exponential backoff and a circuit breaker.
+
+    Every feature is disabled when its setting is 0, so a default ApiGuard just runs the calls.
+    """
+    def __init__(self, log, rate_limit=0, rate_limit_burst=0, max_retries=0, retry_backoff=0.2,
+                 circuit_breaker_threshold=0, circuit_breaker_reset_timeout=30):
+        self.__log = log
+        self.__rate_limiter = TokenBucket(rate_limit, rate_limit_burst) if rate_limit > 0 else None
+        self.__max_retries = max_retries
+        self.__retry_backoff = retry_backoff
+        self.__circuit_breaker = CircuitBreaker(circuit_breaker_threshold, circuit_breaker_reset_timeout) \
+            if circuit_breaker_threshold > 0 else None
+        self.__counters = {'throttled_calls': 0, 'retried_calls': 0, 'rejected_calls': 0}
+        self.__counters_lock = threading.Lock()
+
+    def is_enabled(self):
+        return self.__rate_limiter is not None or self.__max_retries > 0 or self.__circuit_breaker is not None
+
+    def get_state(self):
+        with self.__counters_lock:
+            state = dict(self.__counters)
+        state['circuit_state'] = self.__circuit_breaker.get_state() if self.__circuit_breaker is not None else CIRCUIT_CLOSED
+        return state
+
+    def call(self, fn, idempotent=True):
+        """
+        Run the API call in fn. Calls that are not idempotent (e.g. creating a grant) are only retried when throttled,
+        because after a timeout or a server error they might have been applied already
+        """
+        if self.__circuit_breaker is not None and not self.__circuit_breaker.allow():
+            self.__increment('rejected_calls')
+            raise SdmApiUnavailableException("The strongDM API is not responding right now, please try again in a few minutes")
+        attempt = 0
+        while True:
+            self.__wait_for_rate_limit()
+            try:
+                result = fn()
+            except Exception as ex:
+                if not is_unhealthy_api_error(ex):
+                    # The API answered, e.g. a not found or a permission error, so it's healthy
+                    self.__record_success()
+                    raise
+                is_retryable = idempotent or isinstance(ex, strongdm.errors.RateLimitError)
+                if not is_retryable or attempt >= self.__max_retries:
+                    self.__record_failure()
+                    raise
+                attempt += 1
+                self.__increment('retried_calls')
+                self.__backoff(attempt, ex)
+                continue
+            self.__record_success()
+            return result
+
+    def __wait_for_rate_limit(self):
+        if self.__rate_limiter is not None and self.__rate_limiter.acquire() > 0:
+            self.__increment('throttled_calls')
+
+    def __backoff(self, attempt, ex):
+        # Full jitter, so callers throttled at the same time don't retry at the same time
+        backoff = random.uniform(0, self.__retry_backoff * 2 ** (attempt - 1))
+        self.__log.warning("##SDM## ApiGuard retrying call in %.2f seconds (attempt %s): %s", backoff, attempt, str(ex))
+        time.sleep(backoff)
+
+    def __record_success(self):
+        if self.__circuit_breaker is not None:
+            self.__circuit_breaker.record_success()
+
+    def __record_failure(self):
+        if self.__circuit_breaker is not None:
+            self.__circuit_breaker.record_failure()
+
+    def __increment(self, counter):
+        with self.__counters_lock:
+            self.__counters[counter] += 1
@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import threading
+
+
+class AsyncSdmService:
+    """
+    Asyncio variant of SdmService with the same methods as coroutines, e.g. await service.get_role_by_name(name).
+
+    The strongDM SDK is blocking, so every call runs in the default executor of the event loop, letting the
+    fan-out methods below issue their API calls concurrently and await them together.
+    """
+    def __init__(self, sdm_service, max_concurrency=5):
+        self.__sdm_service = sdm_service
+        self.__max_concurrency = max(1, max_concurrency or 1)
+
+    def __getattr__(self, name):
+        attribute = getattr(self.__sdm_service, name)
+        if not callable(attribute):
+            return attribute
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(attribute, *args, **kwargs))
+        return call
+
+    async def get_granted_resources(self, resources, account_id):
+        """
+        Return the resources assigned to an account either directly or via a role, checking both concurrently
+        """
+        granted_resources_via_account, granted_resources_via_role = await asyncio.gather(
+            self.get_granted_resources_via_account(resources, account_id),
+            self.get_granted_resources_via_role(resources, account_id)
+        )
+        granted_resources_map = {}
+        for resource in [*granted_resources_via_account, *granted_resources_via_role]:
+            granted_resources_map.setdefault(resource.id, resource)
+        return list(granted_resources_map.values())
+
+    async def grant_temporary_access_to_resources(self, resources, account_id, start_from, valid_until):
+        """
+        Grant temporary access to the resources concurrently, returning a list of (resource, exception) for the ones that failed
+        """
+        async def grant(resource):
+            try:
+                await self.grant_temporary_access(resource.id, account_id, start_from, valid_until)
+                return None
+            except Exception as e:
+                return resource, e
+        results = await self.__gather([functools.partial(grant, resource) for resource in resources])
+        return [result for result in results if result is not None]
+
+    async def __gather(self, coroutine_fns):
+        # The semaphore is created here so it belongs to the running event loop
+        semaphore = asyncio.Semaphore(self.__max_concurrency)
+        async def run(coroutine_fn):
+            async with semaphore:
+                return await coroutine_fn()
+        return await asyncio.gather(*[run(coroutine_fn) for coroutine_fn in coroutine_fns])
+
+
+class SdmEventLoop:
+    """
+    Sync bridge for the errbot handlers: an event loop running in a background thread where coroutines are submitted
+    """
+    def __init__(self):
+        self.__loop = None
+        self.__lock = threading.Lock()
+
+    def run(self, coroutine, timeout=None):
+        """
+        Run the coroutine on the event loop, blocking the calling thread until it's done
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__get_loop()).result(timeout)
+
+    def __get_loop(self):
+        with self.__lock:
+            if self.__loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="sdm-event-loop", daemon=True).start()
+                self.__loop = loop
+            return self.__loop
+
+
+_sdm_event_loop = SdmEventLoop()
+
+def run_sync(coroutine, timeout=None):
+    """
+    Run an AsyncSdmService coroutine from sync code, e.g. run_sync(async_sdm_service.get_granted_resources(resources, account_id))
+    """
+    return _sdm_event_loop.run(coroutine, timeout=timeout)
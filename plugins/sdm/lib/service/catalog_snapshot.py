@@ -0,0 +1,76 @@
+import json
+import os
+import time
+
+import strongdm
+
+SNAPSHOT_VERSION = 1
+# Only the attributes used by AccessBot are kept, so the snapshot stays small and doesn't hold connection details
+SNAPSHOT_FIELDS = ['id', 'name', 'email', 'first_name', 'last_name', 'suspended', 'tags', 'access_rules']
+
+
+class CatalogSnapshot:
+    """
+    Compact on-disk copy of the SDM catalogs (e.g. resources, roles and accounts), used to start with warm catalogs.
+
+    Every item is stored with its strongDM model name and the attributes in SNAPSHOT_FIELDS. Snapshots written
+    with a different SNAPSHOT_VERSION are ignored.
+    """
+    def __init__(self, file_path, log):
+        self.__file_path = file_path
+        self.__log = log
+
+    def save(self, catalogs):
+        """
+        Write the catalogs, a dict of catalog name -> items, replacing the previous snapshot atomically
+        """
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'catalogs': {name: [self.__serialize(item) for item in items] for name, items in catalogs.items()},
+        }
+        folder_path = os.path.dirname(self.__file_path)
+        if folder_path:
+            os.makedirs(folder_path, exist_ok=True)
+        tmp_file_path = f"{self.__file_path}.tmp"
+        with open(tmp_file_path, "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file, separators=(',', ':'), default=str)
+        os.replace(tmp_file_path, self.__file_path)
+        self.__log.debug("##SDM## CatalogSnapshot.save catalogs: %s", ", ".join(catalogs.keys()))
+
+    def load(self):
+        """
+        Return the saved catalogs as a dict of catalog name -> items, or an empty dict when there's no valid snapshot
+        """
+        if not os.path.isfile(self.__file_path):
+            return {}
+        try:
+            with open(self.__file_path, "r") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+            if snapshot.get('version') != SNAPSHOT_VERSION:
+                self.__log.info("##SDM## CatalogSnapshot.load ignoring snapshot with version: %s", snapshot.get('version'))
+                return {}
+            self.__log.info("##SDM## CatalogSnapshot.load snapshot saved %d seconds ago", time.time() - snapshot['saved_at'])
+            return {
+                name: [item for item in (self.__deserialize(data) for data in items) if item is not None]
+                for name, items in snapshot['catalogs'].items()
+            }
+        except Exception as e:
+            self.__log.error("##SDM## CatalogSnapshot.load failed, ignoring the snapshot: %s", str(e))
+            return {}
+
+    @staticmethod
+    def __serialize(item):
+        data = {'type': type(item).__name__}
+        for field in SNAPSHOT_FIELDS:
+            value = getattr(item, field, None)
+            if value is not None:
+                data[field] = value
+        return data
+
+    @staticmethod
+    def __deserialize(data):
+        model = getattr(strongdm, data.get('type', ''), None)
+        if model is None or not hasattr(model, 'from_dict'):
+            return None
+        return model.from_dict(data)
@@ -0,0 +1,188 @@
+import datetime
+import itertools
+import json
+import random
+import threading
+import time
+
+import strongdm
+
+from .access_rules_evaluator import get_resource_type, normalize_resource_type
+
+BACKEND_STRONGDM = 'strongdm'
+BACKEND_FAKE = 'fake'
+
+# entity -> (default model, id prefix, name of the entity in the get/create responses)
+FAKE_ENTITIES = {
+    'resources': ('Postgres', 'rs-', 'resource'),
+    'roles': ('Role', 'r-', 'role'),
+    'accounts': ('User', 'a-', 'account'),
+    'account_attachments': ('AccountAttachment', 'aa-', 'account_attachment'),
+    'account_grants': ('AccountGrant', 'ag-', 'account_grant'),
+}
+GRANT_DATETIME_FIELDS = ['start_from', 'valid_until']
+
+
+class FakeSdmClient:
+    """
+    In-memory strongDM backend with the attributes of a strongdm.Client used by SdmService (e.g. client.resources.list),
+    meant for load tests and benchmarks without a strongDM tenant.
+
+    Every call waits latency seconds and fails with an InternalError with probability error_rate, so the retries and the
+    circuit breaker can be exercised too. Like orgs with Access Overhaul enabled there are no role grants,
+    roles give access through their access_rules.
+    """
+    def __init__(self, log, latency=0, error_rate=0, random_generator=None):
+        self.__log = log
+        self.__latency = latency
+        self.__error_rate = error_rate
+        self.__random = random_generator or random.Random()
+        self.__lock = threading.Lock()
+        self.resources = self.__create_store('resources')
+        self.roles = self.__create_store('roles')
+        self.accounts = self.__create_store('accounts')
+        self.account_attachments = self.__create_store('account_attachments')
+        self.account_grants = self.__create_store('account_grants')
+
+    @classmethod
+    def create(cls, log, data_file_path=None, latency=0, error_rate=0):
+        client = cls(log, latency=latency, error_rate=error_rate)
+        if data_file_path:
+            with open(data_file_path, "r") as data_file:
+                client.load(json.load(data_file))
+        return client
+
+    def load(self, data):
+        """
+        Add the items of a dict of entity -> list of model dicts, e.g. {"resources": [{"type": "Postgres", "name": "db"}]}
+        """
+        for entity, items in data.items():
+            default_model, _, _ = FAKE_ENTITIES[entity]
+            store = getattr(self, entity)
+            for item in items:
+                store.add(self.__to_model(entity, item, default_model))
+        self.__log.info("##SDM## FakeSdmClient.load items: %s", {entity: len(items) for entity, items in data.items()})
+
+    def __create_store(self, entity):
+        _, id_prefix, response_field = FAKE_ENTITIES[entity]
+        return FakeSdmStore(entity, id_prefix, response_field, self.__before_call, self.__lock)
+
+    def __before_call(self):
+        if self.__latency > 0:
+            time.sleep(self.__latency)
+        if self.__error_rate > 0 and self.__random.random() < self.__error_rate:
+            raise strongdm.errors.InternalError("Fake strongDM backend injected error")
+
+    @staticmethod
+    def __to_model(entity, item, default_model):
+        item = dict(item)
+        model = getattr(strongdm, item.pop('type', default_model))
+        if entity == 'account_grants':
+            for field in GRANT_DATETIME_FIELDS:
+                if isinstance(item.get(field), str):
+                    item[field] = datetime.datetime.fromisoformat(item[field])
+        return model.from_dict(item)
+
+
+class FakeSdmStore:
+    """
+    The items of an entity, with the list/get/create/delete methods of the strongDM SDK services
+    """
+    def __init__(self, entity, id_prefix, response_field, before_call, lock):
+        self.__entity = entity
+        self.__id_prefix = id_prefix
+        self.__response_field = response_field
+        self.__before_call = before_call
+        self.__lock = lock
+        self.__items = {}
+        self.__ids = itertools.count(1)
+
+    def add(self, item):
+        with self.__lock:
+            if not item.id:
+                item.id = f"{self.__id_prefix}{next(self.__ids)}"
+            self.__items[item.id] = item
+        return item
+
+    def list(self, filter='', *args):
+        self.__before_call()
+        terms = parse_filter(filter, args)
+        with self.__lock:
+            items = list(self.__items.values())
+        # Items are yielded lazily like the paginated SDK listings
+        return (item for item in items if self.__is_active(item) and matches_filter(item, terms))
+
+    def get(self, id):
+        self.__before_call()
+        item = self.__items.get(id)
+        if item is None or not self.__is_active(item):
+            raise strongdm.errors.NotFoundError(f"{self.__response_field} {id} not found")
+        return self.__response(item)
+
+    def create(self, item):
+        self.__before_call()
+        item.id = None
+        return self.__response(self.add(item))
+
+    def delete(self, id):
+        self.__before_call()
+        with self.__lock:
+            if self.__items.pop(id, None) is None:
+                raise strongdm.errors.NotFoundError(f"{self.__response_field} {id} not found")
+        return None
+
+    def __response(self, item):
+        return FakeSdmResponse(**{self.__response_field: item})
+
+    def __is_active(self, item):
+        # The API drops the temporary grants once they expire
+        valid_until = getattr(item, 'valid_until', None) if self.__entity == 'account_grants' else None
+        return valid_until is None or valid_until > datetime.datetime.now(datetime.timezone.utc)
+
+
+class FakeSdmResponse:
+    """
+    The get/create responses, only the field of the entity (e.g. response.account_grant) is set
+    """
+    def __init__(self, resource=None, role=None, account=None, account_attachment=None, account_grant=None):
+        self.resource = resource
+        self.role = role
+        self.account = account
+        self.account_attachment = account_attachment
+        self.account_grant = account_grant
+
+
+def parse_filter(filter, args):
+    """
+    Parse a strongDM filter (e.g. "type:postgres,tag:env=dev" or "name:?") into a dict of key -> values,
+    the ? placeholders are replaced with the args in order
+    """
+    terms = {}
+    args = iter(args)
+    for term in (filter or '').split(','):
+        if ':' not in term:
+            continue
+        key, value = term.split(':', 1)
+        if value == '?':
+            value = str(next(args, ''))
+        terms.setdefault(key.strip(), []).append(value.strip())
+    return terms
+
+
+def matches_filter(item, terms):
+    # Repeated keys match any of their values, different keys have to match all
+    return all(any(matches_term(item, key, value) for value in values) for key, values in terms.items())
+
+
+def matches_term(item, key, value):
+    if key == 'type':
+        return get_resource_type(item) == normalize_resource_type(value)
+    if key in ['tag', 'tags']:
+        # Tags may be quoted, e.g. tag:"env"="dev"
+        tag_key, _, tag_value = [part.strip('"') for part in value.partition('=')]
+        item_tags = getattr(item, 'tags', None) or {}
+        return tag_key in item_tags and (not tag_value or item_tags[tag_key] == tag_value)
+    item_value = getattr(item, key, None)
+    if item_value is None:
+        return False
+    return str(item_value).lower() == value.strip('"').lower()
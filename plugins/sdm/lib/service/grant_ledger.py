@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+
+
+class GrantLedger:
+    """
+    In-memory account_id -> {resource_id: (grant_id, valid_until)} copy of the SDM account grants.
+
+    The grants of an account are listed on first use and trusted for ttl seconds. Grants created or deleted through
+    AccessBot are written through, so they're visible right away, and every grant stops counting at its valid_until.
+    Calling reconcile lists the grants of the accounts looked up in the last ttl seconds again, picking up changes made
+    outside AccessBot, and forgets the other accounts.
+    """
+    def __init__(self, loader, log, ttl=0):
+        self.__loader = loader
+        self.__log = log
+        self.__ttl = ttl
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def is_enabled(self):
+        return self.__ttl > 0
+
+    def get_grants(self, account_id):
+        """
+        Return the active grants of an account as a dict of resource_id -> grant_id
+        """
+        entry = self.__entries.get(account_id)
+        if entry is None or time.time() >= entry['expires_at']:
+            self.__log.debug("##SDM## GrantLedger.get_grants loading account_id: %s", account_id)
+            entry = self.__load(account_id)
+        now = time.time()
+        entry['used_at'] = now
+        return {resource_id: grant_id for resource_id, (grant_id, valid_until) in list(entry['grants'].items()) if now < valid_until}
+
+    def has_grant(self, account_id, resource_id):
+        return resource_id in self.get_grants(account_id)
+
+    def get_grant_id(self, account_id, resource_id):
+        """
+        Return the id of the account grant when it's known, otherwise None
+        """
+        entry = self.__entries.get(account_id)
+        if entry is None or time.time() >= entry['expires_at']:
+            return None
+        grant_id, valid_until = entry['grants'].get(resource_id, (None, 0))
+        return grant_id if time.time() < valid_until else None
+
+    def record_grant(self, account_id, resource_id, grant_id, valid_until):
+        """
+        Write through a grant created by AccessBot, accounts that weren't loaded yet are left to the next lookup
+        """
+        with self.__lock:
+            entry = self.__entries.get(account_id)
+            if entry is not None:
+                entry['grants'][resource_id] = (grant_id, self.__get_timestamp(valid_until))
+
+    def remove_grant(self, account_id, resource_id):
+        with self.__lock:
+            entry = self.__entries.get(account_id)
+            if entry is not None:
+                entry['grants'].pop(resource_id, None)
+
+    def invalidate(self, account_id=None):
+        with self.__lock:
+            if account_id is None:
+                self.__entries = {}
+            else:
+                self.__entries.pop(account_id, None)
+
+    def reconcile(self):
+        """
+        List the grants of the recently used accounts again and forget the others, the ones that fail are loaded on
+        their next lookup
+        """
+        with self.__lock:
+            entries = list(self.__entries.items())
+        now = time.time()
+        for account_id, entry in entries:
+            if now - entry['used_at'] >= self.__ttl:
+                self.invalidate(account_id)
+                continue
+            try:
+                self.__load(account_id, used_at=entry['used_at'])
+            except Exception as e:
+                self.__log.error("##SDM## GrantLedger.reconcile failed for account_id: %s %s", account_id, str(e))
+                self.invalidate(account_id)
+
+    def __load(self, account_id, used_at=None):
+        grants = {}
+        for account_grant in self.__loader(account_id):
+            grants[account_grant.resource_id] = (account_grant.id, self.__get_timestamp(getattr(account_grant, 'valid_until', None)))
+        now = time.time()
+        entry = {'grants': grants, 'expires_at': now + self.__ttl, 'used_at': used_at if used_at is not None else now}
+        with self.__lock:
+            self.__entries[account_id] = entry
+        return entry
+
+    @staticmethod
+    def __get_timestamp(valid_until):
+        # Grants without valid_until are permanent
+        return valid_until.timestamp() if valid_until is not None else math.inf
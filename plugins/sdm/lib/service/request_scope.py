@@ -0,0 +1,48 @@
+import threading
+from contextlib import contextmanager
+
+
+class RequestScope:
+    """
+    Memoizes SDM lookups for the lifetime of one command, identified by its execution_id.
+
+    A command is handled in a single thread, so the memoized values are kept in a thread local. Opening a scope for
+    the same execution_id inside an already opened one reuses the outer scope, while opening it for a different
+    execution_id replaces it: the outer one was left open by a command generator that was never resumed.
+    """
+    def __init__(self, log):
+        self.__log = log
+        self.__local = threading.local()
+
+    @contextmanager
+    def open(self, execution_id):
+        if getattr(self.__local, 'memo', None) is not None:
+            if self.__local.execution_id == execution_id:
+                yield
+                return
+            self.__log.debug("##SDM## %s RequestScope.open discarding the scope left open by %s", execution_id, self.__local.execution_id)
+        memo = {}
+        self.__local.memo = memo
+        self.__local.execution_id = execution_id
+        try:
+            yield
+        finally:
+            # The scope might be closed from another thread when a command generator is garbage collected
+            if getattr(self.__local, 'memo', None) is memo:
+                self.__local.memo = None
+
+    def get_or_compute(self, key, compute):
+        memo = getattr(self.__local, 'memo', None)
+        if memo is None:
+            return compute()
+        if key in memo:
+            self.__log.debug("##SDM## %s RequestScope.get_or_compute reusing %s", self.__local.execution_id, str(key))
+            return memo[key]
+        value = compute()
+        memo[key] = value
+        return value
+
+    def discard(self, key):
+        memo = getattr(self.__local, 'memo', None)
+        if memo is not None:
+            memo.pop(key, None)
@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class RoleResourcesIndex:
+    """
+    Materialized role -> resources expansion, keyed by role id.
+
+    Each entry keeps the resources of a role indexed by resource id, it's computed on first use with the given
+    expander and considered fresh for ttl seconds. Entries can be invalidated one by one or rebuilt all at once.
+    """
+    def __init__(self, expander, log, ttl=0):
+        self.__expander = expander
+        self.__log = log
+        self.__ttl = ttl
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def is_enabled(self):
+        return self.__ttl > 0
+
+    def get(self, sdm_role):
+        """
+        Return a dict of resource id -> resource for the role
+        """
+        entry = self.__entries.get(sdm_role.id)
+        if entry is not None and time.time() - entry['built_at'] < self.__ttl:
+            return entry['resources']
+        return self.__build(sdm_role)
+
+    def get_resource_ids(self, sdm_role):
+        return set(self.get(sdm_role).keys())
+
+    def invalidate(self, role_id=None):
+        with self.__lock:
+            if role_id is None:
+                self.__entries = {}
+            else:
+                self.__entries.pop(role_id, None)
+
+    def rebuild(self, sdm_roles):
+        """
+        Build the entries again for the indexed roles that still exist, dropping the others
+        """
+        sdm_roles_by_id = {sdm_role.id: sdm_role for sdm_role in sdm_roles}
+        for role_id in list(self.__entries.keys()):
+            sdm_role = sdm_roles_by_id.get(role_id)
+            if sdm_role is None:
+                self.invalidate(role_id)
+                continue
+            self.__build(sdm_role)
+
+    def __build(self, sdm_role):
+        self.__log.debug("##SDM## RoleResourcesIndex.__build role_id: %s", sdm_role.id)
+        resources = {resource.id: resource for resource in self.__expander(sdm_role)}
+        with self.__lock:
+            self.__entries[sdm_role.id] = {'resources': resources, 'built_at': time.time()}
+        return resources
@@ -0,0 +1,108 @@
+import threading
+import time
+
+
+class SdmCatalog:
+    """
+    In-memory copy of a strongDM entity list (e.g. resources) indexed by id and by case-insensitive name.
+
+    The catalog is loaded on first use and considered fresh for ttl seconds. Once expired it's loaded again,
+    or, when stale_while_revalidate is enabled, the stale items are served while a background thread refreshes them.
+    """
+    def __init__(self, name, loader, log, ttl=0, stale_while_revalidate=False):
+        self.__name = name
+        self.__loader = loader
+        self.__log = log
+        self.__ttl = ttl
+        self.__stale_while_revalidate = stale_while_revalidate
+        self.__items = None
+        self.__items_by_id = {}
+        self.__items_by_name = {}
+        self.__loaded_at = 0
+        self.__refresh_lock = threading.Lock()
+        self.__revalidate_lock = threading.Lock()
+        self.__revalidating = False
+
+    def is_enabled(self):
+        return self.__ttl > 0
+
+    def is_loaded(self):
+        return self.__items is not None
+
+    def get_all(self):
+        self.__ensure_fresh()
+        return list(self.__items)
+
+    def get_by_id(self, id):
+        self.__ensure_fresh()
+        return self.__items_by_id.get(id)
+
+    def get_by_name(self, name):
+        """
+        Return the item with the exact name, or any item whose name matches ignoring case
+        """
+        self.__ensure_fresh()
+        items = self.__items_by_name.get(name.lower(), [])
+        return next((item for item in items if item.name == name), items[0] if len(items) > 0 else None)
+
+    def get_loaded_items(self):
+        """
+        Return the items currently held, without loading or refreshing them, or None when nothing was loaded yet
+        """
+        return list(self.__items) if self.__items is not None else None
+
+    def seed(self, items):
+        """
+        Load the given items (e.g. from a snapshot) as if they had just been loaded from the API
+        """
+        with self.__refresh_lock:
+            self.__set_items([item for item in items if item is not None])
+
+    def refresh(self):
+        """
+        Load all items again and swap the indexes once they are built
+        """
+        with self.__refresh_lock:
+            self.__load()
+
+    def __load(self):
+        self.__log.debug("##SDM## SdmCatalog.__load catalog: %s", self.__name)
+        self.__set_items([item for item in self.__loader() if item is not None])
+
+    def __set_items(self, items):
+        items_by_name = {}
+        for item in items:
+            items_by_name.setdefault(item.name.lower(), []).append(item)
+        self.__items_by_id = {item.id: item for item in items}
+        self.__items_by_name = items_by_name
+        self.__items = items
+        self.__loaded_at = time.time()
+
+    def __is_fresh(self):
+        return self.__items is not None and time.time() - self.__loaded_at < self.__ttl
+
+    def __ensure_fresh(self):
+        if self.__is_fresh():
+            return
+        if self.__items is not None and self.__stale_while_revalidate:
+            self.__revalidate_in_background()
+            return
+        with self.__refresh_lock:
+            # Another thread might have loaded the items while we were waiting
+            if not self.__is_fresh():
+                self.__load()
+
+    def __revalidate_in_background(self):
+        with self.__revalidate_lock:
+            if self.__revalidating:
+                return
+            self.__revalidating = True
+        threading.Thread(target=self.__revalidate, name=f"sdm-catalog-{self.__name}", daemon=True).start()
+
+    def __revalidate(self):
+        try:
+            self.refresh()
+        except Exception as ex:
+            self.__log.error("##SDM## SdmCatalog.__revalidate catalog: %s failed, serving stale items: %s", self.__name, str(ex))
+        finally:
+            self.__revalidating = False
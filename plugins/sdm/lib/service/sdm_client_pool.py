@@ -0,0 +1,71 @@
+import threading
+import time
+
+import strongdm
+
+KEEPALIVE_ROLE_NAME = "accessbot-keepalive"
+
+class SdmClientPool:
+    """
+    A fixed set of long-lived strongDM clients (one gRPC channel each) handed out in round-robin order.
+
+    It exposes the same attributes as a strongdm.Client (e.g. pool.resources.list), so it can be used wherever a client is expected.
+    """
+    def __init__(self, clients, log):
+        if len(clients) == 0:
+            raise ValueError("At least one strongDM client is required")
+        self.__clients = clients
+        self.__last_used_at = [time.time()] * len(clients)
+        self.__next_index = 0
+        self.__lock = threading.Lock()
+        self.__log = log
+
+    @classmethod
+    def create(cls, api_access_key, api_secret_key, log, size=1, retry_rate_limit_errors=True):
+        clients = [
+            strongdm.Client(api_access_key, api_secret_key, retry_rate_limit_errors=retry_rate_limit_errors)
+            for _ in range(max(1, size))
+        ]
+        return cls(clients, log)
+
+    def __getattr__(self, name):
+        return getattr(self.__next_client(), name)
+
+    def __len__(self):
+        return len(self.__clients)
+
+    def __next_client(self):
+        with self.__lock:
+            index = self.__next_index
+            self.__next_index = (index + 1) % len(self.__clients)
+            self.__last_used_at[index] = time.time()
+        return self.__clients[index]
+
+    def close(self):
+        """
+        Close the channels of all the clients, the pool can't be used afterwards
+        """
+        for index, client in enumerate(self.__clients):
+            try:
+                client.close()
+            except Exception as ex:
+                self.__log.warning("##SDM## SdmClientPool.close failed for client %s: %s", index, str(ex))
+
+    def keepalive(self, max_idle_time, call=None):
+        """
+        Issue a cheap call through every client that has been idle for at least max_idle_time seconds,
+        so its channel is not dropped by proxies or load balancers between bursts of commands.
+        The calls are run through call (e.g. ApiGuard.call) when given
+        """
+        call = call or (lambda fn: fn())
+        now = time.time()
+        for index, client in enumerate(self.__clients):
+            with self.__lock:
+                if now - self.__last_used_at[index] < max_idle_time:
+                    continue
+                self.__last_used_at[index] = now
+            try:
+                self.__log.debug("##SDM## SdmClientPool.keepalive client: %s", index)
+                call(lambda: next(iter(client.roles.list('name:?', KEEPALIVE_ROLE_NAME)), None))
+            except Exception as ex:
+                self.__log.warning("##SDM## SdmClientPool.keepalive failed for client %s: %s", index, str(ex))
@@ -1,49 +1,257 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
 from ..exceptions import NotFoundException
+from .access_rules_evaluator import AccessRulesEvaluator
+from .account_directory import AccountDirectory
+from .api_guard import ApiGuard, is_unsupported_api_error
+from .fake_sdm_client import BACKEND_FAKE, FakeSdmClient
+from .grant_ledger import GrantLedger
+from .sdm_catalog import SdmCatalog
+from .sdm_client_pool import SdmClientPool
+from .request_scope import RequestScope
+from .role_resources_index import RoleResourcesIndex
+from .single_flight import SingleFlight
 import strongdm
 
-def create_sdm_service(api_access_key, api_secret_key, log):
-    client = strongdm.Client(api_access_key, api_secret_key)
-    return SdmService(client, log)
+RESOURCES_LISTING_MAX_WORKERS = 5
+
+def create_sdm_service(api_access_key, api_secret_key, log, config=None):
+    config = config or {}
+    api_guard = ApiGuard(
+        log,
+        rate_limit=config.get('API_RATE_LIMIT') or 0,
+        rate_limit_burst=config.get('API_RATE_LIMIT_BURST') or 0,
+        max_retries=config.get('API_MAX_RETRIES') or 0,
+        circuit_breaker_threshold=config.get('API_CIRCUIT_BREAKER_THRESHOLD') or 0,
+        circuit_breaker_reset_timeout=config.get('API_CIRCUIT_BREAKER_RESET_TIMEOUT') or 30,
+    )
+    if config.get('BACKEND') == BACKEND_FAKE:
+        log.warning("##SDM## Using the in-memory fake strongDM backend, no strongDM tenant is used")
+        client = FakeSdmClient.create(
+            log,
+            data_file_path=config.get('FAKE_BACKEND_DATA_FILE'),
+            latency=(config.get('FAKE_BACKEND_LATENCY') or 0) / 1000,
+            error_rate=config.get('FAKE_BACKEND_ERROR_RATE') or 0
+        )
+    else:
+        client = SdmClientPool.create(
+            api_access_key,
+            api_secret_key,
+            log,
+            size=config.get('CLIENT_POOL_SIZE') or 1,
+            # The SDK retries throttled calls with no limit, the bounded retries of the guard are used instead
+            retry_rate_limit_errors=not config.get('API_MAX_RETRIES')
+        )
+    return SdmService(
+        client,
+        log,
+        api_guard=api_guard,
+        resource_catalog_ttl=config.get('RESOURCE_CATALOG_TTL') or 0,
+        role_catalog_ttl=config.get('ROLE_CATALOG_TTL') or 0,
+        catalog_stale_while_revalidate=bool(config.get('CATALOG_STALE_WHILE_REVALIDATE')),
+        account_directory_ttl=config.get('ACCOUNT_DIRECTORY_TTL') or 0,
+        account_directory_negative_ttl=config.get('ACCOUNT_DIRECTORY_NEGATIVE_TTL') or 0,
+        grant_ledger_ttl=config.get('GRANT_LEDGER_TTL') or 0,
+    )
 
 class SdmService:
-    def __init__(self, client, log):
+    def __init__(self, client, log, resource_catalog_ttl=0, role_catalog_ttl=0, catalog_stale_while_revalidate=False,
+                 account_directory_ttl=0, account_directory_negative_ttl=0, grant_ledger_ttl=0, api_guard=None):
         self.__client = client
         self.__log = log
+        self.__api_guard = api_guard or ApiGuard(log)
+        self.__single_flight = SingleFlight(log)
+        self.__resource_catalog = SdmCatalog(
+            'resources',
+            lambda: self.__list('resources', ''),
+            log,
+            ttl=resource_catalog_ttl,
+            stale_while_revalidate=catalog_stale_while_revalidate
+        )
+        self.__role_catalog = SdmCatalog(
+            'roles',
+            lambda: self.__list('roles', ''),
+            log,
+            ttl=role_catalog_ttl,
+            stale_while_revalidate=catalog_stale_while_revalidate
+        )
+        self.__role_resources_index = RoleResourcesIndex(self.__expand_role_resources, log, ttl=role_catalog_ttl)
+        self.__account_directory = AccountDirectory(
+            self.__find_account_by_email,
+            log,
+            ttl=account_directory_ttl,
+            negative_ttl=account_directory_negative_ttl
+        )
+        self.__grant_ledger = GrantLedger(
+            lambda account_id: self.__list('account_grants', f"account_id:{account_id}"),
+            log,
+            ttl=grant_ledger_ttl
+        )
+        self.__request_scope = RequestScope(log)
+        self.__listing_executor = ThreadPoolExecutor(max_workers=RESOURCES_LISTING_MAX_WORKERS, thread_name_prefix='sdm-listing')
+        # Whether the org supports role grants, unknown until the first role expansion (orgs with Access Overhaul don't)
+        self.__role_grants_supported = None
+        self.__access_rules_plans = {}
+
+    def request_scope(self, execution_id):
+        """
+        Context manager that memoizes account and account grant lookups until the command identified by execution_id ends
+        """
+        return self.__request_scope.open(execution_id)
+
+    def get_api_state(self):
+        """
+        Return the rate limiter, retries and circuit breaker counters and state of the strongDM API calls
+        """
+        return self.__api_guard.get_state()
+
+    def keepalive(self, max_idle_time):
+        """
+        Keep the idle client channels open, only meaningful when using a client pool
+        """
+        if isinstance(self.__client, SdmClientPool):
+            # Rate limited and rejected by an open circuit like any other call
+            self.__client.keepalive(max_idle_time, call=self.__api_guard.call)
+
+    def close(self):
+        """
+        Close the client channels, meant to be called when the service is replaced
+        """
+        if isinstance(self.__client, SdmClientPool):
+            self.__client.close()
+
+    def refresh_resource_catalog(self):
+        """
+        Reload the in-memory resources catalog, meant to be called periodically
+        """
+        try:
+            if self.__resource_catalog.is_enabled():
+                self.__resource_catalog.refresh()
+                # The resources of the roles are expanded from the catalog, so they're built again on next use
+                self.invalidate_role_resources()
+        except Exception as ex:
+            raise Exception("Refresh resource catalog failed: " + str(ex)) from ex
+
+    def refresh_role_catalog(self):
+        """
+        Reload the in-memory roles catalog and rebuild the resources of the indexed roles, meant to be called periodically
+        """
+        try:
+            if self.__role_catalog.is_enabled():
+                self.__role_catalog.refresh()
+                self.__role_resources_index.rebuild(self.__role_catalog.get_all())
+        except Exception as ex:
+            raise Exception("Refresh role catalog failed: " + str(ex)) from ex
+
+    def refresh_account_directory(self):
+        """
+        Reload all the cached accounts with a single listing, meant to be called periodically
+        """
+        try:
+            if self.__account_directory.is_enabled():
+                self.__account_directory.refresh(self.__list('accounts', ''))
+        except Exception as ex:
+            raise Exception("Refresh account directory failed: " + str(ex)) from ex
+
+    def refresh_grant_ledger(self):
+        """
+        Reconcile the in-memory account grants with the API, meant to be called periodically
+        """
+        if self.__grant_ledger.is_enabled():
+            self.__grant_ledger.reconcile()
+
+    def export_catalogs(self):
+        """
+        Return the loaded items of the enabled catalogs as a dict of catalog name -> items, e.g. for a snapshot
+        """
+        catalogs = {}
+        for name, catalog in [('resources', self.__resource_catalog), ('roles', self.__role_catalog)]:
+            items = catalog.get_loaded_items() if catalog.is_enabled() else None
+            if items is not None:
+                catalogs[name] = items
+        if self.__account_directory.is_enabled():
+            catalogs['accounts'] = self.__account_directory.get_accounts()
+        return catalogs
+
+    def import_catalogs(self, catalogs):
+        """
+        Seed the enabled catalogs with previously exported items, they are served until the next refresh
+        """
+        if 'resources' in catalogs and self.__resource_catalog.is_enabled():
+            self.__resource_catalog.seed(catalogs['resources'])
+        if 'roles' in catalogs and self.__role_catalog.is_enabled():
+            self.__role_catalog.seed(catalogs['roles'])
+        if 'resources' in catalogs or 'roles' in catalogs:
+            self.invalidate_role_resources()
+        if 'accounts' in catalogs and self.__account_directory.is_enabled():
+            self.__account_directory.refresh(catalogs['accounts'])
+
+    def invalidate_role_resources(self, role_id=None):
+        """
+        Discard the indexed resources of a role, or of all roles when no role_id is given. Called whenever the
+        resource catalog is refreshed or the catalogs are seeded
+        """
+        self.__role_resources_index.invalidate(role_id)
 
     def get_resource_by_name(self, name):
         """
         Return a SDM resouce by name
         """
+        if self.__resource_catalog.is_enabled():
+            sdm_resource = self.__get_catalog_resource_by_name(name)
+            if sdm_resource is not None:
+                return sdm_resource
         try:
             self.__log.debug("##SDM## SdmService.get_resource_by_name name: %s", name)
-            sdm_resources = list(self.__client.resources.list('name:?', name))
+            # Only the first match is needed, so the next pages are never requested
+            sdm_resource = next(self.__stream('resources', 'name:?', name), None)
         except Exception as ex:
             raise Exception("List resources failed: " + str(ex)) from ex
-        if len(sdm_resources) == 0:
+        if sdm_resource is None:
             raise NotFoundException("Sorry, cannot find that resource!")
-        return sdm_resources[0]
+        return sdm_resource
+
+    def __get_catalog_resource_by_name(self, name):
+        # Resources created after the last refresh are not in the catalog yet, so a miss falls back to the API
+        try:
+            return self.__resource_catalog.get_by_name(name)
+        except Exception as ex:
+            raise Exception("List resources failed: " + str(ex)) from ex
 
     def get_account_by_email(self, email):
         """
         Return a SDM account by email
         """
+        return self.__request_scope.get_or_compute(('account', email), lambda: self.__get_account_by_email(email))
+
+    def __get_account_by_email(self, email):
+        if self.__account_directory.is_enabled():
+            sdm_account = self.__account_directory.get(email)
+        else:
+            sdm_account = self.__find_account_by_email(email)
+        if sdm_account is None:
+            raise Exception("Sorry, cannot find your account!")
+        return sdm_account
+
+    def __find_account_by_email(self, email):
         try:
             self.__log.debug("##SDM## SdmService.get_account_by_email email: %s", email)
-            sdm_accounts = list(self.__client.accounts.list('email:{}'.format(email)))
+            sdm_accounts = self.__list('accounts', 'email:{}'.format(email))
         except Exception as ex:
             raise Exception("List accounts failed: " + str(ex)) from ex
-        if len(sdm_accounts) == 0:
-            raise Exception("Sorry, cannot find your account!")
-        return sdm_accounts[0]
+        return sdm_accounts[0] if len(sdm_accounts) > 0 else None
 
     def account_grant_exists(self, resource, account_id):
         """
         Does an account grant exists - resource assigned to an account
         """
         self.__log.debug("##SDM## SdmService.account_grant_exists resource_id: %s account_id: %s", resource.id, account_id)
-        return len(self.get_granted_resources_via_account([resource], account_id)) > 0
+        return self.__request_scope.get_or_compute(
+            ('account_grant', resource.id, account_id),
+            lambda: len(self.get_granted_resources_via_account([resource], account_id)) > 0
+        )
 
     def get_granted_resources_via_account(self, resources, account_id):
         """
@@ -51,25 +259,45 @@ class SdmService:
         """
         granted_resources = []
         try:
+            if self.__grant_ledger.is_enabled():
+                granted_resource_ids = self.__grant_ledger.get_grants(account_id)
+                return [resource for resource in resources if resource.id in granted_resource_ids]
+            if len(resources) > 1:
+                granted_resource_ids = self.__get_granted_resource_ids(account_id)
+                return [resource for resource in resources if resource.id in granted_resource_ids]
             for resource in resources:
                 self.__log.debug("##SDM## SdmService.account_grant_exists resource_id: %s account_id: %s", resource.id, account_id)
-                account_grants = list(self.__client.account_grants.list(f"resource_id:{resource.id},account_id:{account_id}"))
+                account_grants = self.__list('account_grants', f"resource_id:{resource.id},account_id:{account_id}")
                 if len(account_grants) > 0:
                     granted_resources.append(resource)
         except Exception as ex:
             raise Exception("Account grant exists failed: " + str(ex)) from ex
         return granted_resources
 
+    def __get_granted_resource_ids(self, account_id):
+        # A single query for all the account grants is cheaper than one query per resource
+        self.__log.debug("##SDM## SdmService.__get_granted_resource_ids account_id: %s", account_id)
+        return {account_grant.resource_id for account_grant in self.__list('account_grants', f"account_id:{account_id}")}
+
     def delete_account_grant(self, resource_id, account_id):
         """
         Deletes an account grant from a resource assigned to an account
         """
+        self.__request_scope.discard(('account_grant', resource_id, account_id))
         try:
             self.__log.debug("##SDM## SdmService.delete_account_grant resource_id: %s account_id: %s", resource_id, account_id)
-            account_grants = list(self.__client.account_grants.list(f"resource_id:{resource_id},account_id:{account_id}"))
-            if len(account_grants) > 0:
-                self.__client.account_grants.delete(account_grants[0].id)
+            grant_id = self.__grant_ledger.get_grant_id(account_id, resource_id)
+            if grant_id is None:
+                account_grants = self.__api_guard.call(
+                    lambda: list(self.__client.account_grants.list(f"resource_id:{resource_id},account_id:{account_id}"))
+                )
+                grant_id = account_grants[0].id if len(account_grants) > 0 else None
+            if grant_id is not None:
+                self.__api_guard.call(lambda: self.__client.account_grants.delete(grant_id), idempotent=False)
+            self.__grant_ledger.remove_grant(account_id, resource_id)
         except Exception as ex:
+            # The grant may or may not be gone, so the account grants are listed again on the next lookup
+            self.__grant_ledger.invalidate(account_id)
             raise Exception("Delete account grant failed: " + str(ex)) from ex
 
     def get_granted_resources_via_role(self, sdm_resources, account_id):
@@ -78,20 +306,32 @@ class SdmService:
 
         account -> account_attachment -> role -> (role_grant|access_rules) -> resource
         """
-        granted_resources = []
+        candidate_ids = {sdm_resource.id for sdm_resource in sdm_resources}
+        granted_ids = set()
         try:
-            for aa in list(self.__client.account_attachments.list(f"account_id:{account_id}")):
-                role = self.__client.roles.get(aa.role_id).role
-                for role_resource in self.get_all_resources_by_role(role.name, sdm_role=role):
-                    granted_resources += [sdm_resource for sdm_resource in sdm_resources if role_resource.id == sdm_resource.id]
+            role_ids = dict.fromkeys(aa.role_id for aa in self.__list('account_attachments', f"account_id:{account_id}"))
+            for role_id in role_ids:
+                if granted_ids == candidate_ids:
+                    break
+                role = self.__get_role_by_id(role_id)
+                role_resource_ids = {role_resource.id for role_resource in self.get_all_resources_by_role(role.name, sdm_role=role)}
+                granted_ids |= candidate_ids & role_resource_ids
         except Exception as ex:
             raise Exception("Role grant exists failed: " + str(ex)) from ex
-        return granted_resources
+        return [sdm_resource for sdm_resource in sdm_resources if sdm_resource.id in granted_ids]
+
+    def __get_role_by_id(self, role_id):
+        if self.__role_catalog.is_enabled():
+            sdm_role = self.__role_catalog.get_by_id(role_id)
+            if sdm_role is not None:
+                return sdm_role
+        return self.__single_flight.do(('role', role_id), lambda: self.__api_guard.call(lambda: self.__client.roles.get(role_id).role))
 
     def grant_temporary_access(self, resource_id, account_id, start_from, valid_until):
         """
         Grant temporary access to a SDM resource for an account
         """
+        self.__request_scope.discard(('account_grant', resource_id, account_id))
         try:
             self.__log.debug(
                 "##SDM## SdmService.grant_temporary_access resource_id: %s account_id: %s start_from: %s valid_until: %s",
@@ -103,8 +343,10 @@ class SdmService:
                 start_from = start_from,
                 valid_until = valid_until
             )
-            self.__client.account_grants.create(sdm_grant)
+            response = self.__api_guard.call(lambda: self.__client.account_grants.create(sdm_grant), idempotent=False)
+            self.__grant_ledger.record_grant(account_id, resource_id, response.account_grant.id, valid_until)
         except Exception as ex:
+            self.__grant_ledger.invalidate(account_id)
             raise Exception("Grant failed: " + str(ex)) from ex
 
     def get_all_resources(self, filter = ''):
@@ -113,7 +355,23 @@ class SdmService:
         """
         self.__log.debug("##SDM## SdmService.get_all_resources")
         try:
-            return self.remove_none_values(self.__client.resources.list(filter))
+            if not filter and self.__resource_catalog.is_enabled():
+                return self.__resource_catalog.get_all()
+            return self.remove_none_values(self.__list('resources', filter))
+        except Exception as ex:
+            raise Exception("List resources failed: " + str(ex)) from ex
+
+    def iter_all_resources(self, filter = ''):
+        """
+        Yield all resources as their pages arrive, without keeping the whole list in memory. The unfiltered listing
+        is the one many users request at once (e.g. show available resources), so it's coalesced instead
+        """
+        self.__log.debug("##SDM## SdmService.iter_all_resources")
+        if not filter:
+            yield from self.get_all_resources()
+            return
+        try:
+            yield from self.__stream('resources', filter)
         except Exception as ex:
             raise Exception("List resources failed: " + str(ex)) from ex
 
@@ -123,7 +381,11 @@ class SdmService:
         """
         self.__log.debug("##SDM## SdmService.get_role_by_name name: %s", name)
         try:
-            sdm_roles = list(self.__client.roles.list('name:?', name))
+            if self.__role_catalog.is_enabled():
+                sdm_role = self.__role_catalog.get_by_name(name)
+                if sdm_role is not None:
+                    return sdm_role
+            sdm_roles = self.__list('roles', 'name:?', name)
         except Exception as ex:
             raise Exception("List roles failed: " + str(ex)) from ex
         if len(sdm_roles) == 0:
@@ -136,7 +398,9 @@ class SdmService:
         """
         try:
             self.__log.debug("##SDM## SdmService.get_all_roles")
-            return list(self.__client.roles.list(''))
+            if self.__role_catalog.is_enabled():
+                return self.__role_catalog.get_all()
+            return self.__list('roles', '')
         except Exception as ex:
             raise Exception("List roles failed: " + str(ex)) from ex
 
@@ -154,25 +418,72 @@ class SdmService:
         try:
             if not sdm_role:
                 sdm_role = self.get_role_by_name(role_name)
-            resources_filters = self.__get_resources_filters_by_role(sdm_role)
-            if filter:
-                resources_filters = [f"{rf},{filter}" for rf in resources_filters]
-            return self.__get_unique_resources(resources_filters)
+            if self.__role_resources_index.is_enabled():
+                return self.__get_indexed_resources_by_role(sdm_role, filter)
+            return self.__expand_role_resources(sdm_role, filter)
         except Exception as ex:
             raise Exception("List resources by role failed: " + str(ex)) from ex
 
-    def __get_resources_filters_by_role(self, sdm_role):
-        resources_filters = []
-        role_grants_executed = True
+    def __get_indexed_resources_by_role(self, sdm_role, filter):
+        role_resources = self.__role_resources_index.get(sdm_role)
+        if not filter:
+            return list(role_resources.values())
+        return [resource for resource in self.get_all_resources(filter) if resource.id in role_resources]
+
+    def __expand_role_resources(self, sdm_role, filter=''):
+        role_grant_ids, role_grants_executed = self.__get_role_grant_ids(sdm_role)
+        access_rules_filters, access_rules_evaluator = self.__get_access_rules_plan(sdm_role, role_grants_executed)
+        if not filter and self.__resource_catalog.is_enabled() and access_rules_evaluator.is_supported():
+            return self.__evaluate_role_resources(role_grant_ids, access_rules_evaluator)
+        resources_filters = access_rules_filters
+        if len(role_grant_ids) > 0:
+            resources_filters = [",".join([f"id:{id}" for id in role_grant_ids]), *resources_filters]
+        if filter:
+            resources_filters = [f"{rf},{filter}" for rf in resources_filters]
+        return self.__get_unique_resources(resources_filters)
+
+    def __get_role_grant_ids(self, sdm_role):
+        """
+        Return the ids of the resources granted to the role and whether the role grants could be listed.
+        Only the orgs that don't support role grants fall back to the access rules, any other error (e.g. a timeout or
+        the circuit breaker being open) is raised, so a partial expansion is never returned nor indexed
+        """
+        if self.__role_grants_supported is False:
+            return [], False
         try:
-            sdm_role_grants = list(self.__client.role_grants.list(f"role_id:{sdm_role.id}"))
-            if len(sdm_role_grants) > 0:
-                rules = ",".join([f"id:{rg.resource_id}" for rg in sdm_role_grants])
-                resources_filters.append(rules)
+            sdm_role_grants = self.__list('role_grants', f"role_id:{sdm_role.id}")
+            self.__role_grants_supported = True
+            return [rg.resource_id for rg in sdm_role_grants], True
         except Exception as ex:
-            self.__log.debug("##SDM## SdmService.__get_resources_filters_by_role RoleGrants.list failed, interpreting access_rules attribute (Access Overhaul enabled?) " + str(ex))
-            role_grants_executed = False
-        access_rules = json.loads(sdm_role.access_rules) if isinstance(sdm_role.access_rules, str) else sdm_role.access_rules
+            if not is_unsupported_api_error(ex):
+                raise
+            self.__log.debug("##SDM## SdmService.__get_role_grant_ids RoleGrants.list not supported, interpreting access_rules attribute (Access Overhaul enabled?) " + str(ex))
+            # There's no need to ask again
+            self.__role_grants_supported = False
+            return [], False
+
+    def __get_access_rules_plan(self, sdm_role, role_grants_executed):
+        """
+        Return the filters and the evaluator for the access rules of the role, compiled once per role version
+        """
+        access_rules = sdm_role.access_rules
+        version = access_rules if isinstance(access_rules, str) else json.dumps(access_rules, sort_keys=True, default=str)
+        plan_key = (version, role_grants_executed)
+        cached_plan = self.__access_rules_plans.get(sdm_role.id)
+        if cached_plan is not None and cached_plan[0] == plan_key:
+            return cached_plan[1]
+        self.__log.debug("##SDM## SdmService.__get_access_rules_plan compiling access rules for role_id: %s", sdm_role.id)
+        access_rules = json.loads(access_rules) if isinstance(access_rules, str) else access_rules
+        plan = (
+            self.__compile_access_rules_filters(access_rules, role_grants_executed),
+            AccessRulesEvaluator(access_rules, use_ids=not role_grants_executed)
+        )
+        self.__access_rules_plans[sdm_role.id] = (plan_key, plan)
+        return plan
+
+    @staticmethod
+    def __compile_access_rules_filters(access_rules, role_grants_executed):
+        resources_filters = []
         for ar in access_rules:
             filters = []
             if not role_grants_executed and ar.get('ids'):
@@ -188,13 +499,69 @@ class SdmService:
                 resources_filters.append(",".join(filters))
         return resources_filters
 
+    def __evaluate_role_resources(self, role_grant_ids, access_rules_evaluator):
+        """
+        Expand the role with the resources catalog. Only the granted resources missing in the catalog,
+        e.g. created after its last refresh, are listed with the API
+        """
+        resources_map = {}
+        missing_ids = []
+        for id in [*role_grant_ids, *access_rules_evaluator.get_static_ids()]:
+            resource = self.__resource_catalog.get_by_id(id)
+            if resource is None:
+                missing_ids.append(id)
+                continue
+            resources_map.setdefault(id, resource)
+        if len(missing_ids) > 0:
+            for resource in self.__stream('resources', ",".join([f"id:{id}" for id in missing_ids])):
+                resources_map.setdefault(resource.id, resource)
+        if access_rules_evaluator.has_dynamic_rules():
+            for resource in self.__resource_catalog.get_all():
+                if access_rules_evaluator.matches(resource):
+                    resources_map.setdefault(resource.id, resource)
+        return resources_map.values()
+
     def __get_unique_resources(self, resources_filter):
         resources_map = {}
-        for filter in resources_filter:
-            resources = self.remove_none_values(self.__client.resources.list(filter))
-            resources_map |= {r.id: r for r in resources if resources_map.get(r.id) is None}
+        if len(resources_filter) == 1:
+            for resource in self.__stream('resources', resources_filter[0]):
+                resources_map.setdefault(resource.id, resource)
+            return resources_map.values()
+        # The filters (e.g. the role grants and one per access rule) are listed concurrently, merged in order
+        listings = [self.__listing_executor.submit(self.__list, 'resources', filter) for filter in resources_filter]
+        try:
+            for listing in listings:
+                for resource in listing.result():
+                    if resource is not None:
+                        resources_map.setdefault(resource.id, resource)
+        finally:
+            for listing in listings:
+                listing.cancel()
         return resources_map.values()
 
+    def __list(self, entity, *args):
+        # Identical queries issued concurrently by several commands share a single API call and its result
+        items = self.__single_flight.do(
+            (entity, *args),
+            lambda: self.__api_guard.call(lambda: list(getattr(self.__client, entity).list(*args)))
+        )
+        return list(items)
+
+    def __stream(self, entity, *args):
+        """
+        Yield the listed items lazily, skipping None values. The API guard covers opening the listing and its first
+        page, the following pages are requested as the items are consumed
+        """
+        first_page = self.__api_guard.call(lambda: self.__open_stream(entity, *args))
+        for item in first_page:
+            if item is not None:
+                yield item
+
+    def __open_stream(self, entity, *args):
+        items = iter(getattr(self.__client, entity).list(*args))
+        first_item = next(items, None)
+        return chain([first_item], items)
+
     @staticmethod
     def remove_none_values(elements):
         return [e for e in elements if e is not None]
@@ -0,0 +1,51 @@
+import threading
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function, the callers that arrive while it's still running wait for it
+    and get the same result (or exception). Once the call ends the key is forgotten, so nothing is cached.
+    """
+    def __init__(self, log):
+        self.__log = log
+        self.__calls = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self.__lock:
+            call = self.__calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self.__calls[key] = call
+        if not is_leader:
+            self.__log.debug("##SDM## SingleFlight.do waiting for in-flight call: %s", str(key))
+            return call.wait()
+        try:
+            call.result = fn()
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self.__lock:
+                self.__calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def in_flight(self):
+        return len(self.__calls)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
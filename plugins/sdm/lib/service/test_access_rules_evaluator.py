@@ -0,0 +1,83 @@
+# pylint: disable=invalid-name
+import strongdm
+
+from .access_rules_evaluator import AccessRulesEvaluator
+
+
+postgres = strongdm.Postgres(id='rs-1', name='postgres', tags={'env': 'dev', 'team': 'data'})
+redis = strongdm.Redis(id='rs-2', name='redis', tags={'env': 'dev'})
+aks = strongdm.AKSBasicAuth(id='rs-3', name='aks', tags={})
+
+class Test_matches:
+    def test_by_type(self):
+        evaluator = AccessRulesEvaluator([{'type': 'postgres'}])
+        assert evaluator.matches(postgres)
+        assert not evaluator.matches(redis)
+
+    def test_by_api_type(self):
+        evaluator = AccessRulesEvaluator([{'type': 'akshttpbasic'}])
+        assert evaluator.matches(aks)
+        assert not evaluator.matches(postgres)
+
+    def test_by_api_type_that_differs_from_the_class_name(self):
+        sql_server = strongdm.SQLServer(id='rs-4', name='sql-server', tags={})
+        evaluator = AccessRulesEvaluator([{'type': 'mssql'}])
+        assert evaluator.matches(sql_server)
+        assert not AccessRulesEvaluator([{'type': 'sqlserver'}]).is_supported()
+
+    def test_by_type_ignoring_case(self):
+        http_basic_auth = strongdm.HTTPBasicAuth(id='rs-5', name='http', tags={})
+        assert AccessRulesEvaluator([{'type': 'httpBasic'}]).matches(http_basic_auth)
+        assert AccessRulesEvaluator([{'type': 'HTTPBASIC'}]).matches(http_basic_auth)
+
+    def test_resources_of_an_unmapped_class(self):
+        ssh_cert = strongdm.SSHCert(id='rs-6', name='ssh-cert', tags={'env': 'dev'})
+        assert not AccessRulesEvaluator([{'type': 'ssh'}]).matches(ssh_cert)
+        assert AccessRulesEvaluator([{'tags': {'env': 'dev'}}]).matches(ssh_cert)
+
+    def test_by_tags(self):
+        evaluator = AccessRulesEvaluator([{'tags': {'env': 'dev', 'team': 'data'}}])
+        assert evaluator.matches(postgres)
+        assert not evaluator.matches(redis)
+
+    def test_by_type_and_tags(self):
+        evaluator = AccessRulesEvaluator([{'type': 'redis', 'tags': {'env': 'dev'}}])
+        assert evaluator.matches(redis)
+        assert not evaluator.matches(postgres)
+
+    def test_any_rule(self):
+        evaluator = AccessRulesEvaluator([{'type': 'redis'}, {'tags': {'team': 'data'}}])
+        assert evaluator.matches(redis)
+        assert evaluator.matches(postgres)
+        assert not evaluator.matches(aks)
+
+    def test_without_rules(self):
+        evaluator = AccessRulesEvaluator([])
+        assert evaluator.is_supported()
+        assert not evaluator.has_dynamic_rules()
+        assert not evaluator.matches(postgres)
+
+class Test_static_ids:
+    def test_returns_the_ids(self):
+        evaluator = AccessRulesEvaluator([{'ids': ['rs-1', 'rs-2']}, {'type': 'redis'}])
+        assert evaluator.get_static_ids() == ['rs-1', 'rs-2']
+        assert not evaluator.matches(postgres)
+
+    def test_ignores_the_ids_when_using_role_grants(self):
+        evaluator = AccessRulesEvaluator([{'ids': ['rs-1']}], use_ids=False)
+        assert evaluator.get_static_ids() == []
+        assert not evaluator.has_dynamic_rules()
+
+class Test_is_supported:
+    def test_unknown_keys(self):
+        assert not AccessRulesEvaluator([{'type': 'postgres', 'name': 'postgres'}]).is_supported()
+
+    def test_ids_mixed_with_dynamic_rules(self):
+        assert not AccessRulesEvaluator([{'ids': ['rs-1'], 'type': 'postgres'}]).is_supported()
+
+    def test_unknown_type(self):
+        assert not AccessRulesEvaluator([{'type': 'aks_basic_auth'}]).is_supported()
+        assert not AccessRulesEvaluator([{'type': 'sshCert', 'tags': {'env': 'dev'}}]).is_supported()
+
+    def test_invalid_tags(self):
+        assert not AccessRulesEvaluator([{'tags': 'env=dev'}]).is_supported()
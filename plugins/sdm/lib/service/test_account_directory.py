@@ -0,0 +1,70 @@
+# pylint: disable=invalid-name
+import time
+from unittest.mock import MagicMock
+
+from .account_directory import AccountDirectory
+
+account_email = "myaccount@test.com"
+
+
+class Test_get:
+    def test_loads_account_once_while_fresh(self):
+        loader = MagicMock(return_value=get_account(account_email))
+        directory = AccountDirectory(loader, MagicMock(), ttl=60)
+        assert directory.get(account_email).email == account_email
+        assert directory.get(account_email.upper()).email == account_email
+        loader.assert_called_once_with(account_email)
+
+    def test_loads_account_again_when_expired(self):
+        loader = MagicMock(return_value=get_account(account_email))
+        directory = AccountDirectory(loader, MagicMock(), ttl=0.01)
+        directory.get(account_email)
+        time.sleep(0.02)
+        directory.get(account_email)
+        assert loader.call_count == 2
+
+    def test_remembers_unknown_emails(self):
+        loader = MagicMock(return_value=None)
+        directory = AccountDirectory(loader, MagicMock(), ttl=60, negative_ttl=60)
+        assert directory.get(account_email) is None
+        assert directory.get(account_email) is None
+        loader.assert_called_once()
+
+    def test_doesnt_remember_unknown_emails_without_negative_ttl(self):
+        loader = MagicMock(return_value=None)
+        directory = AccountDirectory(loader, MagicMock(), ttl=60)
+        directory.get(account_email)
+        directory.get(account_email)
+        assert loader.call_count == 2
+
+
+class Test_refresh:
+    def test_replaces_cached_accounts(self):
+        loader = MagicMock(return_value=get_account(account_email))
+        directory = AccountDirectory(loader, MagicMock(), ttl=60)
+        directory.get(account_email)
+        directory.refresh([get_account(account_email, suspended=True), get_service_account()])
+        assert directory.get(account_email).suspended
+        loader.assert_called_once()
+
+    def test_replaces_negative_entries_of_new_accounts(self):
+        loader = MagicMock(return_value=None)
+        directory = AccountDirectory(loader, MagicMock(), ttl=60, negative_ttl=60)
+        directory.get(account_email)
+        directory.get("unknown@test.com")
+        directory.refresh([get_account(account_email)])
+        assert directory.get(account_email) is not None
+        assert directory.get("unknown@test.com") is None
+        assert loader.call_count == 2
+
+
+def get_account(email, suspended=False):
+    account = MagicMock()
+    account.email = email
+    account.suspended = suspended
+    return account
+
+def get_service_account():
+    account = MagicMock()
+    account.email = None
+    return account
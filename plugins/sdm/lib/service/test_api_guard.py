@@ -0,0 +1,117 @@
+# pylint: disable=invalid-name
+from unittest.mock import MagicMock, patch
+import pytest
+import strongdm
+
+from .api_guard import ApiGuard, CircuitBreaker, TokenBucket, CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN
+from ..exceptions import SdmApiUnavailableException
+
+
+def rate_limit_error():
+    return strongdm.errors.RateLimitError("rate limit exceeded", None)
+
+class Test_call:
+    def test_returns_the_result(self):
+        guard = ApiGuard(MagicMock())
+        assert guard.call(lambda: "value") == "value"
+        assert not guard.is_enabled()
+
+    def test_doesnt_retry_when_retries_are_disabled(self):
+        guard = ApiGuard(MagicMock())
+        fn = MagicMock(side_effect=rate_limit_error())
+        with pytest.raises(strongdm.errors.RateLimitError):
+            guard.call(fn)
+        fn.assert_called_once()
+
+    def test_retries_unhealthy_api_errors(self):
+        guard = ApiGuard(MagicMock(), max_retries=2, retry_backoff=0)
+        fn = MagicMock(side_effect=[rate_limit_error(), strongdm.errors.TimeoutError(), "value"])
+        assert guard.call(fn) == "value"
+        assert fn.call_count == 3
+        assert guard.get_state()['retried_calls'] == 2
+
+    def test_raises_when_retries_are_exhausted(self):
+        guard = ApiGuard(MagicMock(), max_retries=1, retry_backoff=0)
+        fn = MagicMock(side_effect=strongdm.errors.InternalError("internal error"))
+        with pytest.raises(strongdm.errors.InternalError):
+            guard.call(fn)
+        assert fn.call_count == 2
+
+    def test_doesnt_retry_regular_errors(self):
+        guard = ApiGuard(MagicMock(), max_retries=2, retry_backoff=0)
+        fn = MagicMock(side_effect=strongdm.errors.NotFoundError("not found"))
+        with pytest.raises(strongdm.errors.NotFoundError):
+            guard.call(fn)
+        fn.assert_called_once()
+
+    def test_retries_not_idempotent_calls_only_when_throttled(self):
+        guard = ApiGuard(MagicMock(), max_retries=2, retry_backoff=0)
+        throttled_fn = MagicMock(side_effect=[rate_limit_error(), "value"])
+        timed_out_fn = MagicMock(side_effect=strongdm.errors.TimeoutError())
+        assert guard.call(throttled_fn, idempotent=False) == "value"
+        with pytest.raises(strongdm.errors.TimeoutError):
+            guard.call(timed_out_fn, idempotent=False)
+        timed_out_fn.assert_called_once()
+
+    def test_fails_fast_when_the_circuit_is_open(self):
+        guard = ApiGuard(MagicMock(), circuit_breaker_threshold=2)
+        fn = MagicMock(side_effect=strongdm.errors.TimeoutError())
+        for _ in range(2):
+            with pytest.raises(strongdm.errors.TimeoutError):
+                guard.call(fn)
+        with pytest.raises(SdmApiUnavailableException):
+            guard.call(fn)
+        assert fn.call_count == 2
+        assert guard.get_state() == {'throttled_calls': 0, 'retried_calls': 0, 'rejected_calls': 1, 'circuit_state': CIRCUIT_OPEN}
+
+    def test_regular_errors_dont_open_the_circuit(self):
+        guard = ApiGuard(MagicMock(), circuit_breaker_threshold=1)
+        with pytest.raises(strongdm.errors.NotFoundError):
+            guard.call(MagicMock(side_effect=strongdm.errors.NotFoundError("not found")))
+        assert guard.get_state()['circuit_state'] == CIRCUIT_CLOSED
+
+    def test_counts_throttled_calls(self):
+        with patch('time.monotonic', return_value=100), patch('time.sleep'):
+            guard = ApiGuard(MagicMock(), rate_limit=1, rate_limit_burst=1)
+            guard.call(lambda: "value")
+            guard.call(lambda: "value")
+        assert guard.get_state()['throttled_calls'] == 1
+
+class Test_circuit_breaker:
+    def test_lets_a_trial_call_through_after_the_reset_timeout(self):
+        circuit_breaker = CircuitBreaker(1, 30)
+        with patch('time.monotonic', return_value=100):
+            circuit_breaker.record_failure()
+            assert not circuit_breaker.allow()
+        with patch('time.monotonic', return_value=130):
+            assert circuit_breaker.allow()
+            assert circuit_breaker.get_state() == CIRCUIT_HALF_OPEN
+            assert not circuit_breaker.allow()
+
+    def test_closes_when_the_trial_call_succeeds(self):
+        circuit_breaker = CircuitBreaker(1, 0)
+        circuit_breaker.record_failure()
+        assert circuit_breaker.allow()
+        circuit_breaker.record_success()
+        assert circuit_breaker.get_state() == CIRCUIT_CLOSED
+
+    def test_opens_again_when_the_trial_call_fails(self):
+        circuit_breaker = CircuitBreaker(5, 0)
+        for _ in range(5):
+            circuit_breaker.record_failure()
+        assert circuit_breaker.allow()
+        circuit_breaker.record_failure()
+        assert circuit_breaker.get_state() == CIRCUIT_OPEN
+
+class Test_token_bucket:
+    def test_allows_bursts(self):
+        token_bucket = TokenBucket(1, 3)
+        assert [token_bucket.acquire() for _ in range(3)] == [0, 0, 0]
+
+    def test_waits_when_the_bucket_is_empty(self):
+        with patch('time.monotonic', return_value=100), patch('time.sleep') as sleep:
+            token_bucket = TokenBucket(1, 1)
+            token_bucket.acquire()
+            wait_time = token_bucket.acquire()
+        assert wait_time == pytest.approx(1)
+        sleep.assert_called_once_with(wait_time)
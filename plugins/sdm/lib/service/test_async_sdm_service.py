@@ -0,0 +1,82 @@
+# pylint: disable=invalid-name
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+from .async_sdm_service import AsyncSdmService, SdmEventLoop, run_sync
+
+
+def get_resource(id):
+    resource = MagicMock()
+    resource.id = id
+    return resource
+
+class Test_same_api:
+    def test_runs_service_methods_as_coroutines(self):
+        sdm_service = MagicMock()
+        sdm_service.get_role_by_name.return_value = "role"
+        async_sdm_service = AsyncSdmService(sdm_service)
+        assert asyncio.run(async_sdm_service.get_role_by_name("role-name")) == "role"
+        sdm_service.get_role_by_name.assert_called_once_with("role-name")
+
+    def test_raises_service_exceptions(self):
+        sdm_service = MagicMock()
+        sdm_service.get_role_by_name.side_effect = Exception("Sorry, cannot find that role!")
+        async_sdm_service = AsyncSdmService(sdm_service)
+        try:
+            asyncio.run(async_sdm_service.get_role_by_name("role-name"))
+            assert False
+        except Exception as e:
+            assert str(e) == "Sorry, cannot find that role!"
+
+class Test_get_granted_resources:
+    def test_removes_duplicated_resources(self):
+        resource1, resource2 = get_resource(1), get_resource(2)
+        sdm_service = MagicMock()
+        sdm_service.get_granted_resources_via_account.return_value = [resource1]
+        sdm_service.get_granted_resources_via_role.return_value = [resource1, resource2]
+        granted_resources = asyncio.run(AsyncSdmService(sdm_service).get_granted_resources([resource1, resource2], 55))
+        assert granted_resources == [resource1, resource2]
+
+class Test_grant_temporary_access_to_resources:
+    def test_returns_failed_grants(self):
+        resource1, resource2 = get_resource(1), get_resource(2)
+        error = Exception("Grant failed")
+        sdm_service = MagicMock()
+        def grant(resource_id, *args):
+            if resource_id == 2:
+                raise error
+        sdm_service.grant_temporary_access.side_effect = grant
+        failed_grants = asyncio.run(AsyncSdmService(sdm_service).grant_temporary_access_to_resources([resource1, resource2], 55, None, None))
+        assert failed_grants == [(resource2, error)]
+        assert sdm_service.grant_temporary_access.call_count == 2
+
+    def test_limits_the_grants_in_flight(self):
+        in_flight = []
+        max_in_flight = []
+        lock = threading.Lock()
+        def grant(*args):
+            with lock:
+                in_flight.append(1)
+                max_in_flight.append(len(in_flight))
+            threading.Event().wait(0.01)
+            with lock:
+                in_flight.pop()
+        sdm_service = MagicMock()
+        sdm_service.grant_temporary_access.side_effect = grant
+        resources = [get_resource(id) for id in range(6)]
+        asyncio.run(AsyncSdmService(sdm_service, max_concurrency=2).grant_temporary_access_to_resources(resources, 55, None, None))
+        assert max(max_in_flight) <= 2
+        assert sdm_service.grant_temporary_access.call_count == 6
+
+class Test_run_sync:
+    def test_runs_the_coroutine_in_the_event_loop_thread(self):
+        async def get_thread_name():
+            return threading.current_thread().name
+        assert run_sync(get_thread_name()) == "sdm-event-loop"
+
+    def test_reuses_the_event_loop(self):
+        event_loop = SdmEventLoop()
+        async def get_loop():
+            return asyncio.get_running_loop()
+        assert event_loop.run(get_loop()) is event_loop.run(get_loop())
@@ -0,0 +1,55 @@
+# pylint: disable=invalid-name
+import json
+from unittest.mock import MagicMock
+import strongdm
+
+from .catalog_snapshot import CatalogSnapshot
+
+
+def get_catalogs():
+    return {
+        'resources': [strongdm.Postgres(id='rs-1', name='postgres', tags={'env': 'dev'}, password='secret')],
+        'roles': [strongdm.Role(id='r-1', name='role', access_rules=[{'type': 'postgres'}], tags={})],
+        'accounts': [strongdm.User(id='a-1', email='user@test.com', tags={'sdm-roles': 'role'})],
+    }
+
+class Test_save_and_load:
+    def test_restores_the_catalogs(self, tmp_path):
+        snapshot = CatalogSnapshot(str(tmp_path / 'snapshot.json'), MagicMock())
+        snapshot.save(get_catalogs())
+        catalogs = snapshot.load()
+        resource, role, account = catalogs['resources'][0], catalogs['roles'][0], catalogs['accounts'][0]
+        assert isinstance(resource, strongdm.Postgres)
+        assert (resource.id, resource.name, resource.tags) == ('rs-1', 'postgres', {'env': 'dev'})
+        assert (role.id, role.name, role.access_rules) == ('r-1', 'role', [{'type': 'postgres'}])
+        assert isinstance(account, strongdm.User)
+        assert (account.id, account.email, account.tags) == ('a-1', 'user@test.com', {'sdm-roles': 'role'})
+
+    def test_doesnt_save_connection_details(self, tmp_path):
+        file_path = tmp_path / 'snapshot.json'
+        CatalogSnapshot(str(file_path), MagicMock()).save(get_catalogs())
+        assert 'secret' not in file_path.read_text()
+
+    def test_creates_the_folder(self, tmp_path):
+        snapshot = CatalogSnapshot(str(tmp_path / 'data' / 'snapshot.json'), MagicMock())
+        snapshot.save(get_catalogs())
+        assert len(snapshot.load()['resources']) == 1
+
+class Test_load:
+    def test_when_there_is_no_snapshot(self, tmp_path):
+        assert CatalogSnapshot(str(tmp_path / 'snapshot.json'), MagicMock()).load() == {}
+
+    def test_when_the_snapshot_is_corrupt(self, tmp_path):
+        file_path = tmp_path / 'snapshot.json'
+        file_path.write_text('{"version": 1, "catalogs"')
+        assert CatalogSnapshot(str(file_path), MagicMock()).load() == {}
+
+    def test_when_the_snapshot_has_another_version(self, tmp_path):
+        file_path = tmp_path / 'snapshot.json'
+        file_path.write_text(json.dumps({'version': 0, 'saved_at': 0, 'catalogs': {'resources': []}}))
+        assert CatalogSnapshot(str(file_path), MagicMock()).load() == {}
+
+    def test_skips_unknown_models(self, tmp_path):
+        file_path = tmp_path / 'snapshot.json'
+        file_path.write_text(json.dumps({'version': 1, 'saved_at': 0, 'catalogs': {'resources': [{'type': 'Unknown', 'id': 'rs-1'}]}}))
+        assert CatalogSnapshot(str(file_path), MagicMock()).load() == {'resources': []}
@@ -0,0 +1,96 @@
+# pylint: disable=invalid-name
+import datetime
+import random
+from unittest.mock import MagicMock, patch
+import pytest
+import strongdm
+
+from .fake_sdm_client import FakeSdmClient, parse_filter
+from .sdm_service import SdmService, create_sdm_service
+
+data = {
+    'resources': [
+        {'type': 'Postgres', 'id': 'rs-1', 'name': 'pg-dev', 'tags': {'env': 'dev'}},
+        {'type': 'Postgres', 'id': 'rs-2', 'name': 'pg-prod', 'tags': {'env': 'prod'}},
+        {'type': 'AKSBasicAuth', 'id': 'rs-3', 'name': 'aks-dev', 'tags': {'env': 'dev'}},
+        {'type': 'SQLServer', 'id': 'rs-4', 'name': 'mssql-dev', 'tags': {'env': 'dev'}},
+    ],
+    'roles': [{'id': 'r-1', 'name': 'dev', 'access_rules': [{'type': 'postgres', 'tags': {'env': 'dev'}}, {'ids': ['rs-3']}]}],
+    'accounts': [{'id': 'a-1', 'email': 'User@Example.com'}],
+    'account_attachments': [{'account_id': 'a-1', 'role_id': 'r-1'}],
+}
+
+
+def create_client(**kwargs):
+    client = FakeSdmClient(MagicMock(), **kwargs)
+    client.load(data)
+    return client
+
+class Test_list:
+    def test_filters_by_type_and_tags(self):
+        client = create_client()
+        assert [r.id for r in client.resources.list('type:postgres,tag:env=dev')] == ['rs-1']
+        assert [r.id for r in client.resources.list('type:akshttpbasic')] == ['rs-3']
+
+    def test_filters_by_the_api_type(self):
+        client = create_client()
+        assert [r.id for r in client.resources.list('type:mssql')] == ['rs-4']
+        assert list(client.resources.list('type:sqlserver')) == []
+
+    def test_repeated_keys_match_any_value(self):
+        assert [r.id for r in create_client().resources.list('id:rs-1,id:rs-2')] == ['rs-1', 'rs-2']
+
+    def test_replaces_the_placeholders(self):
+        client = create_client()
+        assert [r.id for r in client.resources.list('name:?', 'pg-prod')] == ['rs-2']
+        assert [a.id for a in client.accounts.list('email:user@example.com')] == ['a-1']
+
+    def test_parse_filter(self):
+        assert parse_filter('resource_id:?,account_id:a-1', ['rs-1']) == {'resource_id': ['rs-1'], 'account_id': ['a-1']}
+
+class Test_account_grants:
+    def test_creates_and_deletes_grants(self):
+        client = create_client()
+        valid_until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+        response = client.account_grants.create(strongdm.AccountGrant(resource_id='rs-1', account_id='a-1', valid_until=valid_until))
+        assert [g.id for g in client.account_grants.list('account_id:a-1')] == [response.account_grant.id]
+        client.account_grants.delete(response.account_grant.id)
+        assert list(client.account_grants.list('account_id:a-1')) == []
+
+    def test_drops_expired_grants(self):
+        client = create_client()
+        valid_until = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)
+        client.account_grants.create(strongdm.AccountGrant(resource_id='rs-1', account_id='a-1', valid_until=valid_until))
+        assert list(client.account_grants.list('account_id:a-1')) == []
+
+    def test_raises_not_found(self):
+        with pytest.raises(strongdm.errors.NotFoundError):
+            create_client().account_grants.delete('ag-404')
+
+class Test_faults:
+    def test_injects_errors(self):
+        client = create_client(error_rate=0.5, random_generator=random.Random(1))
+        errors = 0
+        for _ in range(20):
+            try:
+                client.roles.get('r-1')
+            except strongdm.errors.InternalError:
+                errors += 1
+        assert 0 < errors < 20
+
+    def test_injects_latency(self):
+        with patch('time.sleep') as sleep:
+            create_client(latency=0.2).roles.list('')
+        sleep.assert_called_once_with(0.2)
+
+class Test_sdm_service:
+    def test_serves_the_service(self):
+        service = SdmService(create_client(), MagicMock())
+        assert service.get_account_by_email('user@example.com').id == 'a-1'
+        assert sorted(r.id for r in service.get_all_resources_by_role('dev')) == ['rs-1', 'rs-3']
+        resources = service.get_granted_resources_via_role([service.get_resource_by_name('pg-prod'), service.get_resource_by_name('pg-dev')], 'a-1')
+        assert [r.id for r in resources] == ['rs-1']
+
+    def test_is_selected_with_the_config(self):
+        service = create_sdm_service(None, None, MagicMock(), config={'BACKEND': 'fake'})
+        assert service.get_all_resources() == []
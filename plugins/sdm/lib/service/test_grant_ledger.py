@@ -0,0 +1,95 @@
+# pylint: disable=invalid-name
+import datetime
+from unittest.mock import MagicMock, patch
+
+from .grant_ledger import GrantLedger
+
+account_id = 55
+now = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def get_account_grant(id, resource_id, valid_until=None):
+    account_grant = MagicMock()
+    account_grant.id = id
+    account_grant.resource_id = resource_id
+    account_grant.valid_until = valid_until
+    return account_grant
+
+class Test_get_grants:
+    def test_loads_the_account_grants_once(self):
+        loader = MagicMock(return_value=[get_account_grant("ag-1", 1), get_account_grant("ag-2", 2)])
+        ledger = GrantLedger(loader, MagicMock(), ttl=60)
+        assert ledger.get_grants(account_id) == {1: "ag-1", 2: "ag-2"}
+        assert ledger.has_grant(account_id, 1)
+        assert not ledger.has_grant(account_id, 3)
+        loader.assert_called_once_with(account_id)
+
+    def test_reloads_after_the_ttl(self):
+        loader = MagicMock(return_value=[])
+        ledger = GrantLedger(loader, MagicMock(), ttl=60)
+        with patch('time.time', return_value=now.timestamp()):
+            ledger.get_grants(account_id)
+        with patch('time.time', return_value=now.timestamp() + 60):
+            ledger.get_grants(account_id)
+        assert loader.call_count == 2
+
+    def test_expires_grants_at_valid_until(self):
+        valid_until = now + datetime.timedelta(seconds=10)
+        ledger = GrantLedger(lambda _: [get_account_grant("ag-1", 1, valid_until)], MagicMock(), ttl=60)
+        with patch('time.time', return_value=now.timestamp()):
+            assert ledger.has_grant(account_id, 1)
+        with patch('time.time', return_value=valid_until.timestamp()):
+            assert not ledger.has_grant(account_id, 1)
+            assert ledger.get_grant_id(account_id, 1) is None
+
+class Test_write_through:
+    def test_records_grants_of_loaded_accounts(self):
+        loader = MagicMock(return_value=[])
+        ledger = GrantLedger(loader, MagicMock(), ttl=60)
+        ledger.get_grants(account_id)
+        ledger.record_grant(account_id, 1, "ag-1", datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1))
+        assert ledger.get_grant_id(account_id, 1) == "ag-1"
+        ledger.remove_grant(account_id, 1)
+        assert not ledger.has_grant(account_id, 1)
+        loader.assert_called_once()
+
+    def test_ignores_grants_of_unknown_accounts(self):
+        ledger = GrantLedger(MagicMock(return_value=[]), MagicMock(), ttl=60)
+        ledger.record_grant(account_id, 1, "ag-1", None)
+        assert ledger.get_grant_id(account_id, 1) is None
+        assert not ledger.has_grant(account_id, 1)
+
+class Test_reconcile:
+    def test_reloads_the_known_accounts(self):
+        loader = MagicMock(side_effect=[[get_account_grant("ag-1", 1)], []])
+        ledger = GrantLedger(loader, MagicMock(), ttl=60)
+        ledger.get_grants(account_id)
+        ledger.reconcile()
+        assert ledger.get_grants(account_id) == {}
+        assert loader.call_count == 2
+
+    def test_forgets_the_accounts_that_fail(self):
+        loader = MagicMock(side_effect=[[get_account_grant("ag-1", 1)], Exception("List failed"), []])
+        log = MagicMock()
+        ledger = GrantLedger(loader, log, ttl=60)
+        ledger.get_grants(account_id)
+        ledger.reconcile()
+        log.error.assert_called_once()
+        assert ledger.get_grants(account_id) == {}
+        assert loader.call_count == 3
+
+    def test_forgets_the_accounts_not_used_within_the_ttl(self):
+        loader = MagicMock(return_value=[])
+        ledger = GrantLedger(loader, MagicMock(), ttl=60)
+        with patch('time.time', return_value=now.timestamp()):
+            ledger.get_grants(account_id)
+            ledger.get_grants(account_id + 1)
+        with patch('time.time', return_value=now.timestamp() + 30):
+            ledger.get_grants(account_id)
+        with patch('time.time', return_value=now.timestamp() + 60):
+            ledger.reconcile()
+            assert loader.call_count == 3
+            loader.assert_called_with(account_id)
+        with patch('time.time', return_value=now.timestamp() + 90):
+            ledger.reconcile()
+        assert loader.call_count == 3
@@ -0,0 +1,88 @@
+# pylint: disable=invalid-name
+import threading
+from unittest.mock import MagicMock
+
+from .request_scope import RequestScope
+
+
+class Test_get_or_compute:
+    def test_computes_every_time_outside_a_scope(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(return_value="value")
+        scope.get_or_compute("key", compute)
+        scope.get_or_compute("key", compute)
+        assert compute.call_count == 2
+
+    def test_computes_once_inside_a_scope(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(return_value="value")
+        with scope.open("exec01"):
+            assert scope.get_or_compute("key", compute) == "value"
+            assert scope.get_or_compute("key", compute) == "value"
+        compute.assert_called_once()
+
+    def test_forgets_values_when_the_scope_ends(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(return_value="value")
+        with scope.open("exec01"):
+            scope.get_or_compute("key", compute)
+        with scope.open("exec02"):
+            scope.get_or_compute("key", compute)
+        assert compute.call_count == 2
+
+    def test_nested_scopes_of_the_same_execution_share_values(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(return_value="value")
+        with scope.open("exec01"):
+            scope.get_or_compute("key", compute)
+            with scope.open("exec01"):
+                scope.get_or_compute("key", compute)
+            scope.get_or_compute("key", compute)
+        compute.assert_called_once()
+
+    def test_scope_of_another_execution_replaces_the_open_one(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(return_value="value")
+        with scope.open("exec01"):
+            scope.get_or_compute("key", compute)
+            with scope.open("exec02"):
+                scope.get_or_compute("key", compute)
+        assert compute.call_count == 2
+
+    def test_abandoned_command_generator_doesnt_leak_its_values(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(side_effect=["stale", "fresh"])
+
+        def command():
+            with scope.open("exec01"):
+                yield scope.get_or_compute("key", compute)
+                yield "never resumed"
+
+        abandoned_command = command()
+        assert next(abandoned_command) == "stale"
+        with scope.open("exec02"):
+            assert scope.get_or_compute("key", compute) == "fresh"
+        # Closing it from another thread can't reset the scope of this one
+        thread = threading.Thread(target=abandoned_command.close)
+        thread.start()
+        thread.join()
+        assert scope.get_or_compute("key", MagicMock(return_value="computed")) == "computed"
+
+    def test_scopes_are_not_shared_between_threads(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(return_value="value")
+        with scope.open("exec01"):
+            scope.get_or_compute("key", compute)
+            thread = threading.Thread(target=scope.get_or_compute, args=("key", compute))
+            thread.start()
+            thread.join()
+        assert compute.call_count == 2
+
+    def test_discard(self):
+        scope = RequestScope(MagicMock())
+        compute = MagicMock(return_value="value")
+        with scope.open("exec01"):
+            scope.get_or_compute("key", compute)
+            scope.discard("key")
+            scope.get_or_compute("key", compute)
+        assert compute.call_count == 2
@@ -0,0 +1,66 @@
+# pylint: disable=invalid-name
+from unittest.mock import MagicMock
+
+from .role_resources_index import RoleResourcesIndex
+
+
+class Test_get:
+    def test_expands_role_once_while_fresh(self):
+        expander = MagicMock(return_value=[get_resource(1), get_resource(2)])
+        index = RoleResourcesIndex(expander, MagicMock(), ttl=60)
+        assert index.get_resource_ids(get_role(10)) == {1, 2}
+        assert index.get_resource_ids(get_role(10)) == {1, 2}
+        expander.assert_called_once()
+
+    def test_expands_each_role(self):
+        expander = MagicMock(side_effect=lambda role: [get_resource(role.id * 10)])
+        index = RoleResourcesIndex(expander, MagicMock(), ttl=60)
+        assert index.get_resource_ids(get_role(1)) == {10}
+        assert index.get_resource_ids(get_role(2)) == {20}
+
+
+class Test_invalidate:
+    def test_invalidates_single_role(self):
+        expander = MagicMock(side_effect=lambda role: [get_resource(role.id * 10)])
+        index = RoleResourcesIndex(expander, MagicMock(), ttl=60)
+        index.get(get_role(1))
+        index.get(get_role(2))
+        index.invalidate(1)
+        index.get(get_role(1))
+        index.get(get_role(2))
+        assert expander.call_count == 3
+
+    def test_invalidates_all_roles(self):
+        expander = MagicMock(side_effect=lambda role: [get_resource(role.id * 10)])
+        index = RoleResourcesIndex(expander, MagicMock(), ttl=60)
+        index.get(get_role(1))
+        index.get(get_role(2))
+        index.invalidate()
+        index.get(get_role(1))
+        index.get(get_role(2))
+        assert expander.call_count == 4
+
+
+class Test_rebuild:
+    def test_rebuilds_indexed_roles_and_drops_deleted_ones(self):
+        expander = MagicMock(side_effect=lambda role: [get_resource(role.id * 10)])
+        index = RoleResourcesIndex(expander, MagicMock(), ttl=60)
+        index.get(get_role(1))
+        index.get(get_role(2))
+        index.rebuild([get_role(1), get_role(3)])
+        assert expander.call_count == 3
+        expander.assert_called_with(get_role(1))
+        index.get(get_role(2))
+        assert expander.call_count == 4
+
+
+def get_role(id):
+    role = MagicMock()
+    role.id = id
+    role.__eq__ = lambda self, other: self.id == other.id
+    return role
+
+def get_resource(id):
+    resource = MagicMock()
+    resource.id = id
+    return resource
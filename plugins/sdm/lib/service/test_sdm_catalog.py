@@ -0,0 +1,86 @@
+# pylint: disable=invalid-name
+import threading
+import time
+from unittest.mock import MagicMock
+
+from .sdm_catalog import SdmCatalog
+
+
+class Test_get_all:
+    def test_loads_once_while_fresh(self):
+        loader = MagicMock(return_value=[get_item(1, "Resource1"), None])
+        catalog = SdmCatalog('resources', loader, MagicMock(), ttl=60)
+        assert len(catalog.get_all()) == 1
+        assert len(catalog.get_all()) == 1
+        loader.assert_called_once()
+
+    def test_loads_again_when_expired(self):
+        loader = MagicMock(return_value=[get_item(1, "Resource1")])
+        catalog = SdmCatalog('resources', loader, MagicMock(), ttl=0.01)
+        catalog.get_all()
+        time.sleep(0.02)
+        catalog.get_all()
+        assert loader.call_count == 2
+
+    def test_serves_stale_items_while_revalidating(self):
+        slow_api = threading.Event()
+        def load():
+            if loader.call_count > 1:
+                slow_api.wait()
+            return [get_item(loader.call_count, "Resource")]
+        loader = MagicMock(side_effect=load)
+        catalog = SdmCatalog('resources', loader, MagicMock(), ttl=0.05, stale_while_revalidate=True)
+        catalog.get_all()
+        time.sleep(0.06)
+        assert catalog.get_all()[0].id == 1
+        slow_api.set()
+        wait_for(lambda: catalog.get_all()[0].id > 1)
+
+
+class Test_seed:
+    def test_serves_seeded_items_without_loading(self):
+        loader = MagicMock(return_value=[get_item(2, "Resource2")])
+        catalog = SdmCatalog('resources', loader, MagicMock(), ttl=60)
+        catalog.seed([get_item(1, "Resource1"), None])
+        assert catalog.get_by_name("resource1").id == 1
+        assert len(catalog.get_loaded_items()) == 1
+        loader.assert_not_called()
+
+    def test_refresh_replaces_seeded_items(self):
+        catalog = SdmCatalog('resources', lambda: [get_item(2, "Resource2")], MagicMock(), ttl=60)
+        catalog.seed([get_item(1, "Resource1")])
+        catalog.refresh()
+        assert [item.id for item in catalog.get_all()] == [2]
+
+    def test_get_loaded_items_when_not_loaded(self):
+        catalog = SdmCatalog('resources', MagicMock(), MagicMock(), ttl=60)
+        assert catalog.get_loaded_items() is None
+
+
+class Test_indexes:
+    def test_get_by_name_ignores_case(self):
+        catalog = SdmCatalog('resources', lambda: [get_item(1, "Resource1")], MagicMock(), ttl=60)
+        assert catalog.get_by_name("rEsOuRcE1").id == 1
+        assert catalog.get_by_name("resource2") is None
+
+    def test_get_by_name_prefers_exact_match(self):
+        catalog = SdmCatalog('resources', lambda: [get_item(1, "RESOURCE1"), get_item(2, "resource1")], MagicMock(), ttl=60)
+        assert catalog.get_by_name("resource1").id == 2
+
+    def test_get_by_id(self):
+        catalog = SdmCatalog('resources', lambda: [get_item(1, "Resource1")], MagicMock(), ttl=60)
+        assert catalog.get_by_id(1).name == "Resource1"
+        assert catalog.get_by_id(2) is None
+
+
+def get_item(id, name):
+    item = MagicMock()
+    item.id = id
+    item.name = name
+    return item
+
+def wait_for(condition, timeout=1):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
@@ -0,0 +1,68 @@
+# pylint: disable=invalid-name
+from unittest.mock import MagicMock
+import pytest
+
+from .sdm_client_pool import SdmClientPool, KEEPALIVE_ROLE_NAME
+
+
+class Test_round_robin:
+    def test_uses_clients_in_order(self):
+        clients = [MagicMock(), MagicMock()]
+        pool = SdmClientPool(clients, MagicMock())
+        pool.resources.list('')
+        pool.resources.list('')
+        pool.resources.list('')
+        assert clients[0].resources.list.call_count == 2
+        assert clients[1].resources.list.call_count == 1
+
+    def test_requires_at_least_one_client(self):
+        with pytest.raises(ValueError):
+            SdmClientPool([], MagicMock())
+
+
+class Test_keepalive:
+    def test_pings_idle_clients(self):
+        clients = [MagicMock(), MagicMock()]
+        pool = SdmClientPool(clients, MagicMock())
+        pool.keepalive(0)
+        clients[0].roles.list.assert_called_with('name:?', KEEPALIVE_ROLE_NAME)
+        clients[1].roles.list.assert_called_with('name:?', KEEPALIVE_ROLE_NAME)
+
+    def test_skips_recently_used_clients(self):
+        clients = [MagicMock(), MagicMock()]
+        pool = SdmClientPool(clients, MagicMock())
+        pool.keepalive(60)
+        clients[0].roles.list.assert_not_called()
+        clients[1].roles.list.assert_not_called()
+
+    def test_does_not_raise_when_ping_fails(self):
+        client = MagicMock()
+        client.roles.list = MagicMock(side_effect=Exception("unavailable"))
+        pool = SdmClientPool([client], MagicMock())
+        pool.keepalive(0)
+
+    def test_runs_pings_through_the_given_call(self):
+        clients = [MagicMock(), MagicMock()]
+        call = MagicMock(side_effect=lambda fn: fn())
+        pool = SdmClientPool(clients, MagicMock())
+        pool.keepalive(0, call=call)
+        assert call.call_count == 2
+        clients[0].roles.list.assert_called_with('name:?', KEEPALIVE_ROLE_NAME)
+
+    def test_skips_the_ping_when_the_call_is_rejected(self):
+        client = MagicMock()
+        log = MagicMock()
+        pool = SdmClientPool([client], log)
+        pool.keepalive(0, call=MagicMock(side_effect=Exception("circuit open")))
+        client.roles.list.assert_not_called()
+        log.warning.assert_called_once()
+
+
+class Test_close:
+    def test_closes_every_client(self):
+        clients = [MagicMock(), MagicMock()]
+        clients[0].close.side_effect = Exception("already closed")
+        pool = SdmClientPool(clients, MagicMock())
+        pool.close()
+        clients[0].close.assert_called_once()
+        clients[1].close.assert_called_once()
@@ -1,13 +1,18 @@
 # pylint: disable=redefined-outer-name
 # pylint: disable=invalid-name
 import datetime
+import json
+import threading
+import time
 import traceback
 from datetime import timezone, timedelta
-from unittest.mock import MagicMock, call
+from unittest.mock import MagicMock, call, patch
 import pytest
 import strongdm
 import sys
 
+from .api_guard import ApiGuard
+from .sdm_client_pool import SdmClientPool
 from .sdm_service import SdmService
 
 sys.path.append('e2e/')
@@ -32,6 +37,20 @@ def client():
 def service(client):
     return SdmService(client, MagicMock())
 
+class Test_client_pool:
+    def test_keepalive_goes_through_the_api_guard(self):
+        client = MagicMock()
+        api_guard = MagicMock()
+        service = SdmService(SdmClientPool([client], MagicMock()), MagicMock(), api_guard=api_guard)
+        service.keepalive(0)
+        api_guard.call.assert_called_once()
+
+    def test_close_closes_the_clients(self):
+        client = MagicMock()
+        service = SdmService(SdmClientPool([client], MagicMock()), MagicMock())
+        service.close()
+        client.close.assert_called_once()
+
 class Test_get_resource_by_name:
     def test_when_resource_exists_returns_resource(self, client, service):
         client.resources.list = MagicMock(return_value = get_resource_list_iter())
@@ -51,6 +70,31 @@ class Test_get_resource_by_name:
         with pytest.raises(Exception):
             service.get_resource_by_name(resource_name)
 
+    def test_stops_listing_after_the_first_match(self, client, service):
+        listed = []
+        def list_resources(*args):
+            for id in [1, 2]:
+                listed.append(id)
+                yield get_resource(id)
+        client.resources.list = MagicMock(side_effect = list_resources)
+        assert service.get_resource_by_name(resource_name).id == 1
+        assert listed == [1]
+
+    def test_when_resource_catalog_is_enabled(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60)
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        service.get_resource_by_name(resource_name.upper())
+        sdm_resource = service.get_resource_by_name(resource_name)
+        client.resources.list.assert_called_once_with('')
+        assert sdm_resource.id == resource_id
+
+    def test_when_resource_is_not_in_catalog_yet(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60)
+        client.resources.list = MagicMock(side_effect = [iter([]), get_resource_list_iter()])
+        sdm_resource = service.get_resource_by_name(resource_name)
+        client.resources.list.assert_called_with('name:?', resource_name)
+        assert sdm_resource.id == resource_id
+
 class Test_get_account_by_email:
     def test_when_account_exists_returns_account(self, client, service):
         client.accounts.list = MagicMock(return_value = self.get_account_list_iter())
@@ -70,6 +114,22 @@ class Test_get_account_by_email:
         with pytest.raises(Exception):
             service.get_account_by_email(account_email)
 
+    def test_when_account_directory_is_enabled(self, client):
+        service = SdmService(client, MagicMock(), account_directory_ttl=60, account_directory_negative_ttl=60)
+        client.accounts.list = MagicMock(side_effect = lambda *args: self.get_account_list_iter())
+        service.get_account_by_email(account_email)
+        sdm_account = service.get_account_by_email(account_email)
+        client.accounts.list.assert_called_once_with(f'email:{account_email}')
+        assert sdm_account.id == account_id
+
+    def test_when_account_doesnt_exist_and_account_directory_is_enabled(self, client):
+        service = SdmService(client, MagicMock(), account_directory_ttl=60, account_directory_negative_ttl=60)
+        client.accounts.list = MagicMock(side_effect = lambda *args: iter([]))
+        for _ in range(2):
+            with pytest.raises(Exception):
+                service.get_account_by_email(account_email)
+        client.accounts.list.assert_called_once()
+
     @staticmethod
     def get_account_list_iter():
         mock_account = MagicMock()
@@ -97,6 +157,45 @@ class Test_account_grant_exists:
             service.account_grant_exists(get_resource(), account_id)
         assert error_message in str(ex.value)
 
+class Test_request_scope:
+    def test_memoizes_account_grant_exists(self, client, service):
+        client.account_grants.list = MagicMock(side_effect=lambda *args: iter([]))
+        with service.request_scope("exec01"):
+            service.account_grant_exists(get_resource(), account_id)
+            service.account_grant_exists(get_resource(), account_id)
+        client.account_grants.list.assert_called_once()
+
+    def test_forgets_account_grant_exists_after_grant(self, client, service):
+        client.account_grants.list = MagicMock(side_effect=lambda *args: iter([]))
+        with service.request_scope("exec01"):
+            service.account_grant_exists(get_resource(), account_id)
+            service.grant_temporary_access(resource_id, account_id, grant_start_from, grant_valid_until)
+            service.account_grant_exists(get_resource(), account_id)
+        assert client.account_grants.list.call_count == 2
+
+    def test_memoizes_get_account_by_email(self, client, service):
+        client.accounts.list = MagicMock(side_effect=lambda *args: Test_get_account_by_email.get_account_list_iter())
+        with service.request_scope("exec01"):
+            service.get_account_by_email(account_email)
+            service.get_account_by_email(account_email)
+        service.get_account_by_email(account_email)
+        assert client.accounts.list.call_count == 2
+
+class Test_get_granted_resources_via_account:
+    def test_when_checking_several_resources(self, client, service):
+        client.account_grants.list = MagicMock(return_value=iter([get_account_grant(resource_id)]))
+        resources = [get_resource(), get_resource(id=2)]
+        granted_resources = service.get_granted_resources_via_account(resources, account_id)
+        client.account_grants.list.assert_called_once_with(f"account_id:{account_id}")
+        assert granted_resources == [resources[0]]
+
+    def test_when_account_grant_list_fails(self, client, service):
+        error_message = "Account grant list failed"
+        client.account_grants.list = MagicMock(side_effect = Exception(error_message))
+        with pytest.raises(Exception) as ex:
+            service.get_granted_resources_via_account([get_resource(), get_resource(id=2)], account_id)
+        assert error_message in str(ex.value)
+
 class Test_delete_account_grant:
     def test_when_grant_exists(self, client, service):
         client.account_grants.list = MagicMock(return_value=[DummyAccountGrant(grant_id)])
@@ -125,6 +224,28 @@ class Test_delete_account_grant:
             service.delete_account_grant(resource_id, account_id)
         assert error_message in str(ex.value)
 
+class Test_grant_ledger:
+    def test_answers_grant_checks_from_the_ledger(self, client):
+        service = SdmService(client, MagicMock(), grant_ledger_ttl=60)
+        account_grant = MagicMock(id=grant_id, resource_id=resource_id, valid_until=None)
+        client.account_grants.list = MagicMock(return_value=[account_grant])
+        assert service.account_grant_exists(get_resource(), account_id)
+        assert len(service.get_granted_resources_via_account([get_resource(), get_resource(2)], account_id)) == 1
+        client.account_grants.list.assert_called_once_with(f"account_id:{account_id}")
+
+    def test_writes_through_grants_and_deletes(self, client):
+        service = SdmService(client, MagicMock(), grant_ledger_ttl=60)
+        client.account_grants.list = MagicMock(return_value=[])
+        client.account_grants.create.return_value.account_grant.id = grant_id
+        assert not service.account_grant_exists(get_resource(), account_id)
+        service.grant_temporary_access(resource_id, account_id, grant_start_from, grant_valid_until)
+        assert service.account_grant_exists(get_resource(), account_id)
+        service.delete_account_grant(resource_id, account_id)
+        client.account_grants.delete.assert_called_with(grant_id)
+        assert not service.account_grant_exists(get_resource(), account_id)
+        client.account_grants.list.assert_called_once()
+
+
 class Test_role_grant_exists:
     def test_when_grant_exists_using_access_rules(self, client, service):
         client.account_attachments.list = MagicMock(return_value=get_account_attachments())
@@ -167,6 +288,28 @@ class Test_role_grant_exists:
             service.get_granted_resources_via_role([get_resource()], account_id)
         assert error_message in str(ex.value)
 
+    def test_when_account_has_duplicated_role_attachments(self, client, service):
+        client.account_attachments.list = MagicMock(return_value=iter([get_account_attachment(), get_account_attachment()]))
+        client.roles.get = MagicMock(return_value=get_role_response())
+        client.role_grants.list = MagicMock(side_effect=lambda *args: iter([get_role_grant()]))
+        client.resources.list = MagicMock(side_effect=lambda *args: get_resource_list_iter())
+        granted_resources = service.get_granted_resources_via_role([get_resource(), get_resource(id=2)], account_id)
+        client.roles.get.assert_called_once_with(role_id)
+        client.resources.list.assert_called_once_with(f'id:{resource_id}')
+        assert [r.id for r in granted_resources] == [resource_id]
+
+    def test_when_role_catalog_is_enabled(self, client):
+        service = SdmService(client, MagicMock(), role_catalog_ttl=60)
+        client.account_attachments.list = MagicMock(side_effect=lambda *args: get_account_attachments())
+        client.roles.list = MagicMock(side_effect=lambda *args: get_role_list_iter())
+        client.role_grants.list = MagicMock(side_effect=lambda *args: iter([get_role_grant()]))
+        client.resources.list = MagicMock(side_effect=lambda *args: get_resource_list_iter())
+        service.get_granted_resources_via_role([get_resource()], account_id)
+        granted_resources = service.get_granted_resources_via_role([get_resource()], account_id)
+        client.roles.get.assert_not_called()
+        client.resources.list.assert_called_once_with(f'id:{resource_id}')
+        assert len(granted_resources) == 1
+
 class Test_grant_temporary_access:
     def test_when_grant_is_possible(self, client, service):
         client.account_grants.create = MagicMock()
@@ -219,6 +362,91 @@ class Test_get_all_resources:
         sdm_resources = service.get_all_resources(filter = "name:resource2")
         assert len(sdm_resources) == 0
 
+    def test_when_resource_catalog_is_enabled(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60)
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        service.get_all_resources()
+        sdm_resources = service.get_all_resources()
+        client.resources.list.assert_called_once_with('')
+        assert len(sdm_resources) == 1
+
+    def test_with_filter_when_resource_catalog_is_enabled(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60)
+        client.resources.list = MagicMock(side_effect = filter_resources)
+        service.get_all_resources(filter = "name:resource1")
+        service.get_all_resources(filter = "name:resource1")
+        assert client.resources.list.call_count == 2
+
+    def test_concurrent_calls_share_the_query(self, client):
+        log = MagicMock()
+        service = SdmService(client, log)
+        release = threading.Event()
+        client.resources.list = MagicMock(side_effect = lambda *args: release.wait() and get_resource_list_iter())
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.get_all_resources())) for _ in range(2)]
+        threads[0].start()
+        while client.resources.list.call_count == 0:
+            release.wait(0.01)
+        threads[1].start()
+        while not any('SingleFlight' in str(c) for c in log.debug.call_args_list):
+            release.wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        client.resources.list.assert_called_once_with('')
+        assert [len(sdm_resources) for sdm_resources in results] == [1, 1]
+        assert results[0] is not results[1]
+
+
+class Test_iter_all_resources:
+    def test_yields_resources_as_they_are_listed(self, client, service):
+        listed = []
+        def list_resources(filter):
+            for resource in [get_resource(1), None, get_resource(2)]:
+                listed.append(resource)
+                yield resource
+        client.resources.list = MagicMock(side_effect = list_resources)
+        sdm_resources = service.iter_all_resources(filter = "type:postgres")
+        assert next(sdm_resources).id == 1
+        assert len(listed) == 1
+        assert [sdm_resource.id for sdm_resource in sdm_resources] == [2]
+        client.resources.list.assert_called_once_with("type:postgres")
+
+    def test_when_sdm_client_fails_raises_exception(self, client, service):
+        client.resources.list = MagicMock(side_effect = Exception("SDM Client failed"))
+        with pytest.raises(Exception) as ex:
+            list(service.iter_all_resources())
+        assert "List resources failed: SDM Client failed" in str(ex.value)
+
+    def test_coalesces_concurrent_unfiltered_listings(self, client, service):
+        started = threading.Event()
+        release = threading.Event()
+        def list_resources(*args):
+            started.set()
+            release.wait(1)
+            return get_resource_list_iter()
+        client.resources.list = MagicMock(side_effect = list_resources)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(list(service.iter_all_resources()))) for _ in range(2)]
+        threads[0].start()
+        started.wait(1)
+        threads[1].start()
+        # Give the second caller time to join the in-flight listing
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        client.resources.list.assert_called_once_with('')
+        assert [len(sdm_resources) for sdm_resources in results] == [1, 1]
+
+    def test_when_resource_catalog_is_enabled(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60)
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        list(service.iter_all_resources())
+        sdm_resources = list(service.iter_all_resources())
+        client.resources.list.assert_called_once_with('')
+        assert len(sdm_resources) == 1
+
 
 class Test_get_all_resources_by_role:
     def test_returns_resources_when_search_role_by_name(self, client, service):
@@ -228,7 +456,7 @@ class Test_get_all_resources_by_role:
         resources = service.get_all_resources_by_role(role_name)
         client.roles.list.assert_called_with(f'name:?', role_name)
         client.role_grants.list.assert_called_with(f"role_id:{role_id}")
-        assert client.resources.list.mock_calls == [call("id:1,id:2"), call("type:postgres")]
+        client.resources.list.assert_has_calls([call("id:1,id:2"), call("type:postgres")], any_order=True)
         assert len(resources) == 1
 
     def test_returns_resources_when_already_have_role(self, client, service):
@@ -246,16 +474,102 @@ class Test_get_all_resources_by_role:
         client.roles.list.assert_called_with('name:?', role_name)
         assert str(ex.value) != ""
 
-    def test_when_role_grant_list_raises_exception(self, client, service):
-        client.role_grants.list = MagicMock(side_effect=Exception())
+    def test_when_role_grant_list_is_not_supported(self, client, service):
+        client.role_grants.list = MagicMock(side_effect=strongdm.errors.BadRequestError("role grants are not supported"))
         client.resources.list = MagicMock(return_value=[get_resource()])
         resources = service.get_all_resources_by_role(role_name, sdm_role=get_role(access_rules=[{'ids': [resource_id]}, {'type': 'postgres'}]))
         client.role_grants.list.assert_called_with(f"role_id:{role_id}")
-        assert client.resources.list.mock_calls == [call(f"id:{resource_id}"), call("type:postgres")]
+        client.resources.list.assert_has_calls([call(f"id:{resource_id}"), call("type:postgres")], any_order=True)
+        assert len(resources) == 1
+
+    def test_lists_the_filters_concurrently(self, client, service):
+        barrier = threading.Barrier(2, timeout=1)
+        def list_resources(filter):
+            # Both listings have to be running at the same time to get past the barrier
+            barrier.wait()
+            return [get_resource()] if filter == "type:postgres" else []
+        client.role_grants.list = MagicMock(return_value=[get_role_grant()])
+        client.resources.list = MagicMock(side_effect=list_resources)
+        resources = list(service.get_all_resources_by_role(role_name, sdm_role=get_role(access_rules=[{'type': 'postgres'}])))
+        assert client.resources.list.call_count == 2
         assert len(resources) == 1
 
+    def test_when_role_grant_list_raises_exception(self, client, service):
+        client.role_grants.list = MagicMock(side_effect=Exception("List failed"))
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        with pytest.raises(Exception) as ex:
+            service.get_all_resources_by_role(role_name, sdm_role=get_role(access_rules=[{'ids': [resource_id]}]))
+        assert "List failed" in str(ex.value)
+        client.resources.list.assert_not_called()
+
+    def test_remembers_when_role_grants_are_not_supported(self, client, service):
+        client.role_grants.list = MagicMock(side_effect=strongdm.errors.BadRequestError("role grants are not supported"))
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules=[{'ids': [resource_id]}])
+        service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        resources = service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        client.role_grants.list.assert_called_once_with(f"role_id:{role_id}")
+        assert client.resources.list.mock_calls == [call(f"id:{resource_id}"), call(f"id:{resource_id}")]
+        assert len(resources) == 1
+
+    def test_tries_role_grants_again_after_a_transient_error(self, client, service):
+        client.role_grants.list = MagicMock(side_effect=[strongdm.errors.TimeoutError(), [get_role_grant()]])
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules=[{'ids': [resource_id]}])
+        with pytest.raises(Exception):
+            service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        assert client.role_grants.list.call_count == 2
+
+    def test_remembers_when_the_sdk_has_no_role_grants(self, client, service):
+        del client.role_grants
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules=[{'ids': [resource_id]}])
+        service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        client.role_grants = MagicMock()
+        service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        client.role_grants.list.assert_not_called()
+
+    def test_tries_role_grants_again_after_a_permission_error(self, client, service):
+        client.role_grants.list = MagicMock(side_effect=[strongdm.errors.PermissionError("permission denied"), [get_role_grant()]])
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules=[{'ids': [resource_id]}])
+        with pytest.raises(Exception):
+            service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        assert client.role_grants.list.call_count == 2
+
+    def test_tries_role_grants_again_after_the_circuit_breaker_recovers(self, client):
+        api_guard = ApiGuard(MagicMock(), circuit_breaker_threshold=1, circuit_breaker_reset_timeout=0.05)
+        service = SdmService(client, MagicMock(), api_guard=api_guard)
+        client.role_grants.list = MagicMock(side_effect=[strongdm.errors.InternalError("unavailable"), [get_role_grant()]])
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules=[])
+        # The circuit opens after the first failure, so the role grants call of the second attempt is rejected
+        for _ in range(2):
+            with pytest.raises(Exception):
+                service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        assert client.role_grants.list.call_count == 1
+        time.sleep(0.1)
+        resources = service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        assert client.role_grants.list.call_count == 2
+        client.resources.list.assert_called_with(f"id:{resource_id}")
+        assert len(resources) == 1
+
+    def test_parses_access_rules_once_per_role_version(self, client, service):
+        client.role_grants.list = MagicMock(side_effect=lambda *args: iter([]))
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules='[{"type": "postgres"}]')
+        with patch('json.loads', side_effect=json.loads) as json_loads:
+            service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+            service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+            sdm_role.access_rules = '[{"type": "redis"}]'
+            service.get_all_resources_by_role(role_name, sdm_role=sdm_role)
+        assert json_loads.call_count == 2
+        assert client.resources.list.mock_calls == [call("type:postgres"), call("type:postgres"), call("type:redis")]
+
     def test_when_role_grant_list_returns_is_empty(self, client, service):
-        client.role_grants.list = MagicMock(side_effect=iter([]))
+        client.role_grants.list = MagicMock(return_value=iter([]))
         client.resources.list = MagicMock(return_value=[get_resource()])
         resources = service.get_all_resources_by_role(role_name, sdm_role=get_role(access_rules=[{'type': 'postgres'}]))
         client.role_grants.list.assert_called_with(f"role_id:{role_id}")
@@ -312,6 +626,120 @@ class Test_get_all_resources_by_role:
         client.resources.list.assert_called_with(f"id:{resource_id},name:{nonexistent_resource}")
         assert len(sdm_resources) == 0
 
+class Test_get_all_resources_by_role_with_index:
+    @pytest.fixture()
+    def service(self, client):
+        return SdmService(client, MagicMock(), role_catalog_ttl=60)
+
+    def test_expands_role_once(self, client, service):
+        client.roles.list = MagicMock(side_effect = lambda *args: get_role_list_iter())
+        client.role_grants.list = MagicMock(side_effect = lambda *args: get_role_grant_iter())
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        service.get_all_resources_by_role(role_name)
+        resources = service.get_all_resources_by_role(role_name)
+        client.roles.list.assert_called_once_with('')
+        client.role_grants.list.assert_called_once_with(f"role_id:{role_id}")
+        client.resources.list.assert_called_once_with("id:1,id:2")
+        assert len(resources) == 1
+
+    def test_expands_role_again_after_invalidation(self, client, service):
+        client.role_grants.list = MagicMock(side_effect = lambda *args: get_role_grant_iter())
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        service.get_all_resources_by_role(role_name, sdm_role=get_role())
+        service.invalidate_role_resources(role_id)
+        service.get_all_resources_by_role(role_name, sdm_role=get_role())
+        assert client.resources.list.call_count == 2
+
+    def test_expands_role_again_after_importing_the_catalogs(self, client, service):
+        client.role_grants.list = MagicMock(side_effect = lambda *args: get_role_grant_iter())
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        service.get_all_resources_by_role(role_name, sdm_role=get_role())
+        service.import_catalogs({'roles': [get_role()]})
+        service.get_all_resources_by_role(role_name, sdm_role=get_role())
+        assert client.resources.list.call_count == 2
+
+    def test_doesnt_index_the_expansion_when_role_grants_fail(self, client, service):
+        client.role_grants.list = MagicMock(side_effect=[strongdm.errors.TimeoutError(), get_role_grant_iter()])
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        with pytest.raises(Exception):
+            service.get_all_resources_by_role(role_name, sdm_role=get_role())
+        assert len(service.get_all_resources_by_role(role_name, sdm_role=get_role())) == 1
+        assert len(service.get_all_resources_by_role(role_name, sdm_role=get_role())) == 1
+        assert client.role_grants.list.call_count == 2
+
+    def test_with_filter(self, client, service):
+        client.role_grants.list = MagicMock(side_effect = lambda *args: get_role_grant_iter())
+        client.resources.list = MagicMock(side_effect = lambda filter: get_resource_list_iter() if filter.startswith('id:') else filter_resources(filter))
+        resources = service.get_all_resources_by_role(role_name, filter=f"name:{resource_name}", sdm_role=get_role())
+        client.resources.list.assert_called_with(f"name:{resource_name}")
+        assert len(resources) == 1
+        resources = service.get_all_resources_by_role(role_name, filter="name:resource2", sdm_role=get_role())
+        assert len(resources) == 0
+
+class Test_get_all_resources_by_role_with_resource_catalog:
+    @pytest.fixture()
+    def service(self, client):
+        return SdmService(client, MagicMock(), resource_catalog_ttl=60)
+
+    def test_evaluates_access_rules_locally(self, client, service):
+        postgres = strongdm.Postgres(id='rs-1', name='postgres', tags={'env': 'dev'})
+        redis = strongdm.Redis(id='rs-2', name='redis', tags={'env': 'dev'})
+        client.role_grants.list = MagicMock(return_value=[get_role_grant()])
+        client.resources.list = MagicMock(side_effect=lambda *args: iter([postgres, redis, get_resource()]))
+        sdm_role = get_role(access_rules=[{'type': 'redis', 'tags': {'env': 'dev'}}])
+        resources = list(service.get_all_resources_by_role(role_name, sdm_role=sdm_role))
+        client.resources.list.assert_called_once_with('')
+        assert [resource.id for resource in resources] == [resource_id, 'rs-2']
+
+    def test_lists_the_granted_resources_missing_in_the_catalog(self, client, service):
+        client.role_grants.list = MagicMock(return_value=[get_role_grant()])
+        client.resources.list = MagicMock(side_effect=lambda filter: iter([get_resource()] if filter == f"id:{resource_id}" else []))
+        resources = list(service.get_all_resources_by_role(role_name, sdm_role=get_role(access_rules=[])))
+        assert client.resources.list.mock_calls == [call(''), call(f"id:{resource_id}")]
+        assert len(resources) == 1
+
+    def test_uses_the_api_for_unsupported_access_rules(self, client, service):
+        client.role_grants.list = MagicMock(return_value=[])
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules=[{'type': 'postgres', 'unknown': 'rule'}])
+        resources = list(service.get_all_resources_by_role(role_name, sdm_role=sdm_role))
+        assert client.resources.list.mock_calls == [call("type:postgres")]
+        assert len(resources) == 1
+
+    def test_expands_role_again_after_refreshing_the_resources(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60, role_catalog_ttl=60)
+        postgres = strongdm.Postgres(id='rs-1', name='postgres', tags={})
+        client.role_grants.list = MagicMock(return_value=[])
+        client.resources.list = MagicMock(return_value=[get_resource()])
+        sdm_role = get_role(access_rules=[{'type': 'postgres'}])
+        assert len(list(service.get_all_resources_by_role(role_name, sdm_role=sdm_role))) == 0
+        client.resources.list = MagicMock(return_value=[get_resource(), postgres])
+        service.refresh_resource_catalog()
+        resources = list(service.get_all_resources_by_role(role_name, sdm_role=sdm_role))
+        assert [resource.id for resource in resources] == ['rs-1']
+
+
+class Test_catalogs_snapshot:
+    def test_exports_the_enabled_catalogs(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60, account_directory_ttl=60)
+        client.resources.list = MagicMock(side_effect = lambda *args: get_resource_list_iter())
+        client.accounts.list = MagicMock(return_value = [create_account()])
+        service.get_all_resources()
+        service.get_account_by_email(account_email)
+        catalogs = service.export_catalogs()
+        assert list(catalogs.keys()) == ['resources', 'accounts']
+        assert catalogs['resources'][0].id == resource_id
+        assert catalogs['accounts'][0].email == account_email
+
+    def test_imports_the_enabled_catalogs(self, client):
+        service = SdmService(client, MagicMock(), resource_catalog_ttl=60, account_directory_ttl=60)
+        service.import_catalogs({'resources': [get_resource()], 'roles': [get_role()], 'accounts': [create_account()]})
+        assert service.get_resource_by_name(resource_name).id == resource_id
+        assert service.get_account_by_email(account_email).id == account_id
+        client.resources.list.assert_not_called()
+        client.accounts.list.assert_not_called()
+
+
 class Test_get_role_by_name:
     def test_when_resource_exists_returns_role(self, client, service):
         client.roles.list = MagicMock(return_value = get_role_list_iter())
@@ -344,21 +772,30 @@ def get_resource_list_iter():
     mock_resource = get_resource()
     return iter([mock_resource])
 
-def get_resource():
+def get_resource(id=resource_id):
     mock_resource = MagicMock()
-    mock_resource.id = resource_id
+    mock_resource.id = id
     mock_resource.name = resource_name
     mock_resource.role_id = role_id
     return mock_resource
 
+def get_account_grant(resource_id):
+    mock_account_grant = MagicMock()
+    mock_account_grant.resource_id = resource_id
+    mock_account_grant.account_id = account_id
+    return mock_account_grant
+
 def get_role_list_iter():
     return iter([get_role()])
 
 def get_account_attachments():
+    return iter([get_account_attachment()])
+
+def get_account_attachment():
     account_attachment = MagicMock()
     account_attachment.role_id = role_id
     account_attachment.account_id = account_id
-    return iter([account_attachment])
+    return account_attachment
 
 def get_role_response(access_rules=None):
     response = MagicMock()
@@ -397,3 +834,9 @@ def filter_resources(filter = ''):
         for resource in get_resource_list_iter()
         if not filter or resource.name in filter
     ]
+
+def create_account():
+    account = MagicMock()
+    account.id = account_id
+    account.email = account_email
+    return account
@@ -0,0 +1,85 @@
+# pylint: disable=invalid-name
+import threading
+from unittest.mock import MagicMock
+import pytest
+
+from .single_flight import SingleFlight
+
+
+def start_waiting_caller(single_flight, key, fn, results):
+    def run():
+        try:
+            results.append(single_flight.do(key, fn))
+        except Exception as ex:
+            results.append(ex)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+def wait_for(condition, timeout=1):
+    event = threading.Event()
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        event.wait(0.01)
+    raise AssertionError("Condition not met in time")
+
+class Test_do:
+    def test_returns_the_result(self):
+        single_flight = SingleFlight(MagicMock())
+        assert single_flight.do("key", lambda: "value") == "value"
+
+    def test_sequential_calls_are_not_coalesced(self):
+        single_flight = SingleFlight(MagicMock())
+        fn = MagicMock(return_value="value")
+        single_flight.do("key", fn)
+        single_flight.do("key", fn)
+        assert fn.call_count == 2
+
+    def test_concurrent_calls_share_the_result(self):
+        log = MagicMock()
+        single_flight = SingleFlight(log)
+        release = threading.Event()
+        fn = MagicMock(side_effect=lambda: release.wait() and "value")
+        results = []
+        leader = start_waiting_caller(single_flight, "key", fn, results)
+        wait_for(lambda: fn.call_count == 1)
+        follower = start_waiting_caller(single_flight, "key", fn, results)
+        wait_for(lambda: log.debug.called)
+        release.set()
+        leader.join()
+        follower.join()
+        fn.assert_called_once()
+        assert results == ["value", "value"]
+
+    def test_concurrent_calls_share_the_exception(self):
+        log = MagicMock()
+        single_flight = SingleFlight(log)
+        release = threading.Event()
+        error = Exception("API failed")
+        def fail():
+            release.wait()
+            raise error
+        results = []
+        leader = start_waiting_caller(single_flight, "key", fail, results)
+        wait_for(lambda: single_flight.in_flight() == 1)
+        follower = start_waiting_caller(single_flight, "key", MagicMock(), results)
+        wait_for(lambda: log.debug.called)
+        release.set()
+        leader.join()
+        follower.join()
+        assert results == [error, error]
+        assert single_flight.in_flight() == 0
+
+    def test_different_keys_are_not_coalesced(self):
+        single_flight = SingleFlight(MagicMock())
+        fn = MagicMock(return_value="value")
+        single_flight.do("key1", fn)
+        single_flight.do("key2", fn)
+        assert fn.call_count == 2
+
+    def test_forgets_failed_calls(self):
+        single_flight = SingleFlight(MagicMock())
+        with pytest.raises(Exception):
+            single_flight.do("key", MagicMock(side_effect=Exception("API failed")))
+        assert single_flight.do("key", lambda: "value") == "value"
@@ -1,4 +1,5 @@
 # pylint: disable=invalid-name
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from unittest.mock import MagicMock
 
@@ -11,7 +12,7 @@ sys.path.append('e2e/')
 from test_common import DummyAccount, DummyResource, DummyPerson
 from .util import is_hidden, can_auto_approve_by_tag, HiddenTagEnum, AllowedTagEnum, is_allowed, is_concealed, \
     can_auto_approve_by_groups_tag, has_intersection, convert_duration_flag_to_timedelta, \
-    get_formatted_duration_string, get_approvers_channel, AllowedGroupsTagEnum
+    get_formatted_duration_string, get_approvers_channel, AllowedGroupsTagEnum, get_first_found
 
 
 default_group = 'a-group'
@@ -470,3 +471,38 @@ class Test_get_approvers_channel:
         sdm_object = DummyResource('resource', {})
         approvers_channel = get_approvers_channel(config, sdm_object)
         assert approvers_channel is None
+
+class Test_get_first_found:
+    @pytest.fixture
+    def executor(self):
+        executor = ThreadPoolExecutor(max_workers=2)
+        yield executor
+        executor.shutdown()
+
+    def test_doesnt_look_up_the_other_values_when_the_first_is_found(self, executor):
+        lookup = MagicMock(return_value='primary')
+        assert get_first_found(['primary@mail.com', 'other@mail.com'], lookup, executor) == 'primary'
+        lookup.assert_called_once_with('primary@mail.com')
+
+    def test_returns_the_first_found_in_order(self, executor):
+        found = {'second@mail.com': 'second', 'third@mail.com': 'third'}
+        def lookup(value):
+            if value not in found:
+                raise Exception('Not found')
+            return found[value]
+        assert get_first_found(['primary@mail.com', 'other@mail.com', 'second@mail.com', 'third@mail.com'], lookup, executor) == 'second'
+
+    def test_raises_the_error_of_the_last_value_when_none_is_found(self, executor):
+        def raise_not_found(value):
+            raise Exception(f'{value} not found')
+        lookup = MagicMock(side_effect=raise_not_found)
+        with pytest.raises(Exception) as ex:
+            get_first_found(['primary@mail.com', 'other@mail.com', 'last@mail.com'], lookup, executor)
+        assert str(ex.value) == 'last@mail.com not found'
+        assert lookup.call_count == 3
+
+    def test_raises_the_error_when_there_is_a_single_value(self, executor):
+        lookup = MagicMock(side_effect=Exception('Not found'))
+        with pytest.raises(Exception) as ex:
+            get_first_found(['primary@mail.com'], lookup, executor)
+        assert str(ex.value) == 'Not found'
@@ -138,3 +138,25 @@ def get_approvers_channel(config, sdm_object):
     if approvers_channel_tag is None or sdm_object.tags is None or sdm_object.tags.get(approvers_channel_tag) is None:
         return None
     return sdm_object.tags.get(approvers_channel_tag)
+
+def get_first_found(values, lookup, executor):
+    """
+    Return the result of the lookup of the first value that doesn't fail, in order. The first value is looked up alone
+    and the others concurrently in the executor only when it fails. The error of the last value is raised if all fail
+    """
+    try:
+        return lookup(values[0])
+    except Exception as e:
+        if len(values) == 1:
+            raise e
+    lookups = [executor.submit(lookup, value) for value in values[1:]]
+    try:
+        for index, pending_lookup in enumerate(lookups):
+            try:
+                return pending_lookup.result()
+            except Exception as e:
+                if index == len(lookups) - 1:
+                    raise e
+    finally:
+        for pending_lookup in lookups:
+            pending_lookup.cancel()
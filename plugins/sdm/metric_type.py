@@ -10,3 +10,7 @@ class MetricGaugeType(Enum):
     TOTAL_TIMED_OUT_REQUESTS = "TOTAL_TIMED_OUT_REQUESTS"
     TOTAL_PENDING_REQUESTS = "TOTAL_PENDING_REQUESTS"
     TOTAL_CONSECUTIVE_ERRORS = "TOTAL_CONSECUTIVE_ERRORS"
+    SDM_API_CIRCUIT_OPEN = "SDM_API_CIRCUIT_OPEN"
+    SDM_API_THROTTLED_CALLS = "SDM_API_THROTTLED_CALLS"
+    SDM_API_RETRIED_CALLS = "SDM_API_RETRIED_CALLS"
+    SDM_API_REJECTED_CALLS = "SDM_API_REJECTED_CALLS"